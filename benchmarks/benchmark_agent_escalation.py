@@ -0,0 +1,114 @@
+"""
+Escalation rate and latency of the confidence-gated Phase 2 agent.
+
+First reports, for several uncertainty bands, how many transactions of
+Phase 1's held-out test split would be escalated to the LLM and how many
+templated (model-only) decisions disagree with the true label. Then runs a
+sample of those transactions end to end through the plain ReAct agent and
+through GatedRiskAssessmentAgent, both backed by a local fake LLM that
+answers in the ReAct format after a fixed delay, and reports the LLM
+calls and latency saved. Needs no API key. Run from the project root
+after Phase 1:
+
+    python benchmarks/benchmark_agent_escalation.py --rows 50 --llm-latency-ms 300
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeRiskLLM
+from src.common.dataset_cache import load_frame
+from src.common.model_registry import FRAUD_THRESHOLD
+from src.phase2_agent.risk_assessment_agent import (
+    ESCALATION_HIGH,
+    ESCALATION_LOW,
+    GatedRiskAssessmentAgent,
+    create_risk_assessment_agent,
+    model_registry,
+)
+
+DATA_FILE = "data/creditcard.csv"
+BANDS = ((0.001, 0.99), (0.01, 0.95), (ESCALATION_LOW, ESCALATION_HIGH), (0.05, 0.8), (0.1, 0.5))
+
+
+def load_test_split():
+    """The exact test split used by train_model.py."""
+    df = load_frame(csv_path=DATA_FILE)
+    X, y = df.drop('Class', axis=1), df['Class']
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return X_test.to_numpy(dtype=np.float64), y_test.to_numpy()
+
+
+def band_report(X, y):
+    bundle = model_registry.get()
+    raw = bundle.predict_proba(X)
+    calibrated = bundle.calibrate(raw)
+    results = np.where(raw > FRAUD_THRESHOLD, "FRAUD", "NOT FRAUD")
+    if bundle.calibrator is None:
+        print("❗️Warning: No calibration artifact; gating on raw probabilities.")
+    print(f"--- Escalation by band ({len(X)} test transactions) ---")
+    print(f"{'band':>16} {'escalated':>10} {'rate':>8} {'templated errors':>17}")
+    for low, high in BANDS:
+        gate = GatedRiskAssessmentAgent(agent=object(), low=low, high=high)
+        escalate = np.array([gate.needs_escalation(r, p) for r, p in zip(results, calibrated)])
+        templated_errors = int(np.sum((results == "FRAUD")[~escalate] != y[~escalate].astype(bool)))
+        print(f"{f'[{low}, {high}]':>16} {escalate.sum():>10} {escalate.mean():>8.2%} {templated_errors:>17}")
+
+
+def time_agent(agent, transactions):
+    """Returns each transaction's latency in ms and the agent's responses."""
+    latencies, responses = [], []
+    for details in transactions:
+        start = time.perf_counter()
+        responses.append(agent.invoke({"input": details}))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50, help="Transactions to run end to end.")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Fake LLM delay per call.")
+    args = parser.parse_args()
+
+    X, y = load_test_split()
+    band_report(X, y)
+
+    rng = np.random.default_rng(42)
+    sample = X[rng.choice(len(X), size=min(args.rows, len(X)), replace=False)]
+    transactions = [",".join(repr(v) for v in row) for row in sample.tolist()]
+
+    react_llm = FakeRiskLLM(latency_s=args.llm_latency_ms / 1000)
+    react = create_risk_assessment_agent(llm=react_llm)
+    react.verbose = False
+    react_ms, _ = time_agent(react, transactions)
+
+    gated_llm = FakeRiskLLM(latency_s=args.llm_latency_ms / 1000)
+    fallback = create_risk_assessment_agent(llm=gated_llm)
+    fallback.verbose = False
+    gated = GatedRiskAssessmentAgent(agent=fallback)
+    gated_ms, responses = time_agent(gated, transactions)
+
+    print(f"\n--- End to end ({len(transactions)} transactions, fake LLM {args.llm_latency_ms:.0f} ms/call) ---")
+    print(f"{'agent':<10} {'LLM calls':>10} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, llm, latencies in (("react", react_llm, react_ms), ("gated", gated_llm, gated_ms)):
+        print(f"{name:<10} {llm.calls:>10} {latencies.mean():>10.2f} "
+              f"{np.percentile(latencies, 50):>10.2f} {np.percentile(latencies, 99):>10.2f}")
+    templated = gated_ms[[not response["escalated"] for response in responses]]
+    stats = gated.stats()
+    print(f"\nEscalation rate: {stats['escalation_rate']:.2%} ({stats['escalated']}/{stats['total']}), "
+          f"band {stats['band']}")
+    if len(templated):
+        print(f"Templated answers: {np.mean(templated) * 1000:.0f} µs mean")
+    print(f"Latency saved: {react_ms.mean() - gated_ms.mean():.1f} ms per transaction "
+          f"({react_ms.sum() / 1000 - gated_ms.sum() / 1000:.1f} s in total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Tokens, LLM calls and wall time: ReAct agent vs single-pass structured mode.
+
+Runs a sample of Phase 1's held-out test split through
+`create_risk_assessment_agent` (Thought/Action/Observation loop) and
+`StructuredRiskAssessmentAgent` (model first, one LLM call returning
+validated JSON), both on the local fake LLM from
+benchmarks/fake_llm.py, and reports LLM calls, estimated prompt and
+completion tokens and latency per assessment. Also checks that both modes
+reach the same decision for every transaction. Needs no API key. Run from
+the project root after Phase 1:
+
+    python benchmarks/benchmark_agent_modes.py --rows 50 --llm-latency-ms 300
+"""
+import argparse
+import os
+import sys
+import time
+
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeRiskLLM
+from src.common.dataset_cache import load_frame
+from src.phase2_agent.risk_assessment_agent import (
+    StructuredRiskAssessmentAgent,
+    create_risk_assessment_agent,
+)
+
+DATA_FILE = "data/creditcard.csv"
+
+
+def load_sample(rows):
+    """A random sample of the exact test split used by train_model.py."""
+    df = load_frame(csv_path=DATA_FILE)
+    X, y = df.drop('Class', axis=1), df['Class']
+    _, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    sample = X_test.sample(n=min(rows, len(X_test)), random_state=42).to_numpy()
+    return [",".join(repr(v) for v in row) for row in sample.tolist()]
+
+
+def decision(output):
+    return "NO FRAUD DETECTED" if "NO FRAUD DETECTED" in output else "FRAUD DETECTED"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50, help="Transactions to assess.")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Fake LLM delay per call.")
+    args = parser.parse_args()
+
+    transactions = load_sample(args.rows)
+    react_llm = FakeRiskLLM(latency_s=args.llm_latency_ms / 1000)
+    react = create_risk_assessment_agent(llm=react_llm)
+    react.verbose = False
+    structured_llm = FakeRiskLLM(latency_s=args.llm_latency_ms / 1000)
+    agents = {
+        "react": (react, react_llm),
+        "structured": (StructuredRiskAssessmentAgent(llm=structured_llm), structured_llm),
+    }
+
+    rows, decisions = {}, {}
+    for name, (agent, llm) in agents.items():
+        start = time.perf_counter()
+        outputs = [agent.invoke({"input": details})["output"] for details in transactions]
+        elapsed = time.perf_counter() - start
+        decisions[name] = [decision(output) for output in outputs]
+        n = len(transactions)
+        rows[name] = (llm.calls / n, llm.prompt_tokens / n, llm.completion_tokens / n, elapsed / n * 1000)
+
+    print(f"\n--- Per assessment ({len(transactions)} transactions, fake LLM {args.llm_latency_ms:.0f} ms/call) ---")
+    print(f"{'mode':<12} {'LLM calls':>10} {'prompt tok':>11} {'output tok':>11} {'wall ms':>10}")
+    for name, (calls, prompt_tokens, completion_tokens, wall_ms) in rows.items():
+        print(f"{name:<12} {calls:>10.2f} {prompt_tokens:>11.0f} {completion_tokens:>11.0f} {wall_ms:>10.1f}")
+    react_row, structured_row = rows["react"], rows["structured"]
+    print(f"\nStructured mode uses {1 - (structured_row[1] + structured_row[2]) / (react_row[1] + react_row[2]):.0%} "
+          f"fewer tokens and {1 - structured_row[3] / react_row[3]:.0%} less wall time.")
+
+    agree = sum(a == b for a, b in zip(decisions["react"], decisions["structured"]))
+    status = "✅" if agree == len(transactions) else "❌"
+    print(f"{status} Same decision for {agree}/{len(transactions)} transactions.")
+    if agree != len(transactions):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
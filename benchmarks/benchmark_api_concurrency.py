@@ -0,0 +1,97 @@
+"""
+Throughput of /assess-transaction under concurrent load.
+
+Starts the API with uvicorn in a subprocess, then drives it with 1, 2, 4, ...
+concurrent clients and reports requests/second and latency percentiles at
+each level. Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_api_concurrency.py --requests 2000
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+LEGIT_TRANSACTION = "0.0,-1.3598071336738,-0.0727811733593648,2.53634673796914,1.37815522427443,-0.338320769942518,0.462387777762292,0.23959855406126,0.0986979012610507,0.363786969611215,0.0907941719789316,-0.551599533260813,-0.617800855762348,-0.991389847235408,-0.311169353699879,1.46817697209427,-0.470400525259478,0.207971241929242,0.0257905801985591,0.403992960255733,0.251412098239705,-0.018306777944153,0.277837575558899,-0.110473910188767,0.0669280749146731,0.128539358273528,-0.189114843888824,0.133558376740387,-0.0210530534538215,149.62"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, extra_env):
+    env = {**os.environ, **extra_env}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.phase4_app.api:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{url}/docs", timeout=1)
+            return server, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API server did not start within 60 seconds.")
+
+
+def run_level(url, concurrency, total):
+    """Sends `total` requests from `concurrency` clients; returns (req/s, latencies ms, errors)."""
+    per_client = total // concurrency
+
+    def client(_):
+        session = requests.Session()
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            start = time.perf_counter()
+            response = session.post(f"{url}/assess-transaction",
+                                    json={"transaction_details": LEGIT_TRANSACTION}, timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([r[0] for r in results])
+    return len(latencies) / elapsed, latencies, sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level.")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated client counts.")
+    parser.add_argument("--env", action="append", default=[],
+                        help="Extra server environment, e.g. --env SENTINEL_MICRO_BATCH=0.")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    server, url = start_server(free_port(), extra_env)
+    try:
+        run_level(url, 1, 20)  # warmup
+        print(f"{'clients':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'speedup':>8}")
+        baseline = None
+        for concurrency in (int(level) for level in args.levels.split(",")):
+            throughput, latencies, errors = run_level(url, concurrency, args.requests)
+            baseline = baseline or throughput
+            print(f"{concurrency:>8} {throughput:>10.1f} {np.percentile(latencies, 50):>8.2f} "
+                  f"{np.percentile(latencies, 99):>8.2f} {errors:>7} {throughput / baseline:>7.2f}x")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Bytes on the wire and serialization CPU for the assessment API's formats.
+
+Compares, per transaction, the old format (comma-joined string in; full
+graph state echoed back through the stdlib JSON encoder) with a JSON float
+array, raw float64 and msgpack request bodies, and the slim orjson
+response. Only the encode/decode work the server does is timed, not the
+model, so no server is needed; importing the API still loads the model.
+Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_api_payloads.py
+"""
+import json
+import os
+import sys
+import time
+
+import msgpack
+import numpy as np
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.features import N_FEATURES, decode_transaction, decode_transactions
+from src.phase4_app.api import (
+    AssessmentResponse,
+    BatchTransactionRequest,
+    TransactionRequest,
+    slim_result,
+)
+
+BATCH_SIZE = 1000
+RECOMMENDATION = "Transaction Approved. No further action required."
+
+
+def stdlib_json(content):
+    """What FastAPI's default JSONResponse does with a returned model."""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def final_state(transaction_details):
+    return {
+        "transaction_details": transaction_details,
+        "triage_result": "NOT FRAUD",
+        "fraud_probability": 0.0322743368861141,
+        "final_recommendation": RECOMMENDATION,
+    }
+
+
+def per_call_us(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def report(name, request_bytes, response_bytes, decode_fn, encode_fn, repeats, rows=1):
+    decode_us = per_call_us(decode_fn, repeats) / rows
+    encode_us = per_call_us(encode_fn, repeats) / rows
+    print(f"{name:<30} {request_bytes / rows:>9.0f} {response_bytes / rows:>9.0f} "
+          f"{decode_us:>10.2f} {encode_us:>10.2f} {decode_us + encode_us:>10.2f}")
+
+
+def main():
+    rng = np.random.default_rng(42)
+    rows = rng.normal(size=(BATCH_SIZE, N_FEATURES))
+    row = rows[0]
+    csv_row = ",".join(repr(v) for v in row.tolist())
+    header = f"{'format':<30} {'req B':>9} {'resp B':>9} {'decode µs':>10} {'encode µs':>10} {'total µs':>10}"
+
+    print(f"--- Single transaction (per request) ---\n{header}")
+    old_request = orjson.dumps({"transaction_details": csv_row})
+    old_response = AssessmentResponse(recommendation=RECOMMENDATION, details=final_state(csv_row))
+    report(
+        "string in, full state out", len(old_request), len(stdlib_json(old_response)),
+        lambda: decode_transaction(TransactionRequest(**json.loads(old_request)).transaction_details),
+        lambda: stdlib_json(AssessmentResponse(recommendation=RECOMMENDATION, details=final_state(csv_row))),
+        5000,
+    )
+    array_request = orjson.dumps({"transaction_details": row.tolist()})
+    slim = slim_result(final_state(row.tolist()))
+    report(
+        "array in, slim orjson out", len(array_request), len(orjson.dumps(slim)),
+        lambda: decode_transaction(TransactionRequest(**orjson.loads(array_request)).transaction_details),
+        lambda: orjson.dumps(slim_result(final_state(row.tolist()))),
+        5000,
+    )
+    report(
+        "float64 in, slim orjson out", row.astype('<f8').nbytes, len(orjson.dumps(slim)),
+        lambda: np.frombuffer(row.astype('<f8').tobytes(), dtype='<f8').reshape(-1, N_FEATURES),
+        lambda: orjson.dumps(slim_result(final_state(row.tolist()))),
+        5000,
+    )
+
+    print(f"\n--- Batch of {BATCH_SIZE} (per transaction) ---\n{header}")
+    csv_rows = [",".join(repr(v) for v in r) for r in rows.tolist()]
+    old_batch = orjson.dumps({"transactions": csv_rows})
+    old_results = [{"recommendation": RECOMMENDATION, "triage_result": "NOT FRAUD",
+                    "fraud_probability": 0.0322743368861141, "error": None}] * BATCH_SIZE
+    report(
+        "strings in, stdlib json out", len(old_batch), len(stdlib_json({"results": old_results})),
+        lambda: decode_transactions(BatchTransactionRequest(**json.loads(old_batch)).transactions),
+        lambda: stdlib_json({"results": old_results}),
+        20, BATCH_SIZE,
+    )
+    slim_results = {"results": [slim_result(final_state(None)) for _ in range(BATCH_SIZE)]}
+    slim_bytes = len(orjson.dumps(slim_results))
+    array_batch = orjson.dumps({"transactions": rows.tolist()})
+    report(
+        "arrays in, slim orjson out", len(array_batch), slim_bytes,
+        lambda: decode_transactions(BatchTransactionRequest(**orjson.loads(array_batch)).transactions),
+        lambda: orjson.dumps({"results": [slim_result(final_state(None)) for _ in range(BATCH_SIZE)]}),
+        20, BATCH_SIZE,
+    )
+    msgpack_batch = msgpack.packb(rows.tolist())
+    report(
+        "msgpack rows in, msgpack out", len(msgpack_batch), len(msgpack.packb(slim_results)),
+        lambda: decode_transactions(msgpack.unpackb(msgpack_batch)),
+        lambda: msgpack.packb({"results": [slim_result(final_state(None)) for _ in range(BATCH_SIZE)]}),
+        20, BATCH_SIZE,
+    )
+    raw_batch = rows.astype('<f8').tobytes()
+    report(
+        "float64 in, slim orjson out", len(raw_batch), slim_bytes,
+        lambda: np.isfinite(np.frombuffer(raw_batch, dtype='<f8').reshape(-1, N_FEATURES)).all(axis=1),
+        lambda: orjson.dumps({"results": [slim_result(final_state(None)) for _ in range(BATCH_SIZE)]}),
+        20, BATCH_SIZE,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Per-worker memory and load time: joblib pickles vs the memory-mapped bundle.
+
+Starts --workers processes per format, like uvicorn workers, that each load
+the artifacts through ModelRegistry and score a few thousand rows in small
+batches, so the compiled forests are touched. With every worker still
+alive, it reads /proc/<pid>/smaps_rollup and prints, per worker, the load
+time, the RSS added by loading, the private memory and the PSS (shared
+pages divided among the processes that map them), and the RSS and PSS of
+the bundle's mapped arrays alone. Linux only.
+
+By default the artifacts in models/ are used. With --trees a larger model
+(--trees trees of --depth) is trained on the data and exported to a
+temporary directory first, closer to what a production model weighs:
+
+    python benchmarks/benchmark_artifact_bundle.py --workers 4 --trees 1000 --depth 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MODELS_DIR = "models"
+SCORED_ROWS = 4096
+
+
+def memory_kb(pid="self") -> dict:
+    """Rss, Pss and private memory of a process in kB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def mapped_kb(pid, directory) -> dict:
+    """Rss and Pss of the file mappings under `directory` (the bundle's arrays) in kB."""
+    totals, current = {"rss": 0, "pss": 0}, False
+    directory = os.path.realpath(directory)
+    with open(f"/proc/{pid}/smaps") as f:
+        for line in f:
+            parts = line.split()
+            if "-" in parts[0] and not parts[0].endswith(":"):
+                current = len(parts) >= 6 and parts[5].startswith(directory)
+            elif current and parts[0] in ("Rss:", "Pss:"):
+                totals[parts[0][:-1].lower()] += int(parts[1])
+    return totals
+
+
+def child(fmt, models_dir):
+    """One worker: load through the registry, score, report, wait for stdin to close."""
+    import joblib  # noqa: F401 - imported before measuring, like the serving app
+    import numpy as np
+    import xgboost  # noqa: F401
+
+    from src.common.model_registry import COMPILED_MAX_ROWS, ModelRegistry
+
+    before = memory_kb()
+    start = time.perf_counter()
+    registry = ModelRegistry(
+        model_path=os.path.join(models_dir, "xgb_fraud_detector.joblib"),
+        scaler_path=os.path.join(models_dir, "scaler.joblib"),
+        compiled_path=os.path.join(models_dir, "xgb_fraud_detector_compiled.npz"),
+        fused_path=os.path.join(models_dir, "xgb_fraud_detector_fused.npz"),
+        calibration_path=os.path.join(models_dir, "probability_calibration.npz"),
+        bundle_dir=os.path.join(models_dir, "bundle") if fmt == "bundle" else os.path.join(models_dir, "no-bundle"),
+    )
+    bundle = registry.get()
+    load_seconds = time.perf_counter() - start
+    loaded = memory_kb()
+
+    # Score like single-transaction traffic, in forest-sized batches, so the
+    # forests' pages are touched without large scoring temporaries.
+    rng = np.random.default_rng(os.getpid())
+    mean, scale = np.asarray(bundle.scaler.mean_), np.asarray(bundle.scaler.scale_)
+    features = mean + rng.standard_normal((SCORED_ROWS, len(mean))) * scale
+    for i in range(0, SCORED_ROWS, COMPILED_MAX_ROWS):
+        bundle.calibrate(bundle.predict_proba(features[i:i + COMPILED_MAX_ROWS]))
+    print(json.dumps({"load_seconds": load_seconds, "loaded_kb": loaded["rss"] - before["rss"],
+                      "scaler": type(bundle.scaler).__name__}), flush=True)
+    sys.stdin.read()
+
+
+def read_report(worker) -> dict:
+    """The child's JSON line; the registry's own messages come before it."""
+    for line in worker.stdout:
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"Worker {worker.pid} exited without a report.")
+
+
+def export_large_model(models_dir, trees, depth):
+    """Trains a --trees x --depth model with class weights and exports every artifact."""
+    import numpy as np
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+
+    from src.common.dataset_cache import load_frame
+    from src.common.features import FEATURE_NAMES
+    from src.phase1_training.artifacts import save_serving_artifacts
+    from src.phase1_training.imbalance import balancing_weights
+
+    df = load_frame(csv_path="data/creditcard.csv")
+    X, y = df[FEATURE_NAMES].to_numpy(dtype=np.float64), df['Class'].to_numpy()
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBClassifier(objective='binary:logistic', n_estimators=trees, max_depth=depth,
+                              learning_rate=0.05, tree_method="hist", random_state=42)
+    model.fit(scaler.transform(X), y, sample_weight=balancing_weights(y))
+    save_serving_artifacts(models_dir, model, scaler, X[:20_000], y[:20_000])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=0, help="Train and export a model of this size first.")
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--child", choices=("joblib", "bundle"), help=argparse.SUPPRESS)
+    parser.add_argument("--models-dir", default=MODELS_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.models_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models_dir = MODELS_DIR
+        if args.trees:
+            print(f"Training and exporting a {args.trees}-tree, depth-{args.depth} model...")
+            models_dir = tmp
+            export_large_model(models_dir, args.trees, args.depth)
+        if not os.path.exists(os.path.join(models_dir, "bundle", "CURRENT")):
+            print(f"❌ Error: No artifact bundle in {models_dir}. Run train_model.py first.")
+            sys.exit(1)
+        bundle_mb = sum(os.path.getsize(os.path.join(root, name))
+                        for root, _, names in os.walk(os.path.join(models_dir, "bundle")) for name in names) / 1e6
+        print(f"Bundle on disk: {bundle_mb:.1f} MB (all kept versions)")
+
+        print(f"\n{args.workers} workers per format")
+        print(f"{'format':<8} {'load s':>8} {'+RSS MB':>9} {'private MB':>11} {'PSS MB':>8} {'total PSS MB':>13} "
+              f"{'mapped RSS MB':>14} {'mapped PSS MB':>14}")
+        failed = False
+        for fmt in ("joblib", "bundle"):
+            # Started one after another, so load times are not skewed by contention.
+            workers, reports = [], []
+            for _ in range(args.workers):
+                workers.append(subprocess.Popen([sys.executable, __file__, "--child", fmt, "--models-dir", models_dir],
+                                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+                reports.append(read_report(workers[-1]))
+            memory = [memory_kb(worker.pid) for worker in workers]
+            mapped = [mapped_kb(worker.pid, os.path.join(models_dir, "bundle")) for worker in workers]
+            for worker in workers:
+                worker.stdin.close()
+                worker.wait()
+            expected = "ScalerArrays" if fmt == "bundle" else "StandardScaler"
+            failed |= any(report["scaler"] != expected for report in reports)
+            load = sorted(report["load_seconds"] for report in reports)[len(reports) // 2]
+            added = sum(report["loaded_kb"] for report in reports) / len(reports) / 1024
+            private = sum(m["private"] for m in memory) / len(memory) / 1024
+            pss = sum(m["pss"] for m in memory) / 1024
+            mapped_rss = sum(m["rss"] for m in mapped) / len(mapped) / 1024
+            mapped_pss = sum(m["pss"] for m in mapped) / len(mapped) / 1024
+            print(f"{fmt:<8} {load:>8.3f} {added:>9.1f} {private:>11.1f} {pss / len(memory):>8.1f} {pss:>13.1f} "
+                  f"{mapped_rss:>14.2f} {mapped_pss:>14.2f}")
+    if failed:
+        print("❌ A worker did not load the expected format.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
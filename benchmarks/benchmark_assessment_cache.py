@@ -0,0 +1,87 @@
+"""
+Latency of the assessment cache tiers and of replayed agent assessments.
+
+Times a miss + put, a memory hit and a disk hit (after a simulated restart)
+of src/common/assessment_cache.py on a temporary SQLite file. Then replays
+the same transactions twice through GatedRiskAssessmentAgent with every
+transaction escalated to the local fake LLM, with and without the cache,
+and prints the cache counters. Needs no API key. Run from the project root
+after Phase 1:
+
+    python benchmarks/benchmark_assessment_cache.py --rows 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeRiskLLM
+from src.common.assessment_cache import AssessmentCache
+from src.common.features import N_FEATURES
+from src.phase2_agent.risk_assessment_agent import (
+    PROMPT_VERSION,
+    GatedRiskAssessmentAgent,
+    create_escalation_agent,
+    model_registry,
+)
+
+VALUE = {"output": "**Risk Assessment:** NO FRAUD DETECTED\n**Confidence:** Medium\n"
+                   "**Recommendation:** Approve Transaction\n**Justification:** ..."}
+
+
+def per_call_us(fn, rows):
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def tier_report(path):
+    rows = np.random.default_rng(42).normal(size=(2000, N_FEATURES))
+    versions = (model_registry.get().scoring_version, PROMPT_VERSION)
+    cache = AssessmentCache(path)
+    print("--- Cache tiers (µs per call) ---")
+    print(f"{'miss + put':<22} {per_call_us(lambda r: cache.get(r, *versions) or cache.put(r, *versions, VALUE), rows):>8.1f}")
+    print(f"{'memory hit':<22} {per_call_us(lambda r: cache.get(r, *versions), rows):>8.1f}")
+    restarted = AssessmentCache(path)
+    print(f"{'disk hit (restart)':<22} {per_call_us(lambda r: restarted.get(r, *versions), rows):>8.1f}")
+    print(f"Counters after restart: {restarted.stats()}")
+
+
+def replay_report(path, rows, latency_ms):
+    transactions = [",".join(repr(v) for v in row)
+                    for row in np.random.default_rng(7).normal(size=(rows, N_FEATURES)).tolist()]
+    print(f"\n--- Replaying {rows} escalated transactions twice (fake LLM {latency_ms:.0f} ms/call) ---")
+    for name, cache in (("no cache", None), ("cache", AssessmentCache(path))):
+        llm = FakeRiskLLM(latency_s=latency_ms / 1000)
+        agent = create_escalation_agent(llm)
+        agent.verbose = False
+        # A [0, 1] band escalates every transaction to the LLM.
+        gate = GatedRiskAssessmentAgent(agent=agent, low=0.0, high=1.0, cache=cache)
+        start = time.perf_counter()
+        for _ in range(2):
+            for details in transactions:
+                gate.invoke({"input": details})
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} LLM calls={llm.calls:<5} {elapsed / (2 * rows) * 1000:>8.1f} ms per assessment")
+        if cache is not None:
+            print(f"Counters: {cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20, help="Transactions to replay.")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Fake LLM delay per call.")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        tier_report(os.path.join(tmp, "tiers.sqlite"))
+        replay_report(os.path.join(tmp, "replay.sqlite"), args.rows, args.llm_latency_ms)
+
+
+if __name__ == "__main__":
+    main()
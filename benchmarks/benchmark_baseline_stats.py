@@ -0,0 +1,91 @@
+"""
+Size and load time of the training baseline statistics
+(src/common/baseline.py) against reading the training data for them.
+
+Computes the baseline from the dataset (the whole file stands in for the
+test split here), writes it, and times a cold load of the JSON file
+against what the dashboard did before: the `Amount` column from
+creditcard.csv, and from the columnar cache. Also checks that the saved
+histograms and class counts add up to the rows they were computed from,
+and that the edges rebuilt from each histogram's range reproduce its counts.
+Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_baseline_stats.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.baseline import compute_baseline, histogram_edges, load_baseline, save_baseline
+from src.common.dataset_cache import DATA_FILE, load_columns
+from src.common.features import FEATURE_NAMES
+from src.common.model_registry import get_model_registry
+
+
+def timed(function, repeats) -> float:
+    """Milliseconds per call (best of `repeats`)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--csv", default=DATA_FILE)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    columns = load_columns(FEATURE_NAMES + ["Class"], csv_path=args.csv)
+    features = np.column_stack([columns[name] for name in FEATURE_NAMES]).astype(np.float64)
+    scores = get_model_registry().get().predict_proba(features)
+    start = time.perf_counter()
+    stats = compute_baseline(features, columns["Class"], scores)
+    compute_ms = (time.perf_counter() - start) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline_stats.json")
+        save_baseline(stats, path)
+        size_kb = os.path.getsize(path) / 1024
+        baseline_ms = timed(lambda: load_baseline(path), args.repeats)
+        loaded = load_baseline(path)
+    csv_ms = timed(lambda: pd.read_csv(args.csv, usecols=["Amount"]), args.repeats)
+    cache_ms = timed(lambda: load_columns(["Amount"], csv_path=args.csv)["Amount"].sum(), args.repeats)
+
+    print(f"Baseline of {len(features):,} rows: computed in {compute_ms:.0f} ms, {size_kb:.1f} KB")
+    print(f"{'source':<32} {'load ms':>9}")
+    print(f"{'baseline_stats.json':<32} {baseline_ms:>9.2f}")
+    print(f"{'Amount from the columnar cache':<32} {cache_ms:>9.2f}")
+    print(f"{'Amount from creditcard.csv':<32} {csv_ms:>9.2f}")
+
+    failed = False
+    columns = [*zip(FEATURE_NAMES, features.T), ("score", scores)]
+    for name, values in columns:
+        column = loaded["score"] if name == "score" else loaded["features"][name]
+        histogram = column["histogram"]
+        if sum(histogram["counts"]) + histogram["below"] + histogram["above"] != column["count"]:
+            print(f"❌ The {name} histogram does not add up to {column['count']} rows.")
+            failed = True
+        edges = histogram_edges(histogram)
+        inside = values[(values >= edges[0]) & (values <= edges[-1])]
+        if np.histogram(inside, edges)[0].tolist() != histogram["counts"]:
+            print(f"❌ The rebuilt {name} edges do not reproduce its counts.")
+            failed = True
+    if sum(loaded["class_counts"].values()) != len(features) or sum(loaded["score"]["probability_counts"]) != len(features):
+        print("❌ Class or probability counts do not add up to the rows.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
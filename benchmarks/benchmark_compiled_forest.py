@@ -0,0 +1,110 @@
+"""
+Parity and latency of the compiled and fused forests against XGBoost.
+
+Rebuilds Phase 1's held-out test split, checks that the compiled forest
+reproduces `predict_proba` on it (whole split, row by row, odd batch sizes
+and with missing values) and that the fused forest, given raw features,
+matches scaler + model. Then times single-row and batch inference for
+each evaluator. Exits non-zero if any parity check fails. Run from the
+project root after Phase 1:
+
+    python benchmarks/benchmark_compiled_forest.py
+"""
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.compiled_forest import CompiledForest, check_parity
+from src.common.dataset_cache import load_frame
+
+MODEL_PATH = "models/xgb_fraud_detector.joblib"
+SCALER_PATH = "models/scaler.joblib"
+DATA_FILE = "data/creditcard.csv"
+
+
+def load_test_split():
+    """The exact test split used by train_model.py."""
+    df = load_frame(csv_path=DATA_FILE)
+    X, y = df.drop('Class', axis=1), df['Class']
+    _, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return X_test.to_numpy(dtype=np.float64)
+
+
+def time_per_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def run_parity_checks(forest, model, X):
+    rng = np.random.default_rng(42)
+    with_missing = X.copy()
+    with_missing[rng.random(X.shape) < 0.05] = np.nan
+    checks = {"test split": check_parity(forest, model, X)}
+    checks["missing values (5%)"] = check_parity(forest, model, with_missing)
+    rows = rng.choice(len(X), size=min(500, len(X)), replace=False)
+    single = [check_parity(forest, model, X[i:i + 1]) for i in rows]
+    checks["single rows"] = {
+        "rows": len(single),
+        "max_abs_diff": max(c["max_abs_diff"] for c in single),
+        "decision_mismatches": sum(c["decision_mismatches"] for c in single),
+        "passed": all(c["passed"] for c in single),
+    }
+    for size in (2, 7, 64, 1000):
+        checks[f"batch of {size}"] = check_parity(forest, model, X[:size])
+    return checks
+
+
+def main():
+    model = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    X_raw = load_test_split()
+    X_test = (X_raw - scaler.mean_) / scaler.scale_
+    forest = CompiledForest.from_booster(model.get_booster())
+    fused = forest.fold_scaler(scaler.mean_, scaler.scale_)
+    print(f"Compiled {len(forest.roots)} trees, {len(forest.feature)} nodes, max depth {forest.max_depth}.")
+
+    print("\n--- Parity vs XGBClassifier.predict_proba ---")
+    checks = run_parity_checks(forest, model, X_test)
+    checks["fused (raw input)"] = check_parity(fused, model, X_test, forest_features=X_raw)
+    for name, result in checks.items():
+        status = "✅" if result["passed"] else "❌"
+        print(f"{status} {name:<22} rows={result['rows']:<7} max|Δp|={result['max_abs_diff']:.2e} "
+              f"decision mismatches={result['decision_mismatches']}")
+
+    print("\n--- Latency ---")
+    row = X_test[:1]
+    print(f"{'batch':>8} {'xgboost':>14} {'compiled':>14} {'speedup':>8}")
+    for size, repeats in ((1, 2000), (64, 500), (len(X_test), 5)):
+        batch = X_test[:size] if size > 1 else row
+        xgb_time = time_per_call(lambda b=batch: model.predict_proba(b), repeats)
+        compiled_time = time_per_call(lambda b=batch: forest.predict_proba(b), repeats)
+        print(f"{size:>8} {xgb_time * 1e6:>11.1f} µs {compiled_time * 1e6:>11.1f} µs "
+              f"{xgb_time / compiled_time:>7.2f}x")
+
+    print("\n--- Single-row serving path (raw features in) ---")
+    columns = scaler.feature_names_in_
+    paths = {
+        "DataFrame + scaler + XGBoost": (
+            lambda: model.predict(scaler.transform(pd.DataFrame(X_raw[:1], columns=columns)))
+        ),
+        "scale + compiled": lambda: forest.predict_proba((X_raw[:1] - scaler.mean_) / scaler.scale_),
+        "fused": lambda: fused.predict_proba(X_raw[:1]),
+    }
+    for name, fn in paths.items():
+        print(f"{name:<30} {time_per_call(fn, 1000) * 1e6:>9.1f} µs")
+
+    if not all(result["passed"] for result in checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
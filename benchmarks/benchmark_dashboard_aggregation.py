@@ -0,0 +1,170 @@
+"""
+Cost of what the Phase 5 dashboard reads and draws at --events-per-day
+traffic (src/common/metrics.py, src/common/downsample.py).
+
+1. Recording: time per request to count an assessment into the per-minute
+   buckets.
+2. A synthetic day of traffic is counted into --workers processes' buckets
+   and ring buffers and written as their snapshot files. A full read and
+   merge of them is compared with an incremental read of the last minutes,
+   and the merged counts are checked against the events sent.
+3. Incremental refresh: a day read once and then refreshed minute by minute
+   must equal a full read at the end.
+4. Drawing: per-minute p50/p95/p99 for the whole day, and LTTB of the
+   recent latencies and of a --line-points series to --chart-points.
+
+    python benchmarks/benchmark_dashboard_aggregation.py --events-per-day 10000000 --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.downsample import lttb
+from src.common.metrics import (
+    BUCKET_COUNT,
+    BUCKET_SECONDS,
+    LATENCY_BOUNDS_MS,
+    ServingMetrics,
+    TimeBuckets,
+    append_minutes,
+    histogram_quantiles,
+    load_snapshots,
+    merge_snapshots,
+)
+
+# Assessments counted per add() call when simulating a day, like a batch request.
+EVENTS_PER_CALL = 16
+
+
+def timed(function, repeats=5) -> float:
+    """Milliseconds per call (best of `repeats`)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def recording_cost_us(iterations=500_000) -> float:
+    buckets = TimeBuckets()
+    latencies = np.random.default_rng(0).gamma(2, 0.5, iterations).tolist()
+    now = time.time()
+    start = time.perf_counter()
+    for i, latency in enumerate(latencies):
+        buckets.add(now + i * 1e-4, latency, 1, 0, 0)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def simulate_day(workers, events_per_day, first_minute, minutes, rng) -> list:
+    """One ServingMetrics per worker with `minutes` minutes of traffic and a full ring buffer."""
+    processes = []
+    calls_per_minute = max(1, events_per_day // (BUCKET_COUNT * workers * EVENTS_PER_CALL))
+    for _ in range(workers):
+        metrics = ServingMetrics()
+        for minute in range(minutes):
+            now = first_minute + minute * BUCKET_SECONDS
+            latencies = rng.gamma(2, 2 + (minute % 60) / 20, calls_per_minute).tolist()
+            for latency in latencies:
+                metrics.minutes.add(now, latency, EVENTS_PER_CALL, int(latency > 15), 0)
+        n = metrics.recent.capacity
+        metrics.recent.extend(timestamp=np.sort(first_minute + rng.random(n) * minutes * BUCKET_SECONDS),
+                              latency_ms=rng.gamma(2, 2, n), probability=rng.random(n),
+                              fraud=rng.random(n) < 0.002, error=False, amount=rng.gamma(1, 90, n))
+        processes.append(metrics)
+    return processes, calls_per_minute * EVENTS_PER_CALL * minutes * workers
+
+
+def minutes_read_at(snapshots, newest, since=None) -> dict:
+    """The merged minutes of `snapshots` as if read when `newest` was the current minute, from `since` on."""
+    cut = []
+    for snapshot in snapshots:
+        minutes = snapshot["minutes"]
+        keep = [i for i, start in enumerate(minutes["start"]) if start <= newest and (since is None or start >= since)]
+        cut.append({**snapshot, "minutes": {name: [values[i] for i in keep] if isinstance(values, list) else values
+                                            for name, values in minutes.items()}})
+    return merge_snapshots(cut)["minutes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events-per-day", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chart-points", type=int, default=1000)
+    parser.add_argument("--line-points", type=int, default=10_000_000, help="Points of the long LTTB series.")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    failed = False
+
+    print(f"Recording into the per-minute buckets: {recording_cost_us():.2f} µs per call")
+
+    # 2. A day of snapshots.
+    first_minute = (int(time.time()) // BUCKET_SECONDS - BUCKET_COUNT + 1) * BUCKET_SECONDS
+    start = time.perf_counter()
+    processes, events = simulate_day(args.workers, args.events_per_day, first_minute, BUCKET_COUNT, rng)
+    print(f"\nSimulated {events:,} events over {BUCKET_COUNT} minutes in {args.workers} workers "
+          f"({time.perf_counter() - start:.1f} s)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for metrics in processes:
+            path = metrics.write_snapshot(tmp)
+            os.replace(path, os.path.join(tmp, f"api-{id(metrics)}.json"))
+        size_mb = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)) / 1e6
+        since = first_minute + (BUCKET_COUNT - 2) * BUCKET_SECONDS
+        full_ms = timed(lambda: merge_snapshots(load_snapshots(tmp)))
+        incremental_ms = timed(lambda: merge_snapshots(load_snapshots(tmp, since=since)))
+        merged = merge_snapshots(load_snapshots(tmp))
+    day_kb = len(json.dumps(processes[0].snapshot(recent=False))) / 1024
+    new_kb = len(json.dumps(processes[0].snapshot(recent=False, since=since))) / 1024
+    print(f"Snapshot files: {size_mb:.1f} MB in total (mostly the ring buffers), independent of traffic")
+    print(f"/metrics?format=json&recent=false per process: {day_kb:.0f} KB for the whole day, "
+          f"{new_kb:.1f} KB with since= the last 2 minutes")
+    print(f"Read + merge of the files: {full_ms:.0f} ms for the whole day, {incremental_ms:.0f} ms for the "
+          f"last 2 minutes")
+    minutes = merged["minutes"]
+    if minutes["assessed"].sum() != events or minutes["latency_counts"].sum() != events:
+        print(f"❌ The merged minutes counted {minutes['assessed'].sum():,} events, expected {events:,}.")
+        failed = True
+
+    # 3. Incremental refresh: the first half of the day, then one minute at a time.
+    half = BUCKET_COUNT // 2
+    day = [metrics.snapshot(recent=False) for metrics in processes]
+    history = minutes_read_at(day, first_minute + half * BUCKET_SECONDS)
+    start = time.perf_counter()
+    for minute in range(half + 1, BUCKET_COUNT):
+        since = int(history["start"][-1]) - BUCKET_SECONDS
+        history = append_minutes(history, minutes_read_at(day, first_minute + minute * BUCKET_SECONDS, since), since)
+    refresh_ms = (time.perf_counter() - start) * 1000 / (BUCKET_COUNT - half - 1)
+    full = minutes_read_at(day, first_minute + (BUCKET_COUNT - 1) * BUCKET_SECONDS)
+    same = all(np.array_equal(history[name], full[name]) for name in full)
+    print(f"Incremental refresh: {refresh_ms:.1f} ms per refresh (incl. slicing), same as a full read: {same}")
+    failed |= not same
+
+    # 4. Drawing.
+    quantiles_ms = timed(lambda: [histogram_quantiles(LATENCY_BOUNDS_MS, minutes["latency_counts"], q)
+                                  for q in (0.5, 0.95, 0.99)])
+    recent = merged["recent"]
+    recent_ms = timed(lambda: lttb(recent["timestamp"], recent["latency_ms"], args.chart_points))
+    x = np.arange(args.line_points, dtype=np.float64)
+    y = rng.normal(size=args.line_points).cumsum()
+    spike = args.line_points // 3
+    y[spike] += 1000
+    line_ms = timed(lambda: lttb(x, y, args.chart_points), repeats=2)
+    print(f"\np50/p95/p99 for {len(minutes['start']):,} minutes: {quantiles_ms:.2f} ms")
+    print(f"LTTB {len(recent['timestamp']):,} recent latencies -> {args.chart_points:,} points: {recent_ms:.1f} ms")
+    print(f"LTTB {args.line_points:,} points -> {args.chart_points:,} points: {line_ms:.0f} ms")
+    if spike not in lttb(x, y, args.chart_points):
+        print("❌ LTTB dropped the spike.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
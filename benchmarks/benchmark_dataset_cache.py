@@ -0,0 +1,88 @@
+"""
+Load time of creditcard.csv vs the columnar .npy cache.
+
+Copies the CSV into a temporary directory, builds the cache there with
+src/common/dataset_cache.py and compares:
+- reading every column (training) and only `Amount` (monitoring dashboard)
+  from the CSV with pandas and from the memory-mapped cache;
+- that every cached column is bit-identical to what pandas parses;
+- that a touched-but-unchanged CSV still uses the cache and an edited CSV
+  falls back to the CSV.
+
+Run from the project root after downloading the data:
+
+    python benchmarks/benchmark_dataset_cache.py
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.dataset_cache import build_dataset_cache, cache_status, load_columns, load_frame
+
+DATA_FILE = "data/creditcard.csv"
+
+
+def best_of(fn, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def check(name, passed):
+    print(f"{'✅' if passed else '❌'} {name}")
+    return passed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "creditcard.csv")
+        shutil.copy2(DATA_FILE, csv_path)
+        start = time.perf_counter()
+        manifest = build_dataset_cache(csv_path)
+        print(f"Built cache for {manifest['rows']} rows x {len(manifest['columns'])} columns "
+              f"in {time.perf_counter() - start:.2f} s")
+
+        print("\n--- Load time (s, best of 3) ---")
+        print(f"{'':<22} {'CSV':>8} {'cache':>8}")
+        # Summing forces the memory-mapped pages to actually be read.
+        full = (best_of(lambda: pd.read_csv(csv_path).to_numpy().sum()),
+                best_of(lambda: load_frame(csv_path=csv_path).to_numpy().sum()))
+        amount = (best_of(lambda: pd.read_csv(csv_path, usecols=["Amount"])["Amount"].sum()),
+                  best_of(lambda: load_columns(["Amount"], csv_path)["Amount"].sum()))
+        for name, (csv_s, cache_s) in (("all columns", full), ("Amount only", amount)):
+            print(f"{name:<22} {csv_s:>8.3f} {cache_s:>8.3f}   ({csv_s / cache_s:.0f}x)")
+
+        print()
+        expected = pd.read_csv(csv_path)
+        cached = load_frame(csv_path=csv_path)
+        ok = check("Cached columns are identical to the CSV",
+                   list(cached.columns) == list(expected.columns)
+                   and all(np.array_equal(cached[c].to_numpy(), expected[c].to_numpy())
+                           and cached[c].dtype == expected[c].dtype for c in expected.columns))
+        os.utime(csv_path)
+        ok &= check("Touched but unchanged CSV keeps the cache", cache_status(csv_path) == "fresh")
+        with open(csv_path, "a") as f:
+            f.write(",".join(["0"] * (len(expected.columns) - 1) + ["1"]) + "\n")
+        with contextlib.redirect_stdout(io.StringIO()) as warning:
+            reloaded = load_columns(["Class"], csv_path)["Class"]
+        ok &= check("Edited CSV is detected as stale and read instead",
+                    cache_status(csv_path) == "stale" and len(reloaded) == len(expected) + 1
+                    and "stale" in warning.getvalue())
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
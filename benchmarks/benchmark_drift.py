@@ -0,0 +1,158 @@
+"""
+Speed and accuracy of the drift sketches (src/common/drift.py).
+
+The dataset is split in half: a reference sketch is fitted on one half
+(features and the current model's fraud probabilities), and the other half
+is replayed as --hours hours of live traffic, in prediction-log-sized
+segments, into --workers per-process sketches. Reports:
+
+1. Cost: fitting the reference, rows/second into a live sketch, merging
+   the workers' sketches, and computing PSI/KS/Jensen-Shannon for all 31
+   columns over the whole range and over the last hour.
+2. Mergeability: the merged sketch must equal one sketch fed every row.
+3. Accuracy: the binned KS statistic against the exact two-sample KS.
+4. Detection: without a shift no column may reach PSI 0.1; after shifting
+   Amount (x2) and V14 (+1 standard deviation) both must.
+
+Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_drift.py --hours 24 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy.stats import ks_2samp
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.dataset_cache import load_columns
+from src.common.drift import (
+    DRIFT_COLUMNS,
+    N_BINS,
+    WINDOW_SECONDS,
+    DriftReference,
+    DriftSketch,
+    drift_scores,
+)
+from src.common.features import FEATURE_NAMES
+from src.common.model_registry import get_model_registry
+
+SEGMENT_ROWS = 4096
+SHIFTS = {"Amount": lambda column: column * 2, "V14": lambda column: column + column.std()}
+
+
+def replay(reference, values, timestamps, workers) -> list:
+    """Feeds `values` into `workers` sketches, round-robin by segment; returns the sketches."""
+    sketches = [reference.new_sketch() for _ in range(workers)]
+    for i, start in enumerate(range(0, len(values), SEGMENT_ROWS)):
+        rows = slice(start, start + SEGMENT_ROWS)
+        sketches[i % workers].update(timestamps[rows], values[rows])
+    return sketches
+
+
+def merged(sketches) -> DriftSketch:
+    result = DriftSketch(sketches[0].cuts, sketches[0].window_seconds, len(sketches[0].window_starts))
+    for sketch in sketches:
+        result.merge(sketch)
+    return result
+
+
+def timed(function, repeats=20) -> float:
+    """Milliseconds per call (best of `repeats`)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=int, default=24, help="Hours the live half is spread over.")
+    parser.add_argument("--workers", type=int, default=4, help="Per-process sketches to merge.")
+    args = parser.parse_args()
+
+    columns = load_columns(FEATURE_NAMES)
+    features = np.column_stack([columns[name] for name in FEATURE_NAMES]).astype(np.float64)
+    scores = get_model_registry().get().predict_proba(features)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(features))
+    reference_rows, live_rows = order[: len(order) // 2], order[len(order) // 2:]
+
+    start = time.perf_counter()
+    reference = DriftReference.fit(features[reference_rows], scores[reference_rows])
+    print(f"Reference: {len(reference_rows):,} rows x {len(DRIFT_COLUMNS)} columns, {N_BINS} bins, "
+          f"fitted in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    live = np.column_stack([features[live_rows], scores[live_rows]])
+    # Starts on a window boundary so the replay fills exactly hours * 3600 / WINDOW_SECONDS windows.
+    now = time.time()
+    first = (now // WINDOW_SECONDS + 1) * WINDOW_SECONDS - args.hours * 3600
+    timestamps = np.linspace(first, now, len(live), endpoint=False)
+    failed = False
+
+    # 1. and 2. Cost and mergeability.
+    start = time.perf_counter()
+    sketches = replay(reference, live, timestamps, args.workers)
+    update_seconds = time.perf_counter() - start
+    single = replay(reference, live, timestamps, 1)[0]
+    combined = merged(sketches)
+    merge_ms = timed(lambda: merged(sketches))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "drift.npz")
+        save_ms = timed(lambda: combined.save(path), repeats=5)
+        load_ms = timed(lambda: DriftSketch.load(path), repeats=5)
+        snapshot_kb = os.path.getsize(path) / 1024
+    all_ms = timed(lambda: drift_scores(reference.counts, combined.window_counts()))
+    hour_ms = timed(lambda: drift_scores(reference.counts, combined.window_counts(start=now - 3600)))
+    print(f"Live sketch: {combined.counts.nbytes / 1024:.0f} KB in memory whatever the traffic, "
+          f"{snapshot_kb:.0f} KB on disk (save {save_ms:.1f} ms, load {load_ms:.1f} ms)")
+    print(f"Update: {len(live) / update_seconds:,.0f} rows/s in {SEGMENT_ROWS}-row segments")
+    print(f"Merge {args.workers} sketches: {merge_ms:.2f} ms")
+    print(f"PSI + KS + JS for {len(DRIFT_COLUMNS)} columns: {all_ms:.2f} ms over {args.hours} h, "
+          f"{hour_ms:.2f} ms over the last hour")
+    if not np.array_equal(combined.counts, single.counts):
+        print("❌ The merged sketch differs from a single sketch of every row.")
+        failed = True
+    expected = np.isfinite(live).sum(axis=0)
+    if not np.array_equal(combined.window_counts().sum(axis=1), expected):
+        print("❌ The sketch lost rows.")
+        failed = True
+
+    # 3. Accuracy of the binned KS statistic.
+    unshifted = drift_scores(reference.counts, combined.window_counts())
+    reference_values = np.column_stack([features[reference_rows], scores[reference_rows]])
+    exact = np.array([ks_2samp(reference_values[:, c], live[:, c]).statistic for c in range(len(DRIFT_COLUMNS))])
+    print(f"\nBinned KS vs exact two-sample KS: max difference {np.max(np.abs(unshifted['ks'] - exact)):.4f} "
+          f"(exact max {exact.max():.4f})")
+
+    # 4. Detection.
+    shifted = live.copy()
+    for name, shift in SHIFTS.items():
+        c = DRIFT_COLUMNS.index(name)
+        shifted[:, c] = shift(shifted[:, c])
+    drifted = drift_scores(reference.counts, merged(replay(reference, shifted, timestamps, args.workers))
+                           .window_counts())
+    print(f"\n{'column':<8} {'PSI':>8} {'KS':>8} {'JS':>8} {'shifted PSI':>12} {'KS':>8} {'JS':>8}")
+    for c in np.argsort(-drifted["psi"])[:6]:
+        print(f"{DRIFT_COLUMNS[c]:<8} {unshifted['psi'][c]:>8.4f} {unshifted['ks'][c]:>8.4f} "
+              f"{unshifted['js'][c]:>8.4f} {drifted['psi'][c]:>12.4f} {drifted['ks'][c]:>8.4f} "
+              f"{drifted['js'][c]:>8.4f}")
+    if np.nanmax(unshifted["psi"]) >= 0.1:
+        print("❌ A column drifted without a shift.")
+        failed = True
+    missed = [name for name in SHIFTS if drifted["psi"][DRIFT_COLUMNS.index(name)] < 0.1]
+    if missed:
+        print(f"❌ Shifted column(s) {missed} were not detected.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
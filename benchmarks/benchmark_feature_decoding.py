@@ -0,0 +1,66 @@
+"""
+Transaction decoding: the old per-request path against src/common/features.py.
+
+The old path is what every fraud_detection_tool used to do: split, float()
+each value, then wrap the row in a fresh pandas DataFrame. Uses rows from
+data/creditcard.csv if present, otherwise random rows. Run from the
+project root:
+
+    python benchmarks/benchmark_feature_decoding.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.features import FEATURE_NAMES, decode_transaction, decode_transactions
+
+DATA_FILE = "data/creditcard.csv"
+N_ROWS = 10000
+
+
+def load_rows():
+    if os.path.exists(DATA_FILE):
+        values = pd.read_csv(DATA_FILE, nrows=N_ROWS, usecols=FEATURE_NAMES)[FEATURE_NAMES].to_numpy()
+    else:
+        values = np.random.default_rng(42).normal(size=(N_ROWS, len(FEATURE_NAMES)))
+    return [",".join(repr(v) for v in row) for row in values.tolist()]
+
+
+def old_path(transaction_details):
+    features = np.array([float(val) for val in transaction_details.split(',')])
+    col_names = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+    return pd.DataFrame([features], columns=col_names)
+
+
+def per_row_us(fn, rows):
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def main():
+    rows = load_rows()
+    print(f"--- Single row ({len(rows)} rows, µs per row) ---")
+    print(f"{'split + float + DataFrame':<32} {per_row_us(old_path, rows):>8.2f}")
+    print(f"{'decode_transaction':<32} {per_row_us(decode_transaction, rows):>8.2f}")
+
+    print("\n--- Batch (µs per row) ---")
+    start = time.perf_counter()
+    pd.concat([old_path(row) for row in rows[:1000]])
+    print(f"{'old path, concatenated (1k rows)':<32} {(time.perf_counter() - start) / 1000 * 1e6:>8.2f}")
+    for size in (64, 1000, len(rows)):
+        batch = rows[:size]
+        out = np.empty((size, len(FEATURE_NAMES)))
+        start = time.perf_counter()
+        decode_transactions(batch, out=out)
+        print(f"{f'decode_transactions ({size} rows)':<32} {(time.perf_counter() - start) / size * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Equivalence and per-request overhead of the two triage graph engines.
+
+Runs the LangGraph engine and FastTriageApp on the same inputs (valid rows,
+rows from data/creditcard.csv if present, malformed input, and inputs
+already triaged upstream like the API's micro-batcher sends) and checks
+that every final state is identical. Then times `invoke` per request, both
+end to end and on pre-triaged input, where only the engine itself runs.
+Exits non-zero if any state differs. Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_graph_engines.py
+"""
+import contextlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.dataset_cache import load_frame
+from src.common.features import FEATURE_NAMES
+from src.phase3_graph.risk_assessment_graph import get_graph_app
+
+DATA_FILE = "data/creditcard.csv"
+N_ROWS = 500
+
+
+def load_inputs():
+    if os.path.exists(DATA_FILE):
+        df = load_frame(csv_path=DATA_FILE)
+        # Include every fraud row we can, so both branches are exercised.
+        rows = pd.concat([df[df['Class'] == 1].head(N_ROWS // 2), df.head(N_ROWS // 2)])
+        values = rows[FEATURE_NAMES].to_numpy()
+    else:
+        values = np.random.default_rng(42).normal(size=(N_ROWS, len(FEATURE_NAMES)))
+    inputs = [{"transaction_details": ",".join(repr(v) for v in row)} for row in values.tolist()]
+    inputs += [{"transaction_details": row} for row in values[:20].tolist()]
+    inputs += [
+        {"transaction_details": "1,2,3"},
+        {"transaction_details": "a" + ",1" * 29},
+        {"transaction_details": "nan" + ",1" * 29},
+        {"transaction_details": ""},
+        {"transaction_details": "x", "triage_result": "FRAUD", "fraud_probability": 0.9},
+        {"transaction_details": "x", "triage_result": "NOT FRAUD", "fraud_probability": 0.1},
+        {"transaction_details": "x", "triage_result": "Error: upstream failure"},
+        {"transaction_details": "x", "not_in_state": 1},
+    ]
+    return inputs
+
+
+def per_request_us(app, inputs, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for state in inputs:
+            app.invoke(state)
+    return (time.perf_counter() - start) / (repeats * len(inputs)) * 1e6
+
+
+def main():
+    engines = {name: get_graph_app(name) for name in ("langgraph", "fast")}
+    inputs = load_inputs()
+
+    # The graph nodes log every step; keep that out of the output.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = {name: [app.invoke(dict(state)) for state in inputs] for name, app in engines.items()}
+        mismatches = [
+            (state, expected, actual)
+            for state, expected, actual in zip(inputs, results["langgraph"], results["fast"])
+            if expected != actual
+        ]
+        pre_triaged = [{**state, **result} for state, result in zip(inputs, results["langgraph"])
+                       if "fraud_probability" in result]
+        timings = {
+            name: (per_request_us(app, inputs), per_request_us(app, pre_triaged, repeats=10))
+            for name, app in engines.items()
+        }
+
+    decisions = [r.get("final_recommendation", r["triage_result"]) for r in results["fast"]]
+    print(f"--- Equivalence ({len(inputs)} inputs) ---")
+    for outcome in sorted(set(decisions)):
+        print(f"{decisions.count(outcome):>6}  {outcome}")
+    status = "✅" if not mismatches else "❌"
+    print(f"{status} {len(inputs) - len(mismatches)}/{len(inputs)} final states identical")
+    for state, expected, actual in mismatches[:5]:
+        print(f"   input={state}\n   langgraph={expected}\n   fast={actual}")
+
+    print("\n--- Per-request invoke (µs) ---")
+    print(f"{'engine':<12} {'end to end':>12} {'pre-triaged':>12}")
+    for name, (full, overhead) in timings.items():
+        print(f"{name:<12} {full:>12.1f} {overhead:>12.1f}")
+    full_saving = timings["langgraph"][0] - timings["fast"][0]
+    print(f"\nFast path saves {full_saving:.1f} µs per request "
+          f"({timings['langgraph'][1] / timings['fast'][1]:.0f}x less engine overhead).")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Wall time of the parallel hyperparameter search vs number of worker processes.
+
+Prepares the training data the way train_model.py does in search mode
+(scaled, SMOTE on the fit part, real class balance in the validation part)
+and runs the same random search from
+src/phase1_training/hyperparameter_search.py with 1, 2, 4, ... workers.
+Prints wall time and speedup per worker count and checks that every run
+picks the same best trial. Speedup is bounded by the number of CPU cores.
+Run from the project root after downloading the data:
+
+    python benchmarks/benchmark_hyperparameter_search.py --trials 8 --workers 1,2,4
+"""
+import argparse
+import os
+import sys
+import time
+
+from imblearn.over_sampling import SMOTE
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.dataset_cache import load_frame
+from src.phase1_training.hyperparameter_search import best_trial, run_search
+
+DATA_FILE = "data/creditcard.csv"
+
+
+def search_data():
+    df = load_frame(csv_path=DATA_FILE)
+    X, y = df.drop('Class', axis=1), df['Class']
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train = StandardScaler().fit_transform(X_train)
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
+    )
+    X_fit, y_fit = SMOTE(random_state=42).fit_resample(X_fit, y_fit)
+    return X_fit, y_fit.to_numpy(), X_val, y_val.to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=8, help="Random-search candidates.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts.")
+    parser.add_argument("--max-estimators", type=int, default=300, help="Boosting rounds per trial.")
+    args = parser.parse_args()
+
+    X_fit, y_fit, X_val, y_val = search_data()
+    print(f"{len(X_fit)} fit rows ({X_fit.nbytes / 1e6:.0f} MB shared with every worker), "
+          f"{len(X_val)} validation rows, {os.cpu_count()} CPU cores")
+    print(f"\n{'workers':>8} {'wall s':>8} {'speedup':>8}  best trial")
+    baseline, bests = None, set()
+    for workers in (int(w) for w in args.workers.split(",")):
+        start = time.perf_counter()
+        results = run_search(X_fit, y_fit, X_val, y_val, strategy="random", n_trials=args.trials,
+                             workers=workers, max_estimators=args.max_estimators)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        best = best_trial(results)
+        bests.add((best["trial"], round(best["val_auprc"], 6)))
+        print(f"{workers:>8} {elapsed:>8.2f} {baseline / elapsed:>7.2f}x  "
+              f"#{best['trial']} {best['params']} AUPRC {best['val_auprc']:.4f}")
+
+    status = "✅" if len(bests) == 1 else "❌"
+    print(f"\n{status} Every worker count picked the same best trial.")
+    if len(bests) != 1:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Time and AUPRC of each class-imbalance strategy.
+
+Trains the train_model.py model on the same split with every strategy in
+src/phase1_training/imbalance.py (full SMOTE, class weights, partial SMOTE
+with a KD-tree index, undersampling ensemble) and prints resampling time,
+fit time, training rows and test AUPRC. Each strategy is also logged as an
+MLflow child run under one "imbalance-strategies" run, so speed and quality
+can be compared in `mlflow ui`. Run from the project root after downloading
+the data:
+
+    python benchmarks/benchmark_imbalance_strategies.py
+"""
+import os
+import sys
+
+import mlflow
+import xgboost as xgb
+from sklearn.metrics import auc, precision_recall_curve
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.dataset_cache import load_frame
+from src.phase1_training.imbalance import STRATEGIES, fit_with_strategy
+
+DATA_FILE = "data/creditcard.csv"
+MODEL_PARAMS = dict(objective='binary:logistic', eval_metric='logloss', n_estimators=100,
+                    learning_rate=0.1, max_depth=3, random_state=42)
+
+
+def main():
+    df = load_frame(csv_path=DATA_FILE)
+    X, y = df.drop('Class', axis=1), df['Class']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    mlflow.set_experiment("Credit Card Fraud Detection")
+    print(f"{'strategy':<22} {'resample s':>11} {'fit s':>8} {'train rows':>11} {'AUPRC':>8}")
+    with mlflow.start_run(run_name="imbalance-strategies"):
+        for strategy in STRATEGIES:
+            model, info = fit_with_strategy(
+                lambda **overrides: xgb.XGBClassifier(**{**MODEL_PARAMS, **overrides}),
+                X_train_scaled, y_train, strategy=strategy, n_estimators=MODEL_PARAMS["n_estimators"],
+            )
+            precision, recall, _ = precision_recall_curve(y_test, model.predict_proba(X_test_scaled)[:, 1])
+            auprc = auc(recall, precision)
+            with mlflow.start_run(run_name=strategy, nested=True):
+                mlflow.log_params({"imbalance_strategy": strategy, **MODEL_PARAMS})
+                mlflow.log_metrics({"imbalance_resample_seconds": info["resample_seconds"],
+                                    "fit_seconds": info["fit_seconds"], "train_rows": info["train_rows"],
+                                    "auprc": auprc})
+            print(f"{strategy:<22} {info['resample_seconds']:>11.2f} {info['fit_seconds']:>8.2f} "
+                  f"{info['train_rows']:>11} {auprc:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
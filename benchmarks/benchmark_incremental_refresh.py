@@ -0,0 +1,103 @@
+"""
+Incremental refresh vs full retraining on a new batch of labeled data.
+
+Splits the data in time order into history (first 70%), a new batch (next
+20%) and evaluation rows (last 10%). A base model is trained on the history
+as train_model.py would. Then, on the evaluation rows, it compares:
+
+- retraining from scratch on history + batch;
+- src/phase1_training/refresh_model.py appending trees for the batch, with
+  the scaler reused and with its running statistics updated.
+
+Also checks that remapping the base model's thresholds to an updated
+scaler leaves its predictions unchanged. Run from the project root after
+downloading the data:
+
+    python benchmarks/benchmark_incremental_refresh.py --rounds 20
+"""
+import argparse
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.dataset_cache import load_frame
+from src.common.features import FEATURE_NAMES
+from src.phase1_training.artifacts import save_serving_artifacts
+from src.phase1_training.imbalance import fit_with_strategy
+from src.phase1_training.refresh_model import (
+    auprc,
+    refresh_model,
+    remap_thresholds,
+    scale,
+)
+
+DATA_FILE = "data/creditcard.csv"
+MODEL_PARAMS = dict(objective='binary:logistic', eval_metric='logloss', n_estimators=100,
+                    learning_rate=0.1, max_depth=3, random_state=42)
+
+
+def train_from_scratch(X, y):
+    """The train_model.py recipe; returns (model, scaler, seconds)."""
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X)
+    model, _ = fit_with_strategy(lambda **overrides: xgb.XGBClassifier(**{**MODEL_PARAMS, **overrides}),
+                                 scaler.transform(X), y, n_estimators=MODEL_PARAMS["n_estimators"])
+    return model, scaler, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20, help="Trees appended by the refresh.")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    df = load_frame(csv_path=DATA_FILE)
+    X, y = df[FEATURE_NAMES].to_numpy(dtype=np.float64), df['Class'].to_numpy()
+    history, batch = int(len(X) * 0.7), int(len(X) * 0.9)
+    X_history, y_history = X[:history], y[:history]
+    X_batch, y_batch = X[history:batch], y[history:batch]
+    X_eval, y_eval = X[batch:], y[batch:]
+    print(f"history {len(X_history)} rows, batch {len(X_batch)} rows, evaluation {len(X_eval)} rows")
+
+    base_model, base_scaler, base_seconds = train_from_scratch(X_history, y_history)
+    print(f"\n{'model':<28} {'seconds':>8} {'AUPRC':>8}")
+    print(f"{'base (history only)':<28} {base_seconds:>8.2f} "
+          f"{auprc(y_eval, base_model.predict_proba(base_scaler.transform(X_eval))[:, 1]):>8.4f}")
+    full_model, full_scaler, full_seconds = train_from_scratch(X[:batch], y[:batch])
+    print(f"{'full retrain':<28} {full_seconds:>8.2f} "
+          f"{auprc(y_eval, full_model.predict_proba(full_scaler.transform(X_eval))[:, 1]):>8.4f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = os.path.join(tmp, "base")
+        save_serving_artifacts(base_dir, base_model, base_scaler, X_eval, y_eval)
+        for name, update_scaler in (("refresh (same scaler)", False), ("refresh (updated scaler)", True)):
+            models_dir = os.path.join(tmp, name)
+            shutil.copytree(base_dir, models_dir)
+            result = refresh_model(X_batch, y_batch, X_eval, y_eval, models_dir=models_dir,
+                                   rounds=args.rounds, update_scaler=update_scaler, promote=False)
+            print(f"{name:<28} {result['refresh_seconds']:>8.2f} {result['refreshed_auprc']:>8.4f}")
+
+    new_scaler = copy.deepcopy(base_scaler).partial_fit(X_batch)
+    remapped = remap_thresholds(base_model.get_booster(), base_scaler, new_scaler)
+    before = base_model.predict_proba(base_scaler.transform(X_eval))[:, 1]
+    after = remapped.predict(xgb.DMatrix(scale(new_scaler, X_eval)))
+    mismatches = int(np.sum((before > 0.5) != (after > 0.5)))
+    ok = mismatches == 0 and float(np.max(np.abs(before - after))) < 1e-3
+    print(f"\n{'✅' if ok else '❌'} Remapped thresholds: max |diff| {np.max(np.abs(before - after)):.2e}, "
+          f"{mismatches} decision mismatches on {len(X_eval)} rows.")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
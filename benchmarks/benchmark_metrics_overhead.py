@@ -0,0 +1,146 @@
+"""
+Cost of the API's in-process metrics (src/common/metrics.py).
+
+First times the recording calls a /assess-transaction request makes (request
+histogram, node histograms, one assessment into the ring buffer) in a tight
+loop. Then starts the API with SENTINEL_METRICS=0 and =1 in turn, drives
+/assess-transaction with concurrent clients and compares requests/second
+and latency percentiles. With metrics on, it also checks that /metrics
+counted exactly the requests that were sent. Run from the project root
+after Phase 1:
+
+    python benchmarks/benchmark_metrics_overhead.py --requests 3000 --clients 8
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.metrics import ServingMetrics
+
+LEGIT_TRANSACTION = "0.0,-1.3598071336738,-0.0727811733593648,2.53634673796914,1.37815522427443,-0.338320769942518,0.462387777762292,0.23959855406126,0.0986979012610507,0.363786969611215,0.0907941719789316,-0.551599533260813,-0.617800855762348,-0.991389847235408,-0.311169353699879,1.46817697209427,-0.470400525259478,0.207971241929242,0.0257905801985591,0.403992960255733,0.251412098239705,-0.018306777944153,0.277837575558899,-0.110473910188767,0.0669280749146731,0.128539358273528,-0.189114843888824,0.133558376740387,-0.0210530534538215,149.62"
+ENDPOINT = "/assess-transaction"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def recording_cost_us(iterations=200_000) -> float:
+    """Microseconds of recording per request, as the API does it for one transaction."""
+    metrics = ServingMetrics()
+    batcher, triage, legitimate = (metrics.node_histogram(node)
+                                   for node in ("micro_batcher", "triage_node", "legitimate_node"))
+    rng = np.random.default_rng(0)
+    latencies = rng.gamma(2, 0.5, iterations).tolist()
+    probabilities = rng.random(iterations).tolist()
+    start = time.perf_counter()
+    for latency, probability in zip(latencies, probabilities):
+        batcher.observe(latency)
+        triage.observe(latency)
+        legitimate.observe(latency)
+        metrics.record_assessment(latency, probability, fraud=probability > 0.5, amount=149.62)
+        metrics.record_request(ENDPOINT, latency, 200)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def start_server(port, extra_env):
+    env = {**os.environ, **extra_env}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.phase4_app.api:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return server, url
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API server did not become ready within 120 seconds.")
+
+
+def run_load(url, clients, total):
+    """Sends `total` requests from `clients` threads; returns (req/s, latencies ms, errors)."""
+    per_client = total // clients
+
+    def client(_):
+        session = requests.Session()
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            start = time.perf_counter()
+            response = session.post(f"{url}{ENDPOINT}", json={"transaction_details": LEGIT_TRANSACTION}, timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([r[0] for r in results])
+    return len(latencies) / elapsed, latencies, sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per run.")
+    parser.add_argument("--rounds", type=int, default=2, help="Runs per setting, alternating off/on.")
+    parser.add_argument("--env", action="append", default=[],
+                        help="Extra server environment, e.g. --env SENTINEL_GRAPH_ENGINE=fast.")
+    args = parser.parse_args()
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    # Without the cache every request runs the whole workflow, which is what is measured here.
+    extra_env.setdefault("SENTINEL_API_CACHE", "0")
+    extra_env.setdefault("SENTINEL_METRICS_SNAPSHOT_INTERVAL", "0")
+
+    print(f"Recording cost: {recording_cost_us():.2f} µs per request "
+          f"(3 node observations, 1 request, 1 assessment)")
+
+    sent = args.requests // args.clients * args.clients
+    print(f"\n{args.clients} clients, {sent} requests per run")
+    print(f"{'metrics':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    results = {"off": [], "on": []}
+    failed = False
+    for _ in range(args.rounds):
+        for setting in ("off", "on"):
+            server, url = start_server(free_port(), {**extra_env, "SENTINEL_METRICS": "1" if setting == "on" else "0"})
+            try:
+                run_load(url, min(args.clients, 4), 100)  # warmup
+                throughput, latencies, errors = run_load(url, args.clients, args.requests)
+                snapshot = requests.get(f"{url}/metrics", params={"format": "json", "recent": "false"}).json()
+            finally:
+                server.terminate()
+                server.wait()
+            results[setting].append(throughput)
+            print(f"{setting:<8} {throughput:>8.1f} {np.percentile(latencies, 50):>8.2f} "
+                  f"{np.percentile(latencies, 99):>8.2f} {errors:>7}")
+            if setting == "on":
+                counted = snapshot["requests"][ENDPOINT]["count"]
+                if counted != sent + 100 or snapshot["assessments"]["total"] != counted:
+                    print(f"❌ /metrics counted {counted} requests and {snapshot['assessments']['total']} "
+                          f"assessments, expected {sent + 100}.")
+                    failed = True
+    off, on = np.median(results["off"]), np.median(results["on"])
+    print(f"\nMedian throughput: {off:.1f} req/s off, {on:.1f} req/s on ({(on - off) / off:+.1%})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
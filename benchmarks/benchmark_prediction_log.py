@@ -0,0 +1,124 @@
+"""
+Cost of the API's prediction log (src/common/prediction_log.py), and how
+fast it can be scanned.
+
+1. Request path: time per `log()` call while the writer thread runs, and
+   with the queue full (the call must stay just as fast and count drops).
+2. Writer: rows/second and bytes/row for single-transaction entries.
+3. Scans: a synthetic log of --hours hours (--rows-per-hour rows each,
+   written as batches) is read back whole, one column only, and one hour
+   only, and the row counts are checked.
+4. Retention: pruning with a --hours / 2 hour window must delete exactly
+   the partitions that ended before it.
+
+    python benchmarks/benchmark_prediction_log.py --hours 24 --rows-per-hour 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.common.features import N_FEATURES
+from src.common.prediction_log import FRAUD, NOT_FRAUD, PredictionLog, list_partitions, load_predictions
+
+VERSION = "0123456789ab"
+
+
+def directory_bytes(path) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def time_logging(log, rows, n) -> float:
+    """Microseconds per `log()` call."""
+    start = time.perf_counter()
+    for i in range(n):
+        log.log(rows[i % len(rows)], 0.01, NOT_FRAUD, VERSION, 1.5)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def timed_scan(label, expected_rows, **kwargs):
+    start = time.perf_counter()
+    columns = load_predictions(**kwargs)
+    seconds = time.perf_counter() - start
+    rows = len(next(iter(columns.values())))
+    print(f"{label:<34} {rows:>10,} rows {len(columns):>4} columns {seconds * 1000:>9.1f} ms")
+    return rows == expected_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000, help="log() calls timed on the request path.")
+    parser.add_argument("--hours", type=int, default=24, help="Hours of synthetic log to scan.")
+    parser.add_argument("--rows-per-hour", type=int, default=20_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    rows = list(rng.standard_normal((1000, N_FEATURES)))
+    failed = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 1. Request path, with the writer thread flushing in the background.
+        log = PredictionLog(os.path.join(tmp, "live"), queue_size=args.calls, flush_seconds=0.05)
+        log.start()
+        per_call = time_logging(log, rows, args.calls)
+        start = time.perf_counter()
+        log.stop()
+        print(f"log() with the writer running:  {per_call:.2f} µs per call")
+        print(f"Writer: {log.written_rows:,} rows in {log.segments} segments, "
+              f"{log.written_rows / max(log.write_seconds, 1e-9):,.0f} rows/s of writer time, "
+              f"{directory_bytes(log.log_dir) / log.written_rows:.0f} bytes/row; "
+              f"stop() drained the rest in {(time.perf_counter() - start) * 1000:.0f} ms")
+        failed |= log.written_rows != args.calls
+
+        # With no writer the queue fills up; the calls must not slow down.
+        full = PredictionLog(os.path.join(tmp, "full"), queue_size=1000)
+        time_logging(full, rows, 1000)
+        per_call = time_logging(full, rows, args.calls)
+        print(f"log() with the queue full:      {per_call:.2f} µs per call, {full.dropped_rows:,} rows dropped")
+        failed |= full.dropped_rows != args.calls
+
+        # 3. Scans over a synthetic multi-hour log.
+        scan_dir = os.path.join(tmp, "scan")
+        writer = PredictionLog(scan_dir)
+        first_hour = (int(time.time()) // 3600 - args.hours) * 3600
+        batch_rows = 1000
+        for hour in range(args.hours):
+            for offset in range(0, args.rows_per_hour, batch_rows):
+                n = min(batch_rows, args.rows_per_hour - offset)
+                probabilities = rng.random(n)
+                writer.log_batch(rng.standard_normal((n, N_FEATURES)), probabilities,
+                                 np.where(probabilities > 0.5, FRAUD, NOT_FRAUD), VERSION, 2.0,
+                                 timestamp=first_hour + hour * 3600 + offset * 3600 / args.rows_per_hour)
+            writer.flush()
+        total = args.hours * args.rows_per_hour
+        print(f"\nScanning {total:,} rows over {args.hours} hourly partitions "
+              f"({directory_bytes(scan_dir) / 1e6:.1f} MB)")
+        failed |= not timed_scan("all columns, all hours", total, log_dir=scan_dir)
+        failed |= not timed_scan("Amount + probability, all hours", total, log_dir=scan_dir,
+                                 columns=["Amount", "probability"])
+        last_hour = first_hour + (args.hours - 1) * 3600
+        failed |= not timed_scan("all columns, last hour", args.rows_per_hour, log_dir=scan_dir,
+                                 start=last_hour, end=last_hour + 3600)
+        failed |= not timed_scan("Amount, last 30 minutes", args.rows_per_hour // 2, log_dir=scan_dir,
+                                 start=last_hour + 1800, columns=["Amount"])
+
+        # 4. Retention: keep the last half of the synthetic hours.
+        kept_hours = args.hours // 2
+        writer.retention_hours = kept_hours
+        start = time.perf_counter()
+        pruned = writer.prune(now=first_hour + args.hours * 3600)
+        remaining = len(list_partitions(scan_dir))
+        print(f"\nRetention of {kept_hours} hours: {pruned} partitions deleted, {remaining} left "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        failed |= pruned != args.hours - kept_hours or remaining != kept_hours
+    if failed:
+        print("❌ Row or partition counts did not match.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Throughput of the preforked server (src/phase4_app/serve.py) by worker count.
+
+Starts the server with 1, 2, 4, ... workers (and, for reference, the plain
+single-process `uvicorn src.phase4_app.api:app`), waits for /readyz, then
+drives /assess-transaction with a fixed number of concurrent clients. Prints
+requests/second, latency percentiles and the server's total PSS (the memory
+of the parent and all workers, with pages shared copy-on-write counted
+once). Throughput can only grow up to the number of cores, and the clients
+run on the same machine. Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_serving_workers.py --workers 1,2,4 --clients 16
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+LEGIT_TRANSACTION = "0.0,-1.3598071336738,-0.0727811733593648,2.53634673796914,1.37815522427443,-0.338320769942518,0.462387777762292,0.23959855406126,0.0986979012610507,0.363786969611215,0.0907941719789316,-0.551599533260813,-0.617800855762348,-0.991389847235408,-0.311169353699879,1.46817697209427,-0.470400525259478,0.207971241929242,0.0257905801985591,0.403992960255733,0.251412098239705,-0.018306777944153,0.277837575558899,-0.110473910188767,0.0669280749146731,0.128539358273528,-0.189114843888824,0.133558376740387,-0.0210530534538215,149.62"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, port, extra_env):
+    """workers=0 starts plain uvicorn; otherwise serve.py with that many workers."""
+    env = {**os.environ, **extra_env, "SENTINEL_HOST": "127.0.0.1", "SENTINEL_PORT": str(port)}
+    if workers:
+        env["SENTINEL_WORKERS"] = str(workers)
+        command = [sys.executable, "src/phase4_app/serve.py"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "src.phase4_app.api:app",
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return server, url
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Server did not become ready within 120 seconds.")
+
+
+def process_tree_pss_mb(pid) -> float:
+    """PSS of a process and its direct children, in MB."""
+    pids = [pid] + [int(entry) for entry in os.listdir("/proc") if entry.isdigit() and _ppid(entry) == pid]
+    total = 0
+    for child in pids:
+        try:
+            with open(f"/proc/{child}/smaps_rollup") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def _ppid(pid) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("PPid:"))
+    except (OSError, StopIteration):
+        return -1
+
+
+def run_load(url, clients, total):
+    """Sends `total` requests from `clients` threads; returns (req/s, latencies ms, errors)."""
+    per_client = total // clients
+
+    def client(_):
+        session = requests.Session()
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            start = time.perf_counter()
+            response = session.post(f"{url}/assess-transaction",
+                                    json={"transaction_details": LEGIT_TRANSACTION}, timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([r[0] for r in results])
+    return len(latencies) / elapsed, latencies, sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per run.")
+    parser.add_argument("--env", action="append", default=[],
+                        help="Extra server environment, e.g. --env SENTINEL_GRAPH_ENGINE=fast.")
+    args = parser.parse_args()
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    # Without the cache every request is scored, which is what is measured here.
+    extra_env.setdefault("SENTINEL_API_CACHE", "0")
+
+    print(f"{os.cpu_count()} CPU(s), {args.clients} clients, {args.requests} requests per run")
+    print(f"{'server':<16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'PSS MB':>8}")
+    for workers in [0] + [int(n) for n in args.workers.split(",")]:
+        server, url = start_server(workers, free_port(), extra_env)
+        try:
+            run_load(url, min(args.clients, 4), 100)  # warmup
+            throughput, latencies, errors = run_load(url, args.clients, args.requests)
+            pss = process_tree_pss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        name = f"serve.py x{workers}" if workers else "uvicorn (1 proc)"
+        print(f"{name:<16} {throughput:>8.1f} {np.percentile(latencies, 50):>8.2f} "
+              f"{np.percentile(latencies, 99):>8.2f} {errors:>7} {pss:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
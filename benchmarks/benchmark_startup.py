@@ -0,0 +1,98 @@
+"""
+Cold-start cost of the API and the Phase 2 agent.
+
+Measures, each in a fresh interpreter:
+- import time of src/phase4_app/api.py in the lazy and eager startup modes,
+  and of src/phase2_agent/risk_assessment_agent.py;
+- for a uvicorn server per configuration: time from process start until
+  /healthz answers, until /readyz reports ready, and until the first
+  /assess-transaction request (sent as soon as the port is open) returns a
+  complete assessment.
+
+Run from the project root after Phase 1:
+
+    python benchmarks/benchmark_startup.py
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+CONFIGS = (
+    ("eager, langgraph", {"SENTINEL_STARTUP_MODE": "eager", "SENTINEL_GRAPH_ENGINE": "langgraph"}),
+    ("lazy, langgraph", {"SENTINEL_STARTUP_MODE": "lazy", "SENTINEL_GRAPH_ENGINE": "langgraph"}),
+    ("lazy, fast", {"SENTINEL_STARTUP_MODE": "lazy", "SENTINEL_GRAPH_ENGINE": "fast"}),
+)
+TRANSACTION = [0.0] * 29 + [149.62]
+
+
+def import_seconds(module, env):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], env={**os.environ, **env}, check=True,
+        capture_output=True, text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def poll(fn, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if fn():
+                return time.perf_counter()
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError("API server did not start in time.")
+
+
+def server_timings(env):
+    """Seconds from spawn to healthy, to the first good response, and to ready."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.phase4_app.api:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "SENTINEL_API_CACHE": "0", **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = start + 120
+    try:
+        healthy = poll(lambda: requests.get(f"{url}/healthz", timeout=1).ok, deadline)
+        first = poll(lambda: "decision" in requests.post(
+            f"{url}/assess-transaction", json={"transaction_details": TRANSACTION}, timeout=60
+        ).json(), deadline)
+        ready = poll(lambda: requests.get(f"{url}/readyz", timeout=1).ok, deadline)
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy - start, first - start, ready - start
+
+
+def main():
+    print("--- Import time (s) ---")
+    for name, env in CONFIGS[:2]:
+        print(f"{'api (' + name.split(',')[0] + ')':<34} {import_seconds('src.phase4_app.api', env):>8.2f}")
+    agent_env = {"SENTINEL_STARTUP_MODE": "lazy"}
+    print(f"{'risk_assessment_agent':<34} "
+          f"{import_seconds('src.phase2_agent.risk_assessment_agent', agent_env):>8.2f}")
+
+    print("\n--- Server start (s from process spawn) ---")
+    print(f"{'config':<20} {'/healthz':>10} {'1st response':>13} {'/readyz':>10}")
+    for name, env in CONFIGS:
+        healthy, first, ready = server_timings(env)
+        print(f"{name:<20} {healthy:>10.2f} {first:>13.2f} {ready:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
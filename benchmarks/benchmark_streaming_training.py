@@ -0,0 +1,115 @@
+"""
+Peak memory and wall time: in-memory training vs out-of-core streaming training.
+
+Writes a synthetic dataset `--scale` times the size of data/creditcard.csv
+(its rows repeated with a little noise on V1-V28, chunk by chunk) and trains
+on the original and on the synthetic data, each in a fresh process:
+
+- in-memory: the train_model.py recipe (read_csv, train_test_split,
+  StandardScaler, SMOTE on the whole split, XGBClassifier.fit);
+- streaming: src/phase1_training/train_streaming.py (chunked reads,
+  partial_fit scaler, external-memory DMatrix, class weights).
+
+Prints peak RSS, wall time and test AUPRC of each. Run from the project root
+after downloading the data:
+
+    python benchmarks/benchmark_streaming_training.py --scale 10
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DATA_FILE = "data/creditcard.csv"
+CHUNK_ROWS = 50_000
+
+
+def write_synthetic(path, scale):
+    """The source rows `scale` times over, with noise on the PCA features; one chunk in memory at a time."""
+    rng = np.random.default_rng(42)
+    noisy = [f"V{i}" for i in range(1, 29)]
+    with open(path, "w") as f:
+        for copy in range(scale):
+            for i, chunk in enumerate(pd.read_csv(DATA_FILE, chunksize=CHUNK_ROWS)):
+                if copy:
+                    chunk[noisy] += rng.normal(scale=0.05, size=(len(chunk), len(noisy)))
+                chunk.to_csv(f, header=copy == 0 and i == 0, index=False)
+
+
+def train_in_memory(csv_path):
+    import xgboost as xgb
+    from imblearn.over_sampling import SMOTE
+    from sklearn.metrics import auc, precision_recall_curve
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.read_csv(csv_path)
+    X, y = df.drop('Class', axis=1), df['Class']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_resampled, y_resampled = SMOTE(random_state=42).fit_resample(X_train_scaled, y_train)
+    model = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', n_estimators=100,
+                              learning_rate=0.1, max_depth=3, random_state=42)
+    model.fit(X_resampled, y_resampled)
+    precision, recall, _ = precision_recall_curve(y_test, model.predict_proba(scaler.transform(X_test))[:, 1])
+    return auc(recall, precision)
+
+
+def train_out_of_core(csv_path):
+    from src.phase1_training.train_streaming import train_streaming
+
+    with tempfile.TemporaryDirectory() as models_dir:
+        return train_streaming(csv_path, models_dir, chunk_rows=CHUNK_ROWS)["auprc"]
+
+
+def child(mode, csv_path):
+    warnings.filterwarnings("ignore")
+    start = time.perf_counter()
+    auprc = (train_in_memory if mode == "in-memory" else train_out_of_core)(csv_path)
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "auprc": auprc,
+    }))
+
+
+def run(mode, csv_path):
+    output = subprocess.run([sys.executable, __file__, "--child", mode, csv_path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="Size of the synthetic dataset in copies of the CSV.")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, f"creditcard_x{args.scale}.csv")
+        write_synthetic(synthetic, args.scale)
+        print(f"{'dataset':<10} {'mode':<10} {'rows':>10} {'peak RSS MB':>12} {'wall s':>8} {'AUPRC':>7}")
+        for label, path in (("1x", DATA_FILE), (f"{args.scale}x", synthetic)):
+            rows = sum(1 for _ in open(path)) - 1
+            for mode in ("in-memory", "streaming"):
+                result = run(mode, path)
+                print(f"{label:<10} {mode:<10} {rows:>10} {result['peak_rss_mb']:>12.0f} "
+                      f"{result['seconds']:>8.1f} {result['auprc']:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
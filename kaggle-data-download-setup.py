@@ -13,6 +13,7 @@ KAGGLE_JSON_FILE = PROJECT_ROOT / "kaggle.json"
 os.environ['KAGGLE_CONFIG_DIR'] = str(PROJECT_ROOT)
 
 DATA_DIR = PROJECT_ROOT / "data"
+DATA_FILE = DATA_DIR / "creditcard.csv"
 DATASET_NAME = "mlg-ulb/creditcardfraud"
 
 def check_kaggle_credentials():
@@ -76,9 +77,20 @@ def download_and_unzip_dataset():
         sys.exit(1)
 
 
+def build_columnar_cache():
+    """Converts the CSV into typed, memory-mappable .npy columns for training and monitoring."""
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from src.common.dataset_cache import default_cache_dir, ensure_dataset_cache
+
+    print("Checking the columnar dataset cache...")
+    result = ensure_dataset_cache(str(DATA_FILE))
+    print(f"Columnar cache {result}: {default_cache_dir(str(DATA_FILE))}")
+
+
 if __name__ == "__main__":
     print("--- Starting Project Setup ---")
     check_kaggle_credentials()
     download_and_unzip_dataset()
+    build_columnar_cache()
     print("--- Project Setup Complete ---")
 
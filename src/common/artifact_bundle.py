@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+import time
+from typing import Optional
+
+import numpy as np
+
+from src.common.calibration import ProbabilityCalibrator
+from src.common.checksums import file_sha1
+from src.common.compiled_forest import CompiledForest
+from src.common.features import FEATURE_NAMES
+
+# --- 1. Configuration ---
+# models/bundle/<version>/ holds one immutable bundle; CURRENT names the live one.
+BUNDLE_DIR = "models/bundle"
+CURRENT_FILE = "CURRENT"
+MANIFEST_NAME = "manifest.json"
+MODEL_FILE = "model.ubj"
+FORMAT_VERSION = 1
+# Older versions kept next to the live one; a worker still mapping a removed
+# version keeps its pages until it reloads.
+KEEP_VERSIONS = int(os.getenv("SENTINEL_BUNDLE_KEEP_VERSIONS", "3"))
+
+
+class ScalerArrays:
+    """
+    The part of a fitted StandardScaler that serving uses: `mean_` and
+    `scale_` as (memory-mapped) arrays, applied without scikit-learn.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+    def transform(self, features):
+        return (np.asarray(features, dtype=np.float64) - self.mean_) / self.scale_
+
+
+# --- 2. Writing a Bundle ---
+def write_artifact_bundle(model, scaler, forest: Optional[CompiledForest] = None,
+                          fused: Optional[CompiledForest] = None,
+                          calibrator: Optional[ProbabilityCalibrator] = None,
+                          bundle_dir: str = BUNDLE_DIR, model_sha1: Optional[str] = None) -> str:
+    """
+    Writes the serving artifacts as a bundle that every worker can map
+    instead of unpickling its own copy, and makes it the current one.
+    Returns its version (the first 12 hex digits of the model's SHA-1).
+
+    - the model in XGBoost's native UBJSON format;
+    - the scaler's mean and scale, and the arrays of the compiled forest,
+      fused forest and calibration map, as one `.npy` file each;
+    - a manifest with every file's SHA-1, the feature order and the
+      forests' scalar parameters. `model_sha1` records the joblib model the
+      bundle was exported alongside.
+
+    The bundle is written to a staging directory and renamed into
+    `<bundle_dir>/<version>/`, then CURRENT is replaced, so a reader only
+    ever sees complete bundles.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    staging_dir = os.path.join(bundle_dir, f".staging-{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    model.save_model(os.path.join(staging_dir, MODEL_FILE))
+    arrays = {"scaler_mean": scaler.mean_, "scaler_scale": scaler.scale_}
+    forests = {}
+    for name, candidate in (("compiled", forest), ("fused", fused)):
+        if candidate is None:
+            continue
+        arrays.update({f"{name}_{array}": getattr(candidate, array) for array in CompiledForest.ARRAYS})
+        forests[name] = {"base_margin": candidate.base_margin, "max_depth": candidate.max_depth}
+    if calibrator is not None:
+        arrays.update({"calibration_raw": calibrator.raw, "calibration_calibrated": calibrator.calibrated})
+
+    files = {MODEL_FILE: file_sha1(os.path.join(staging_dir, MODEL_FILE))}
+    for name, array in arrays.items():
+        path = os.path.join(staging_dir, f"{name}.npy")
+        np.save(path, np.ascontiguousarray(array))
+        files[f"{name}.npy"] = file_sha1(path)
+
+    version = files[MODEL_FILE][:12]
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "feature_names": list(FEATURE_NAMES),
+        "model_sha1": model_sha1,
+        "forests": forests,
+        "calibration": calibrator is not None,
+        "files": files,
+    }
+    with open(os.path.join(staging_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    version_dir = os.path.join(bundle_dir, version)
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(staging_dir, version_dir)
+    publish_version(bundle_dir, version)
+    return version
+
+
+def publish_version(bundle_dir: str, version: str):
+    """Points CURRENT at `<bundle_dir>/<version>/` via rename and prunes old versions."""
+    current_path = os.path.join(bundle_dir, CURRENT_FILE)
+    with open(f"{current_path}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{current_path}.tmp", current_path)
+
+    others = [name for name in os.listdir(bundle_dir)
+              if name != version and os.path.isfile(os.path.join(bundle_dir, name, MANIFEST_NAME))]
+    others.sort(key=lambda name: os.path.getmtime(os.path.join(bundle_dir, name, MANIFEST_NAME)), reverse=True)
+    for name in others[KEEP_VERSIONS:]:
+        shutil.rmtree(os.path.join(bundle_dir, name), ignore_errors=True)
+
+
+# --- 3. Loading a Bundle ---
+def current_version(bundle_dir: str = BUNDLE_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(bundle_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_bundle_manifest(bundle_dir: str = BUNDLE_DIR, version: Optional[str] = None) -> Optional[dict]:
+    version = version or current_version(bundle_dir)
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(bundle_dir, version, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format_version") == FORMAT_VERSION else None
+
+
+def load_artifact_bundle(bundle_dir: str = BUNDLE_DIR, version: Optional[str] = None,
+                         verify: bool = True) -> dict:
+    """
+    Loads the current (or the given) bundle. Returns {"manifest", "model",
+    "scaler", "forest", "fused", "calibrator"}; parts that were not exported
+    are None.
+
+    Every array is memory-mapped read-only, so processes serving the same
+    version share the pages instead of each holding a copy. Only the
+    XGBoost model is parsed into private memory; it has no mapped form.
+    With `verify`, every file is re-hashed against the manifest first and a
+    mismatch raises ValueError. Nothing is unpickled.
+    """
+    import xgboost as xgb
+
+    version = version or current_version(bundle_dir)
+    manifest = read_bundle_manifest(bundle_dir, version)
+    if manifest is None:
+        raise FileNotFoundError(f"No artifact bundle in '{bundle_dir}'.")
+    if manifest["feature_names"] != FEATURE_NAMES:
+        raise ValueError(f"Bundle {version} expects features {manifest['feature_names']}.")
+    version_dir = os.path.join(bundle_dir, version)
+    if verify:
+        for name, sha1 in manifest["files"].items():
+            if file_sha1(os.path.join(version_dir, name)) != sha1:
+                raise ValueError(f"{name} in bundle {version} does not match its manifest hash.")
+
+    def array(name):
+        # A plain ndarray view of the mapping, so indexing skips np.memmap's overhead.
+        return np.asarray(np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r"))
+
+    model = xgb.XGBClassifier()
+    model.load_model(os.path.join(version_dir, MODEL_FILE))
+    forests = {}
+    for name, params in manifest["forests"].items():
+        forests[name] = CompiledForest(**{key: array(f"{name}_{key}") for key in CompiledForest.ARRAYS},
+                                       base_margin=params["base_margin"], max_depth=params["max_depth"])
+    calibrator = None
+    if manifest["calibration"]:
+        calibrator = ProbabilityCalibrator(array("calibration_raw"), array("calibration_calibrated"))
+    return {
+        "manifest": manifest,
+        "model": model,
+        "scaler": ScalerArrays(array("scaler_mean"), array("scaler_scale")),
+        "forest": forests.get("compiled"),
+        "fused": forests.get("fused"),
+        "calibrator": calibrator,
+    }
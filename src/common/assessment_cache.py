@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+# --- 1. Configuration ---
+CACHE_DIR = "cache"
+# Entries kept in memory per cache; older ones are evicted least-recently-used first.
+CACHE_MAX_ENTRIES = int(os.getenv("SENTINEL_CACHE_MAX_ENTRIES", "10000"))
+# Seconds an assessment stays valid, in memory and on disk.
+CACHE_TTL_SECONDS = float(os.getenv("SENTINEL_CACHE_TTL_SECONDS", "86400"))
+
+
+def transaction_fingerprint(features: np.ndarray) -> str:
+    """
+    Hash of a decoded feature vector. Hashing the float64 values rather than
+    the request text makes "149.62", "149.620" and 149.62 the same
+    transaction; -0.0 is folded into 0.0 for the same reason.
+    """
+    values = np.ascontiguousarray(features, dtype='<f8') + 0.0
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+
+# --- 2. The Two-Tier Cache ---
+class AssessmentCache:
+    """
+    Caches assessments by transaction fingerprint, model version and prompt
+    version.
+
+    Lookups go to an in-memory LRU first and then to an SQLite file that
+    survives restarts (`path=None` keeps the cache in memory only). Both
+    tiers expire entries after `ttl_seconds`. The versions are part of every
+    entry: as soon as a lookup uses a different model or prompt version, every
+    entry made with another version is dropped from both tiers, so a
+    retrained model or an edited prompt never serves stale answers.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries=CACHE_MAX_ENTRIES,
+                 ttl_seconds=CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._versions = None
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                         "evictions": 0, "expirations": 0, "invalidations": 0, "write_errors": 0,
+                         "stale_writes": 0}
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = self._connection()
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS assessments ("
+                "key TEXT PRIMARY KEY, model_version TEXT, prompt_version TEXT, "
+                "created_at REAL, value TEXT)"
+            )
+            db.execute("DELETE FROM assessments WHERE created_at < ?",
+                       (time.time() - ttl_seconds,))
+
+    def _connection(self):
+        """The SQLite connection, opened on first use (again after `close`); None without a path."""
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # WAL keeps writes cheap and lets readers in other processes continue.
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        return self._db
+
+    def close(self):
+        """
+        Closes the SQLite connection; the next lookup reopens it. A process
+        that forks workers calls this first, so no connection is shared
+        across the fork.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get(self, features, model_version: str, prompt_version: str) -> Optional[dict]:
+        """Returns the cached assessment for this transaction and versions, or None."""
+        key = self._key(features, model_version, prompt_version)
+        now = time.time()
+        with self._lock:
+            self._check_versions(model_version, prompt_version)
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.counters["expirations"] += 1
+
+            db = self._connection()
+            if db is not None:
+                row = db.execute(
+                    "SELECT created_at, value FROM assessments WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    created_at, value = row[0], json.loads(row[1])
+                    if now - created_at < self.ttl_seconds:
+                        self._remember(key, created_at, value)
+                        self.counters["disk_hits"] += 1
+                        return value
+                    db.execute("DELETE FROM assessments WHERE key = ?", (key,))
+                    self.counters["expirations"] += 1
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, features, model_version: str, prompt_version: str, value: dict):
+        """
+        Stores a JSON-serializable assessment in both tiers. Only lookups
+        switch versions: a write made with other versions than the last
+        lookup (e.g. one that finished after a model reload) is dropped and
+        counted, so it neither invalidates the newer entries nor points the
+        cache back at the old versions.
+        """
+        key = self._key(features, model_version, prompt_version)
+        now = time.time()
+        with self._lock:
+            if self._versions is None:
+                self._check_versions(model_version, prompt_version)
+            elif (model_version, prompt_version) != self._versions:
+                self.counters["stale_writes"] += 1
+                return
+            self._remember(key, now, value)
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO assessments VALUES (?, ?, ?, ?, ?)",
+                    (key, model_version, prompt_version, now, json.dumps(value)),
+                )
+
+    def record_write_error(self):
+        """Counts a `put` that failed where no caller sees it, e.g. in a background thread."""
+        with self._lock:
+            self.counters["write_errors"] += 1
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters plus the size of each tier."""
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            disk_entries = None
+            db = self._connection()
+            if db is not None:
+                disk_entries = db.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+            return {
+                **self.counters,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM assessments")
+
+    @staticmethod
+    def _key(features, model_version, prompt_version) -> str:
+        return f"{transaction_fingerprint(features)}:{model_version}:{prompt_version}"
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _check_versions(self, model_version, prompt_version):
+        """Drops every entry made with other versions once new ones show up."""
+        versions = (model_version, prompt_version)
+        if versions == self._versions:
+            return
+        dropped = len(self._memory)
+        self._memory.clear()
+        db = self._connection()
+        if db is not None:
+            dropped = db.execute(
+                "DELETE FROM assessments WHERE model_version != ? OR prompt_version != ?", versions
+            ).rowcount
+        self.counters["invalidations"] += dropped
+        self._versions = versions
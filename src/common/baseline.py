@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from src.common.features import FEATURE_NAMES
+from src.common.metrics import PROBABILITY_BOUNDS
+
+# --- 1. Configuration ---
+BASELINE_PATH = "models/baseline_stats.json"
+# Equal-width bins per feature histogram, between the BIN_RANGE percentiles
+# (rows outside are counted as below/above, so outliers don't squash the bins).
+N_HISTOGRAM_BINS = 40
+BIN_RANGE = (0.5, 99.5)
+QUANTILES = (0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0)
+# Significant digits kept for floats, which keeps the file at about 15 KB.
+DIGITS = 6
+
+
+# --- 2. Computing the Baseline ---
+def _round(values):
+    return [float(f"{value:.{DIGITS}g}") for value in np.asarray(values, dtype=np.float64).tolist()]
+
+
+def column_stats(values) -> dict:
+    """Count, mean, variance, quantiles and a histogram of one column; NaNs are only counted."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return {"count": 0, "missing": int(len(values))}
+    low, high = np.percentile(finite, BIN_RANGE)
+    if high <= low:
+        low, high = finite.min(), finite.max() + 1.0
+    # Only the (rounded) range is stored; `histogram_edges` rebuilds the same edges.
+    low, high = _round([low, high])
+    edges = np.linspace(low, high, N_HISTOGRAM_BINS + 1)
+    inside = finite[(finite >= low) & (finite <= high)]
+    return {
+        "count": int(len(finite)),
+        "missing": int(len(values) - len(finite)),
+        "mean": _round([finite.mean()])[0],
+        "variance": _round([finite.var()])[0],
+        "quantiles": dict(zip([str(q) for q in QUANTILES], _round(np.quantile(finite, QUANTILES)))),
+        "histogram": {
+            "low": low,
+            "high": high,
+            "bins": N_HISTOGRAM_BINS,
+            "counts": np.histogram(inside, edges)[0].tolist(),
+            "below": int((finite < low).sum()),
+            "above": int((finite > high).sum()),
+        },
+    }
+
+
+def histogram_edges(histogram: dict) -> np.ndarray:
+    """The bins + 1 equal-width edges of a `column_stats` histogram."""
+    if "edges" in histogram:
+        # Baselines written before only the range was stored.
+        return np.asarray(histogram["edges"], dtype=np.float64)
+    return np.linspace(histogram["low"], histogram["high"], histogram["bins"] + 1)
+
+
+def probability_counts(probabilities) -> list:
+    """Counts per PROBABILITY_BOUNDS bucket (plus overflow), as the API's metrics count them."""
+    buckets = np.searchsorted(PROBABILITY_BOUNDS, np.asarray(probabilities, dtype=np.float64), side="left")
+    return np.bincount(buckets, minlength=len(PROBABILITY_BOUNDS) + 1).tolist()
+
+
+def compute_baseline(features, labels, scores) -> dict:
+    """
+    Baseline statistics of held-out data, for monitoring without the
+    dataset: `column_stats` of every feature and of the model's fraud
+    probability, the class rates, and the probabilities per class in the
+    same buckets as the API's probability histogram.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    labels = np.asarray(labels).astype(np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    return {
+        "created_at": time.time(),
+        "rows": int(len(labels)),
+        "fraud_rate": float(labels.mean()) if len(labels) else 0.0,
+        "class_counts": {"legitimate": int((labels == 0).sum()), "fraud": int((labels == 1).sum())},
+        "features": {name: column_stats(features[:, i]) for i, name in enumerate(FEATURE_NAMES)},
+        "score": {
+            **column_stats(scores),
+            "probability_bounds": list(PROBABILITY_BOUNDS),
+            "probability_counts": probability_counts(scores),
+            "probability_counts_by_class": {
+                "legitimate": probability_counts(scores[labels == 0]),
+                "fraud": probability_counts(scores[labels == 1]),
+            },
+        },
+    }
+
+
+# --- 3. Reading and Writing ---
+def save_baseline(stats: dict, path=BASELINE_PATH, **metadata):
+    """Writes the baseline as compact JSON via rename, with optional string metadata."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({**stats, "metadata": metadata}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_baseline(path=BASELINE_PATH) -> dict:
+    """The baseline written by `save_baseline`. Raises FileNotFoundError if there is none."""
+    with open(path) as f:
+        return json.load(f)
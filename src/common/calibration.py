@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+
+# --- 1. Configuration ---
+CALIBRATION_PATH = "models/probability_calibration.npz"
+
+
+# --- 2. The Calibrator ---
+class ProbabilityCalibrator:
+    """
+    Maps the model's fraud probability to a calibrated one.
+
+    The model is trained on SMOTE-balanced data, so its raw scores say
+    far more "fraud" than the real 0.17% fraud rate. This is an isotonic
+    (monotone, piecewise-linear) map fitted on held-out data that has the
+    real class balance, so a calibrated 0.9 means roughly 9 in 10 such
+    transactions are fraud. It is stored as two arrays and applied with
+    `np.interp`, so serving needs no scikit-learn call.
+    """
+
+    def __init__(self, raw, calibrated):
+        self.raw = np.asarray(raw, dtype=np.float64)
+        self.calibrated = np.asarray(calibrated, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, probabilities, labels) -> "ProbabilityCalibrator":
+        """Fits the map on raw probabilities and true labels of held-out rows."""
+        from sklearn.isotonic import IsotonicRegression
+
+        isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+        isotonic.fit(probabilities, labels)
+        return cls(isotonic.X_thresholds_, isotonic.y_thresholds_)
+
+    def __call__(self, probabilities):
+        """Calibrates a probability or an array of them."""
+        return np.interp(probabilities, self.raw, self.calibrated)
+
+    def save(self, path, **metadata):
+        """Writes the calibrator to an .npz file via rename, with optional string metadata."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, raw=self.raw, calibrated=self.calibrated, metadata=json.dumps(metadata))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a calibrator written by `save`. Returns (calibrator, metadata)."""
+        with np.load(path) as data:
+            calibrator = cls(data["raw"], data["calibrated"])
+            metadata = json.loads(str(data["metadata"]))
+        return calibrator, metadata
@@ -0,0 +1,14 @@
+import hashlib
+
+
+def file_sha1(path) -> str:
+    """
+    SHA-1 of a file's bytes, read in 1 MB chunks. Ties derived artifacts
+    (compiled forests, calibration, bundles, the dataset cache) to the exact
+    file they were made from.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,201 @@
+import json
+import os
+
+import numpy as np
+
+# --- 1. Configuration ---
+COMPILED_MODEL_PATH = "models/xgb_fraud_detector_compiled.npz"
+FUSED_MODEL_PATH = "models/xgb_fraud_detector_fused.npz"
+# Maximum allowed |p_compiled - p_xgboost| for an export to be accepted.
+PARITY_TOLERANCE = 1e-5
+
+
+# --- 2. The Compiled Forest ---
+class CompiledForest:
+    """
+    A trained XGBoost binary classifier flattened into NumPy arrays.
+
+    Every node of every tree is one slot in the flat arrays below. Leaves point
+    back at themselves, so walking all trees for `max_depth` steps always ends
+    on a leaf, and a whole batch is evaluated with a few vectorized gathers
+    instead of going through DMatrix construction and library dispatch.
+
+    Splits follow XGBoost exactly: features and thresholds are compared as
+    float32, `x < threshold` goes left and a missing (NaN) value takes the
+    node's default direction. A forest produced by `fold_scaler` keeps
+    float64 thresholds and compares in float64 instead.
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "default_left", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 base_margin, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Compiles an `xgboost.Booster` trained with `binary:logistic`."""
+        model = json.loads(booster.save_raw("json"))["learner"]
+        objective = model["objective"]["name"]
+        if objective != "binary:logistic":
+            raise ValueError(f"Only binary:logistic models can be compiled, got '{objective}'.")
+        if model["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("Only gbtree boosters can be compiled.")
+
+        # base_score is stored in probability space ("5E-1" or "[5E-1]").
+        base_score = float(model["learner_model_param"]["base_score"].strip("[]"))
+        base_margin = np.log(base_score / (1.0 - base_score))
+
+        trees = model["gradient_booster"]["model"]["trees"]
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        max_depth, offset = 0, 0
+        for tree in trees:
+            tree_left = np.asarray(tree["left_children"], dtype=np.int64)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int64)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            is_leaf = tree_left == -1
+            node_ids = np.arange(len(tree_left)) + offset
+
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            # For leaves XGBoost stores the leaf weight in `split_conditions`.
+            threshold.append(np.where(is_leaf, np.float32(0), conditions))
+            value.append(np.where(is_leaf, conditions, np.float32(0)))
+            left.append(np.where(is_leaf, node_ids, tree_left + offset))
+            right.append(np.where(is_leaf, node_ids, tree_right + offset))
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            roots.append(offset)
+            max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+            offset += len(tree_left)
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            base_margin=base_margin,
+            max_depth=max_depth,
+        )
+
+    def fold_scaler(self, mean, scale) -> "CompiledForest":
+        """
+        Returns an equivalent forest that takes unscaled features.
+
+        A split `(x - mean) / scale < t` is monotone in x, so it becomes
+        `x < t * scale + mean` for scale > 0. XGBoost compares the scaled
+        value after rounding it to float32, so the exact boundary is the
+        midpoint between `t` and the next float32 below it; that boundary is
+        mapped back to the raw feature space and kept in float64.
+        """
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        if np.any(scale <= 0):
+            raise ValueError("Only positive feature scales can be folded into the thresholds.")
+        is_split = self.left != np.arange(len(self.left))
+        t = self.threshold.astype(np.float32)
+        below = np.nextafter(t, np.float32(-np.inf))
+        boundary = (t.astype(np.float64) + below.astype(np.float64)) / 2.0
+        threshold = boundary * scale[self.feature] + mean[self.feature]
+        return CompiledForest(
+            feature=self.feature,
+            threshold=np.where(is_split, threshold, 0.0),
+            left=self.left,
+            right=self.right,
+            default_left=self.default_left,
+            value=self.value,
+            roots=self.roots,
+            base_margin=self.base_margin,
+            max_depth=self.max_depth,
+        )
+
+    def predict_margin(self, features: np.ndarray) -> np.ndarray:
+        """Returns the raw (log-odds) score of each row of an (n, n_features) matrix."""
+        x = np.asarray(features, dtype=self.threshold.dtype)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        n_rows, n_features = x.shape
+        flat = x.ravel()
+        if n_rows == 1:
+            # Single-row fast path: walk all trees as one 1-D node vector.
+            row_offsets, node = 0, self.roots
+        else:
+            row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+            node = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        has_missing = bool(np.isnan(flat).any())
+        for _ in range(self.max_depth):
+            x_node = flat[row_offsets + self.feature[node]]
+            go_left = x_node < self.threshold[node]
+            if has_missing:
+                go_left = np.where(np.isnan(x_node), self.default_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        margin = self.value[node].sum(axis=-1, dtype=np.float32) + np.float32(self.base_margin)
+        return margin.reshape(n_rows)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Returns the fraud probability of each row, like `predict_proba(X)[:, 1]`."""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(features).astype(np.float64)))
+
+    def save(self, path, **metadata):
+        """Writes the forest to an .npz file via rename, with optional string metadata."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            **{name: getattr(self, name) for name in self.ARRAYS},
+            base_margin=np.float64(self.base_margin),
+            max_depth=np.int64(self.max_depth),
+            metadata=json.dumps(metadata),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a forest written by `save`. Returns (forest, metadata)."""
+        with np.load(path) as data:
+            forest = cls(
+                **{name: data[name] for name in cls.ARRAYS},
+                base_margin=float(data["base_margin"]),
+                max_depth=int(data["max_depth"]),
+            )
+            metadata = json.loads(str(data["metadata"]))
+        return forest, metadata
+
+
+def _tree_depth(left, right):
+    """Depth of the deepest leaf of one tree given its child arrays."""
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [child for node in frontier if left[node] != -1 for child in (left[node], right[node])]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+# --- 3. Parity Check ---
+def check_parity(forest, model, features, tolerance=PARITY_TOLERANCE, forest_features=None) -> dict:
+    """
+    Compares the compiled forest with the XGBoost model. The model is given
+    `features` (already scaled); the forest gets `forest_features` if set,
+    e.g. the raw features for a fused forest. Returns the max absolute
+    probability difference, the number of rows whose FRAUD/NOT FRAUD
+    decision differs, and whether the export is within `tolerance`.
+    """
+    expected = model.predict_proba(features)[:, 1]
+    actual = forest.predict_proba(features if forest_features is None else forest_features)
+    max_abs_diff = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    decision_mismatches = int(np.sum((expected > 0.5) != (actual > 0.5)))
+    return {
+        "rows": int(len(expected)),
+        "max_abs_diff": max_abs_diff,
+        "decision_mismatches": decision_mismatches,
+        "passed": max_abs_diff <= tolerance and decision_mismatches == 0,
+    }
@@ -0,0 +1,182 @@
+import json
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.common.checksums import file_sha1
+
+# --- 1. Configuration ---
+DATA_FILE = "data/creditcard.csv"
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def default_cache_dir(csv_path: str) -> str:
+    """data/creditcard.csv is cached in data/creditcard_columns/."""
+    return f"{os.path.splitext(csv_path)[0]}_columns"
+
+
+# --- 2. Building the Cache ---
+def build_dataset_cache(csv_path: str = DATA_FILE, cache_dir: Optional[str] = None) -> dict:
+    """
+    Converts the CSV once into one typed `.npy` file per column plus a
+    manifest with the CSV's size, mtime and SHA-1, the row count and each
+    column's dtype and SHA-1. Returns the manifest.
+
+    The old manifest is removed first and the new one written last, so a
+    reader never pairs a manifest with half-written columns; column files
+    are replaced by rename, so arrays already memory-mapped stay valid.
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # The same parser training always used, so the cached values are identical.
+    df = pd.read_csv(csv_path)
+    stat = os.stat(csv_path)
+    columns = []
+    for name in df.columns:
+        values = np.ascontiguousarray(df[name].to_numpy())
+        path = os.path.join(cache_dir, f"{name}.npy")
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+        columns.append({"name": name, "dtype": values.dtype.str, "file": f"{name}.npy",
+                        "sha1": file_sha1(path)})
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "source": {"file": os.path.basename(csv_path), "size": stat.st_size,
+                   "mtime_ns": stat.st_mtime_ns, "sha1": file_sha1(csv_path)},
+        "rows": len(df),
+        "columns": columns,
+    }
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def read_manifest(cache_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format_version") == FORMAT_VERSION else None
+
+
+def cache_status(csv_path: str = DATA_FILE, cache_dir: Optional[str] = None) -> str:
+    """
+    "fresh", "missing" or "stale". The CSV's size and mtime are checked
+    first; only when the mtime changed (e.g. the same file downloaded again)
+    is the CSV re-hashed and compared with the manifest.
+    """
+    manifest = read_manifest(cache_dir or default_cache_dir(csv_path))
+    if manifest is None:
+        return "missing"
+    try:
+        stat = os.stat(csv_path)
+    except FileNotFoundError:
+        # The cache alone is enough to train or monitor on.
+        return "fresh"
+    source = manifest["source"]
+    if stat.st_size != source["size"]:
+        return "stale"
+    if stat.st_mtime_ns == source["mtime_ns"] or file_sha1(csv_path) == source["sha1"]:
+        return "fresh"
+    return "stale"
+
+
+def verify_dataset_cache(csv_path: str = DATA_FILE, cache_dir: Optional[str] = None) -> bool:
+    """Re-hashes every column file against the manifest."""
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    manifest = read_manifest(cache_dir)
+    if manifest is None:
+        return False
+    for column in manifest["columns"]:
+        path = os.path.join(cache_dir, column["file"])
+        if not os.path.exists(path) or file_sha1(path) != column["sha1"]:
+            return False
+    return True
+
+
+def ensure_dataset_cache(csv_path: str = DATA_FILE, cache_dir: Optional[str] = None) -> str:
+    """Builds or rebuilds the cache unless it is fresh and intact. Returns what was done."""
+    status = cache_status(csv_path, cache_dir)
+    if status == "fresh" and verify_dataset_cache(csv_path, cache_dir):
+        return "up to date"
+    build_dataset_cache(csv_path, cache_dir)
+    return "rebuilt" if status != "missing" else "built"
+
+
+# --- 3. Loading ---
+def _open_cached(columns, csv_path, cache_dir):
+    """Memory-maps the requested columns of a fresh cache, or returns None."""
+    if cache_status(csv_path, cache_dir) != "fresh":
+        print(f"❗️Warning: Columnar cache in '{cache_dir}' is missing or stale; reading {csv_path}. "
+              "Run kaggle-data-download-setup.py to rebuild it.")
+        return None
+    manifest = read_manifest(cache_dir)
+    files = {column["name"]: column for column in manifest["columns"]}
+    names = list(columns) if columns is not None else list(files)
+    try:
+        arrays = {}
+        for name in names:
+            array = np.load(os.path.join(cache_dir, files[name]["file"]), mmap_mode="r")
+            if array.dtype.str != files[name]["dtype"] or len(array) != manifest["rows"]:
+                raise ValueError(f"column '{name}' does not match the manifest")
+            arrays[name] = array
+        return arrays
+    except (KeyError, OSError, ValueError) as e:
+        print(f"❗️Warning: Columnar cache in '{cache_dir}' is unusable ({e}); reading {csv_path}.")
+        return None
+
+
+def load_columns(columns: Optional[Sequence[str]] = None, csv_path: str = DATA_FILE,
+                 cache_dir: Optional[str] = None) -> dict:
+    """
+    Returns {column name: 1-D array} for the requested columns (all of them
+    by default), in the order asked for.
+
+    With a fresh cache only the requested `.npy` files are opened, memory
+    mapped read-only, so nothing is parsed or copied until the values are
+    used. Otherwise the CSV is read (only the requested columns) and a
+    warning tells the user to rebuild the cache.
+    """
+    arrays = _open_cached(columns, csv_path, cache_dir or default_cache_dir(csv_path))
+    if arrays is not None:
+        return arrays
+    df = pd.read_csv(csv_path, usecols=list(columns) if columns is not None else None)
+    names = list(columns) if columns is not None else list(df.columns)
+    return {name: df[name].to_numpy() for name in names}
+
+
+def load_frame(columns: Optional[Sequence[str]] = None, csv_path: str = DATA_FILE,
+               cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """`load_columns` as a DataFrame (all columns in the CSV's order by default), without copying the arrays."""
+    return pd.DataFrame(load_columns(columns, csv_path, cache_dir), copy=False)
+
+
+def iter_chunks(columns: Optional[Sequence[str]] = None, csv_path: str = DATA_FILE,
+                cache_dir: Optional[str] = None, chunk_rows: int = 100_000):
+    """
+    Yields {column name: array} for consecutive blocks of at most
+    `chunk_rows` rows, so a pass over the data holds one block at a time.
+    Blocks are slices of the memory-mapped cache when it is fresh, and
+    chunks of the CSV otherwise.
+    """
+    arrays = _open_cached(columns, csv_path, cache_dir or default_cache_dir(csv_path))
+    if arrays is not None:
+        rows = len(next(iter(arrays.values()))) if arrays else 0
+        for start in range(0, rows, chunk_rows):
+            yield {name: array[start:start + chunk_rows] for name, array in arrays.items()}
+        return
+    usecols = list(columns) if columns is not None else None
+    for df in pd.read_csv(csv_path, usecols=usecols, chunksize=chunk_rows):
+        yield {name: df[name].to_numpy() for name in (usecols or df.columns)}
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def lttb(x, y, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling: the indices of `points`
+    rows of the series (x sorted ascending) that best keep its visual
+    shape, spikes included. The first and last rows are always kept; every
+    other one is, per equal-sized bucket, the row forming the largest
+    triangle with the previously kept row and the next bucket's average.
+
+    `points` below 3 counts as 3 (the first, the last and one bucket), so
+    a tiny budget still downsamples instead of keeping every row. Returns
+    all indices if the series already has at most that many rows.
+    Only the choice within each bucket is a Python loop; bucket averages
+    are computed in one pass, so a million rows take a few tens of ms.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    points = max(points, 3)
+    if points >= n:
+        return np.arange(n)
+    # Buckets of the rows between the first and the last.
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    averages_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    averages_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = averages_x[bucket + 1], averages_y[bucket + 1]
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+    return selected
@@ -0,0 +1,301 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from src.common.features import FEATURE_NAMES
+
+# --- 1. Configuration ---
+# SENTINEL_DRIFT=0 turns the API's live drift sketches off.
+DRIFT_ENABLED = os.getenv("SENTINEL_DRIFT", "1") != "0"
+DRIFT_REFERENCE_PATH = "models/drift_reference.npz"
+# Every feature plus the model's fraud probability.
+DRIFT_COLUMNS = FEATURE_NAMES + ["score"]
+# Quantile bins per column in the reference sketch.
+N_BINS = int(os.getenv("SENTINEL_DRIFT_BINS", "20"))
+# The live sketch keeps one set of bin counts per window: 5-minute windows
+# for the last 24 hours by default, a fixed 288 x 31 x 20 counts per process.
+WINDOW_SECONDS = int(os.getenv("SENTINEL_DRIFT_WINDOW_SECONDS", "300"))
+N_WINDOWS = int(os.getenv("SENTINEL_DRIFT_WINDOWS", "288"))
+# Probability floor for empty bins in PSI, which is undefined for zero counts.
+PSI_EPSILON = 1e-4
+
+
+def bin_counts(cuts: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Counts the rows of `values` (n, columns) into each column's bins:
+    bin i of column c holds cuts[c, i-1] < value <= cuts[c, i], with open
+    first and last bins. Non-finite values are not counted.
+    """
+    n_columns, n_bins = cuts.shape[0], cuts.shape[1] + 1
+    counts = np.zeros((n_columns, n_bins), dtype=np.int64)
+    for c in range(n_columns):
+        column = values[:, c]
+        column = column[np.isfinite(column)]
+        counts[c] = np.bincount(np.searchsorted(cuts[c], column, side="left"), minlength=n_bins)
+    return counts
+
+
+# --- 2. The Reference Sketch ---
+class DriftReference:
+    """
+    What "no drift" looks like, computed once at training time.
+
+    For every column in DRIFT_COLUMNS it stores the cut points of
+    `n_bins` equal-frequency bins of held-out training data, and how many
+    of those rows fall in each bin (ties can make bins uneven). Live
+    sketches count traffic into the same bins, so comparing the two is a
+    few vectorized operations on (31, n_bins) arrays, whatever the volume.
+    """
+
+    def __init__(self, cuts, counts):
+        self.cuts = np.asarray(cuts, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        # Identifies the bins; live sketches with other bins cannot be compared.
+        self.reference_id = hashlib.sha1(self.cuts.tobytes()).hexdigest()[:12]
+
+    @classmethod
+    def fit(cls, features, scores, n_bins=N_BINS) -> "DriftReference":
+        """Fits the sketch on raw (n, 30) held-out features and the model's fraud probabilities for them."""
+        values = np.column_stack([np.asarray(features, dtype=np.float64), np.asarray(scores, dtype=np.float64)])
+        quantiles = np.linspace(0.0, 1.0, n_bins + 1)[1:-1]
+        cuts = np.nanquantile(values, quantiles, axis=0).T
+        return cls(cuts, bin_counts(cuts, values))
+
+    def new_sketch(self, window_seconds=WINDOW_SECONDS, n_windows=N_WINDOWS) -> "DriftSketch":
+        return DriftSketch(self.cuts, window_seconds, n_windows)
+
+    def save(self, path, **metadata):
+        """Writes the reference to an .npz file via rename, with optional string metadata."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, cuts=self.cuts, counts=self.counts, columns=np.array(DRIFT_COLUMNS),
+                 metadata=json.dumps(metadata))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a reference written by `save`. Returns (reference, metadata)."""
+        with np.load(path) as data:
+            if list(data["columns"]) != DRIFT_COLUMNS:
+                raise ValueError(f"{path} was written for other columns than {DRIFT_COLUMNS}.")
+            reference = cls(data["cuts"], data["counts"])
+            metadata = json.loads(str(data["metadata"]))
+        return reference, metadata
+
+
+# --- 3. The Live Sketch ---
+class DriftSketch:
+    """
+    Constant-memory, mergeable summary of live traffic: for each of the
+    last `n_windows` windows of `window_seconds`, the bin counts of every
+    column in the reference's bins.
+
+    Windows live in a ring: a window's slot is reused (and cleared) once
+    it is `n_windows` windows old. Sketches from several processes merge
+    by adding the counts of equal windows, and any range of windows sums
+    into one (columns, bins) array to compare with the reference.
+    """
+
+    def __init__(self, cuts, window_seconds=WINDOW_SECONDS, n_windows=N_WINDOWS):
+        self.cuts = np.asarray(cuts, dtype=np.float64)
+        self.reference_id = hashlib.sha1(self.cuts.tobytes()).hexdigest()[:12]
+        self.window_seconds = window_seconds
+        self.window_starts = np.full(n_windows, -1, dtype=np.int64)
+        self.counts = np.zeros((n_windows, self.cuts.shape[0], self.cuts.shape[1] + 1), dtype=np.int64)
+
+    def update(self, timestamps: np.ndarray, values: np.ndarray):
+        """Adds rows of `values` (n, columns) observed at `timestamps` (Unix seconds)."""
+        windows = (np.asarray(timestamps) // self.window_seconds).astype(np.int64) * self.window_seconds
+        for window in np.unique(windows).tolist():
+            slot = self._slot(window)
+            if slot is None:
+                continue
+            rows = values if len(windows) and windows[0] == windows[-1] == window else values[windows == window]
+            self.counts[slot] += bin_counts(self.cuts, rows)
+
+    def _slot(self, window: int) -> Optional[int]:
+        """The slot of `window`, clearing it if it held an older window; None if `window` is too old."""
+        slot = (window // self.window_seconds) % len(self.window_starts)
+        if self.window_starts[slot] != window:
+            if self.window_starts[slot] > window:
+                return None
+            self.window_starts[slot] = window
+            self.counts[slot] = 0
+        return slot
+
+    def merge(self, other: "DriftSketch"):
+        """Adds another process's counts, window by window. Both must use the same bins."""
+        if other.reference_id != self.reference_id or other.window_seconds != self.window_seconds:
+            raise ValueError("Only sketches with the same bins and window length can be merged.")
+        for slot in np.flatnonzero(other.window_starts >= 0).tolist():
+            target = self._slot(int(other.window_starts[slot]))
+            if target is not None:
+                self.counts[target] += other.counts[slot]
+
+    def window_counts(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """(columns, bins) counts of the windows that start in [start, end)."""
+        keep = self.window_starts >= 0
+        if start is not None:
+            keep &= self.window_starts >= start // self.window_seconds * self.window_seconds
+        if end is not None:
+            keep &= self.window_starts < end
+        return self.counts[keep].sum(axis=0)
+
+    def save(self, path):
+        """Writes the windows in use to an .npz file via rename."""
+        used = self.window_starts >= 0
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, cuts=self.cuts, window_seconds=self.window_seconds, n_windows=len(self.window_starts),
+                 window_starts=self.window_starts[used], counts=self.counts[used])
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "DriftSketch":
+        with np.load(path) as data:
+            sketch = cls(data["cuts"], int(data["window_seconds"]), int(data["n_windows"]))
+            for window, counts in zip(data["window_starts"].tolist(), data["counts"]):
+                sketch.counts[sketch._slot(window)] += counts
+        return sketch
+
+
+# --- 4. Drift Metrics ---
+def drift_scores(reference_counts: np.ndarray, live_counts: np.ndarray) -> dict:
+    """
+    Compares binned distributions, one row per column, and returns arrays
+    with one value per column:
+
+    - `psi`: population stability index (empty bins floored at PSI_EPSILON);
+      below 0.1 is usually read as stable, above 0.25 as a major shift.
+    - `ks`: Kolmogorov-Smirnov statistic, the largest gap between the two
+      CDFs, evaluated at the bin edges.
+    - `js`: Jensen-Shannon divergence in bits, between 0 and 1.
+    - `rows`: live rows per column.
+
+    Columns without live rows get NaN.
+    """
+    reference_counts = np.asarray(reference_counts, dtype=np.float64)
+    live_counts = np.asarray(live_counts, dtype=np.float64)
+    rows = live_counts.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = reference_counts / reference_counts.sum(axis=1, keepdims=True)
+        q = live_counts / rows[:, None]
+        p_floor, q_floor = np.maximum(p, PSI_EPSILON), np.maximum(q, PSI_EPSILON)
+        psi = ((q_floor - p_floor) * np.log(q_floor / p_floor)).sum(axis=1)
+        ks = np.abs(np.cumsum(q, axis=1) - np.cumsum(p, axis=1)).max(axis=1)
+        m = (p + q) / 2
+        js = 0.5 * (np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=1)
+                    + np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=1))
+    empty = rows == 0
+    for values in (psi, ks, js):
+        values[empty] = np.nan
+    return {"psi": psi, "ks": ks, "js": js, "rows": rows.astype(np.int64)}
+
+
+def drift_table(reference: DriftReference, live_counts: np.ndarray) -> list:
+    """`drift_scores` as one dict per column, e.g. for JSON."""
+    scores = drift_scores(reference.counts, live_counts)
+    return [{"column": column, **{name: _number(values[i]) for name, values in scores.items()}}
+            for i, column in enumerate(DRIFT_COLUMNS)]
+
+
+def _number(value):
+    value = value.item()
+    return None if value != value else value
+
+
+# --- 5. The Serving Side ---
+class DriftMonitor:
+    """
+    Keeps this process's live sketch up to date. It is a prediction log
+    listener, so rows are counted on the log's writer thread, never on the
+    request path.
+
+    The reference is reloaded when its file changes (a new model), which
+    starts a new live sketch in the new bins. Without a reference the
+    monitor does nothing. With a `snapshot_dir`, the sketch is written to
+    `<snapshot_dir>/drift-<pid>.npz` after every update, for merging across
+    workers.
+    """
+
+    def __init__(self, reference_path=DRIFT_REFERENCE_PATH, snapshot_dir=None, window_seconds=WINDOW_SECONDS,
+                 n_windows=N_WINDOWS):
+        self.reference_path = reference_path
+        self.snapshot_dir = snapshot_dir
+        self.window_seconds = window_seconds
+        self.n_windows = n_windows
+        self.reference = None
+        self.sketch = None
+        self._reference_stat = None
+
+    def _refresh_reference(self):
+        try:
+            stat = os.stat(self.reference_path)
+        except FileNotFoundError:
+            return
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        if fingerprint == self._reference_stat:
+            return
+        self._reference_stat = fingerprint
+        try:
+            reference, _ = DriftReference.load(self.reference_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❗️Warning: Could not load the drift reference {self.reference_path}: {e}")
+            return
+        if self.reference is None or reference.reference_id != self.reference.reference_id:
+            self.sketch = reference.new_sketch(self.window_seconds, self.n_windows)
+        self.reference = reference
+
+    def __call__(self, columns: dict):
+        """Counts the rows of a prediction log segment (see src/common/prediction_log.py)."""
+        self._refresh_reference()
+        if self.sketch is None:
+            return
+        values = np.column_stack([columns[name] for name in FEATURE_NAMES] + [columns["probability"]])
+        self.sketch.update(columns["timestamp"], values)
+        if self.snapshot_dir:
+            self.write_snapshot(self.snapshot_dir)
+
+    def scores(self, seconds: float) -> Optional[list]:
+        """This process's drift over the last `seconds`, per column; None without a reference."""
+        if self.sketch is None:
+            return None
+        return drift_table(self.reference, self.sketch.window_counts(start=time.time() - seconds))
+
+    def write_snapshot(self, directory) -> Optional[str]:
+        """Writes the live sketch to `<directory>/drift-<pid>.npz`."""
+        if self.sketch is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"drift-{os.getpid()}.npz")
+        self.sketch.save(path)
+        return path
+
+
+def load_merged_sketch(reference: DriftReference, directory, max_age_seconds=None) -> Optional[DriftSketch]:
+    """
+    Merges every process's sketch in `directory` that uses `reference`'s
+    bins (and, with `max_age_seconds`, was written that recently).
+    None if there is none. Sketches of processes that have exited still
+    count: their windows are real traffic, and each row was counted by
+    exactly one process.
+    """
+    merged = None
+    for path in sorted(glob.glob(os.path.join(directory, "drift-*.npz"))):
+        try:
+            if max_age_seconds is not None and time.time() - os.path.getmtime(path) > max_age_seconds:
+                continue
+            sketch = DriftSketch.load(path)
+        except (OSError, ValueError, KeyError):
+            # Removed or replaced while listing; the next read picks it up.
+            continue
+        if sketch.reference_id != reference.reference_id:
+            continue
+        if merged is None:
+            merged = sketch
+        else:
+            merged.merge(sketch)
+    return merged
@@ -0,0 +1,123 @@
+import threading
+
+import numpy as np
+
+# --- 1. Feature Layout ---
+# The order every model input uses: Time, V1-V28, Amount.
+FEATURE_NAMES = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+N_FEATURES = len(FEATURE_NAMES)
+
+WRONG_LENGTH_ERROR = "Error: Input must contain exactly 30 numerical values."
+NOT_FINITE_ERROR = "Error: Input values must be finite numbers."
+
+
+class TransactionDecodeError(ValueError):
+    """Raised for invalid transaction input; the message is the tool's error text."""
+
+
+# --- 2. Single Transactions ---
+_local = threading.local()
+
+def _row_length(parts):
+    """Number of values in a row, or None if it is not a sequence (e.g. a number or None)."""
+    try:
+        return len(parts)
+    except TypeError:
+        return None
+
+def _thread_buffer() -> np.ndarray:
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = np.empty(N_FEATURES, dtype=np.float64)
+    return buffer
+
+def decode_transaction(transaction_details, out: np.ndarray = None) -> np.ndarray:
+    """
+    Parses a transaction into a float64 feature vector. The input is either
+    a comma-separated string or a sequence of 30 numbers (a JSON array).
+
+    The values are written straight into `out`, or into a buffer reused by
+    the calling thread if `out` is not given. In that case the result is
+    only valid until the thread's next call; copy it (or pass `out`) to keep
+    it. Raises TransactionDecodeError unless there are exactly 30 finite values.
+    """
+    if isinstance(transaction_details, str):
+        parts = transaction_details.split(',')
+    else:
+        parts = transaction_details
+    if _row_length(parts) != N_FEATURES:
+        raise TransactionDecodeError(WRONG_LENGTH_ERROR)
+    features = _thread_buffer() if out is None else out
+    try:
+        # NumPy converts the strings in place, with the same rules as float().
+        features[:] = parts
+    except (TypeError, ValueError) as e:
+        raise TransactionDecodeError(f"An error occurred: {str(e)}") from e
+    if not np.isfinite(features).all():
+        raise TransactionDecodeError(NOT_FINITE_ERROR)
+    return features
+
+
+# --- 3. Batches ---
+def decode_transactions(transactions: list, out: np.ndarray = None):
+    """
+    Parses many transactions (strings or number sequences) into one
+    (n_valid, 30) float64 matrix. Rows that are neither, such as numbers
+    or None in a msgpack body, get WRONG_LENGTH_ERROR.
+
+    Returns `(features, valid_rows, errors)`: `features[k]` holds the input
+    row `valid_rows[k]`, and `errors` maps every invalid input row to its
+    error text. All well-formed rows are converted in a single NumPy call;
+    only a batch containing a malformed value falls back to row by row.
+    """
+    n_rows = len(transactions)
+    if out is None:
+        out = np.empty((n_rows, N_FEATURES), dtype=np.float64)
+    errors, valid_rows = {}, []
+    for i, transaction_details in enumerate(transactions):
+        if isinstance(transaction_details, str):
+            row_length = transaction_details.count(',') + 1
+        else:
+            row_length = _row_length(transaction_details)
+        if row_length == N_FEATURES:
+            valid_rows.append(i)
+        else:
+            errors[i] = WRONG_LENGTH_ERROR
+    features = out[:len(valid_rows)]
+    try:
+        if all(isinstance(transactions[i], str) for i in valid_rows):
+            features.reshape(-1)[:] = ",".join(transactions[i] for i in valid_rows).split(',')
+        else:
+            features[:] = [transactions[i] for i in valid_rows]
+    except (TypeError, ValueError):
+        # At least one value is not a number: find out which rows.
+        good_rows = []
+        for i in valid_rows:
+            try:
+                decode_transaction(transactions[i], out=out[len(good_rows)])
+            except TransactionDecodeError as e:
+                errors[i] = str(e)
+                continue
+            good_rows.append(i)
+        return out[:len(good_rows)], good_rows, errors
+
+    features, valid_rows, finite_errors = _drop_non_finite(features, valid_rows)
+    errors.update(finite_errors)
+    return features, valid_rows, errors
+
+def validate_features(features: np.ndarray):
+    """
+    Checks an already-numeric (n, 30) matrix, e.g. a binary request body.
+    Returns `(features, valid_rows, errors)` like `decode_transactions`.
+    """
+    if features.ndim != 2 or features.shape[1] != N_FEATURES:
+        raise TransactionDecodeError(WRONG_LENGTH_ERROR)
+    return _drop_non_finite(features, list(range(len(features))))
+
+def _drop_non_finite(features, valid_rows):
+    finite = np.isfinite(features).all(axis=1)
+    if finite.all():
+        return features, valid_rows, {}
+    errors = {valid_rows[k]: NOT_FINITE_ERROR for k in np.flatnonzero(~finite)}
+    valid_rows = [i for i, ok in zip(valid_rows, finite) if ok]
+    return features[finite], valid_rows, errors
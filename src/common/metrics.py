@@ -0,0 +1,512 @@
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+# --- 1. Configuration ---
+# SENTINEL_METRICS=0 turns recording off entirely (the /metrics endpoint
+# then reports nothing).
+METRICS_ENABLED = os.getenv("SENTINEL_METRICS", "1") != "0"
+# How many of the most recent assessments the ring buffer keeps.
+RECENT_CAPACITY = int(os.getenv("SENTINEL_METRICS_RECENT", "10000"))
+# Every serving process writes its snapshot here; the dashboard merges them.
+SNAPSHOT_DIR = os.getenv("SENTINEL_METRICS_SNAPSHOT_DIR", "metrics")
+SNAPSHOT_INTERVAL = float(os.getenv("SENTINEL_METRICS_SNAPSHOT_INTERVAL", "10"))
+# Per-minute aggregates kept for the dashboard's time series: 24 hours.
+BUCKET_SECONDS = 60
+BUCKET_COUNT = int(os.getenv("SENTINEL_METRICS_MINUTES", "1440"))
+
+# Upper bounds of the latency buckets, in milliseconds; the last bucket is +Inf.
+LATENCY_BOUNDS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0,
+                     250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0)
+# Upper bounds of the fraud probability buckets: 0.05, 0.10, ..., 1.0.
+PROBABILITY_BOUNDS = tuple(round(0.05 * i, 2) for i in range(1, 21))
+
+RECENT_COLUMNS = {
+    "timestamp": np.float64,    # Unix time the request finished
+    "latency_ms": np.float32,   # latency of the request the assessment belonged to
+    "probability": np.float32,  # NaN when the row could not be scored
+    "fraud": np.bool_,
+    "error": np.bool_,
+    "amount": np.float32,       # the transaction's Amount, NaN if it could not be read
+}
+
+
+# --- 2. Recording Structures ---
+class Histogram:
+    """
+    Counts observations into fixed buckets, Prometheus style: bucket `i`
+    holds values <= bounds[i] (and above the previous bound), the last one
+    everything larger.
+
+    `observe` is a bisect and two additions on plain Python numbers, with
+    no lock. Observations made concurrently from several threads can, rarely,
+    lose an increment, which is acceptable for monitoring.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def observe_many(self, values: np.ndarray):
+        """Adds a whole array of observations with one vectorized bucketing."""
+        buckets = np.bincount(np.searchsorted(self.bounds, values, side="left"),
+                              minlength=len(self.counts))
+        for i in np.flatnonzero(buckets).tolist():
+            self.counts[i] += int(buckets[i])
+        self.sum += float(np.sum(values))
+
+    def to_dict(self) -> dict:
+        return {"counts": list(self.counts), "sum": self.sum, "count": sum(self.counts)}
+
+
+class RingBuffer:
+    """
+    The last `capacity` records, stored in one preallocated NumPy structured
+    array (one field per column). Appending writes a whole record into the
+    next slot with a single assignment and never allocates or locks; the
+    oldest records are overwritten.
+
+    It is meant to have a single writer (the API's event loop thread).
+    Readers copy the records without blocking it and may, rarely, see the
+    record being written half-updated.
+    """
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.records = np.zeros(capacity, dtype=[(name, dtype) for name, dtype in columns.items()])
+        self.written = 0
+
+    def append(self, record: tuple):
+        """Writes one record, a tuple with a value for every column in order."""
+        self.records[self.written % self.capacity] = record
+        self.written += 1
+
+    def extend(self, **columns):
+        """Writes many records at once; every column is an array of the same length, or a scalar for all of them."""
+        n = max((np.size(values) for values in columns.values() if np.ndim(values)), default=1)
+        if n == 0:
+            return
+        skip = max(0, n - self.capacity)
+        slots = (self.written + skip + np.arange(n - skip)) % self.capacity
+        for name, values in columns.items():
+            self.records[name][slots] = np.broadcast_to(values, n)[skip:]
+        self.written += n
+
+    def snapshot(self) -> dict:
+        """Copies of the stored records, column by column, oldest first."""
+        n = min(self.written, self.capacity)
+        start = self.written % self.capacity if self.written > self.capacity else 0
+        records = self.records[(start + np.arange(n)) % self.capacity]
+        return {name: records[name] for name in records.dtype.names}
+
+
+class TimeBuckets:
+    """
+    Aggregates of the assessments per minute over the last `n_buckets`
+    minutes: how many, how many flagged as fraud or not assessable, and a
+    latency histogram (LATENCY_BOUNDS_MS) per minute. Memory is fixed
+    whatever the traffic, and the buckets of several processes merge by
+    adding equal minutes.
+
+    The current minute is counted in plain Python numbers, like
+    `Histogram`, and moved into the NumPy arrays once the next minute
+    starts; a slot is cleared when a newer minute takes it over. Single
+    writer, as for `RingBuffer`.
+    """
+
+    def __init__(self, n_buckets=BUCKET_COUNT, bucket_seconds=BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.starts = np.full(n_buckets, -1, dtype=np.int64)
+        self.totals = np.zeros((n_buckets, 3), dtype=np.int64)  # assessed, fraud, errors
+        self.latency_counts = np.zeros((n_buckets, len(LATENCY_BOUNDS_MS) + 1), dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.starts[:] = -1
+        self._start = -1
+        self._end = -1.0
+        self._totals = [0, 0, 0]
+        self._latency_counts = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+    def add(self, now: float, latency_ms: float, assessed: int, fraud: int, errors: int):
+        """Counts `assessed` assessments finished at `now`, all with the request's latency."""
+        if not self._start <= now < self._end:
+            start = int(now // self.bucket_seconds) * self.bucket_seconds
+            # If the clock went back, it is counted in the current minute.
+            if start > self._start:
+                self._close()
+                self._start, self._end = start, start + self.bucket_seconds
+        totals = self._totals
+        totals[0] += assessed
+        totals[1] += fraud
+        totals[2] += errors
+        self._latency_counts[bisect_left(LATENCY_BOUNDS_MS, latency_ms)] += assessed
+
+    def _close(self):
+        """Moves the current minute into its slot."""
+        if self._start < 0:
+            return
+        slot = (self._start // self.bucket_seconds) % len(self.starts)
+        self.starts[slot] = self._start
+        self.totals[slot] = self._totals
+        self.latency_counts[slot] = self._latency_counts
+        self._totals = [0, 0, 0]
+        self._latency_counts = [0] * len(self._latency_counts)
+
+    def to_dict(self, since=None) -> dict:
+        """Every minute starting at or after `since` (all by default), oldest first, including the current one."""
+        starts, totals, latency = self.starts.copy(), self.totals.copy(), self.latency_counts.copy()
+        if self._start >= 0:
+            slot = (self._start // self.bucket_seconds) % len(starts)
+            starts[slot], totals[slot], latency[slot] = self._start, self._totals, self._latency_counts
+        # Slots not reused for a day may still hold older minutes.
+        keep = (starts >= (since if since is not None else 0)) & (starts > self._start - len(starts) * self.bucket_seconds)
+        order = np.argsort(starts[keep])
+        totals = totals[keep][order]
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "start": starts[keep][order].tolist(),
+            "assessed": totals[:, 0].tolist(),
+            "fraud": totals[:, 1].tolist(),
+            "errors": totals[:, 2].tolist(),
+            "latency_counts": latency[keep][order].tolist(),
+        }
+
+
+# --- 3. The Serving Metrics ---
+class ServingMetrics:
+    """
+    Everything the API records about its traffic, in process memory:
+
+    - request latency per endpoint (histogram) and the HTTP errors per status,
+    - latency per workflow node (histogram),
+    - per assessment: decision, fraud probability and errors, as counters,
+      a probability histogram, and the most recent ones in a ring buffer,
+    - per minute: assessments, fraud, errors and a latency histogram.
+
+    Nothing here does I/O; `snapshot()` turns the current state into a
+    JSON-serializable dict and `write_snapshot()` persists it.
+    """
+
+    def __init__(self, recent_capacity=RECENT_CAPACITY, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self.requests = {}
+        self.http_errors = {}
+        self.nodes = {}
+        self.probabilities = Histogram(PROBABILITY_BOUNDS)
+        self.assessments = {"total": 0, "fraud": 0, "errors": 0}
+        self.recent = RingBuffer(recent_capacity, RECENT_COLUMNS)
+        self.minutes = TimeBuckets()
+
+    def reset(self):
+        """
+        Starts over with empty metrics, e.g. in a freshly forked worker. The
+        histograms are emptied in place, since callers may hold on to them.
+        """
+        self.started_at = time.time()
+        for histogram in (*self.requests.values(), *self.nodes.values(), self.probabilities):
+            histogram.reset()
+        self.http_errors.clear()
+        self.assessments.update(total=0, fraud=0, errors=0)
+        self.recent.written = 0
+        self.minutes.reset()
+
+    def node_histogram(self, node: str) -> Histogram:
+        """The latency histogram of a workflow node, created on first use."""
+        histogram = self.nodes.get(node)
+        if histogram is None:
+            histogram = self.nodes.setdefault(node, Histogram(LATENCY_BOUNDS_MS))
+        return histogram
+
+    def record_request(self, endpoint: str, latency_ms: float, status: int):
+        histogram = self.requests.get(endpoint)
+        if histogram is None:
+            histogram = self.requests.setdefault(endpoint, Histogram(LATENCY_BOUNDS_MS))
+        histogram.observe(latency_ms)
+        if status >= 400:
+            key = (endpoint, status)
+            self.http_errors[key] = self.http_errors.get(key, 0) + 1
+
+    def record_assessment(self, latency_ms: float, probability=None, fraud=False, error=False, amount=np.nan):
+        """Records one assessed transaction (`error`: it could not be scored)."""
+        counts = self.assessments
+        counts["total"] += 1
+        if error:
+            counts["errors"] += 1
+        elif fraud:
+            counts["fraud"] += 1
+        if probability is None:
+            probability = np.nan
+        else:
+            self.probabilities.observe(probability)
+        now = time.time()
+        self.recent.append((now, latency_ms, probability, fraud, error, amount))
+        self.minutes.add(now, latency_ms, 1, int(bool(fraud) and not error), int(bool(error)))
+
+    def record_assessments(self, latency_ms: float, probabilities: np.ndarray, fraud: np.ndarray, error: np.ndarray,
+                           amounts=np.nan):
+        """Vectorized `record_assessment` for the rows of one batch request (NaN probability = not scored)."""
+        counts = self.assessments
+        errors, flagged = int(np.count_nonzero(error)), int(np.count_nonzero(fraud & ~error))
+        counts["total"] += len(fraud)
+        counts["errors"] += errors
+        counts["fraud"] += flagged
+        self.probabilities.observe_many(probabilities[~np.isnan(probabilities)])
+        now = time.time()
+        self.recent.extend(timestamp=now, latency_ms=latency_ms,
+                           probability=probabilities, fraud=fraud, error=error, amount=amounts)
+        if len(fraud):
+            self.minutes.add(now, latency_ms, len(fraud), flagged, errors)
+
+    def snapshot(self, recent: bool = True, since=None) -> dict:
+        """
+        The current state as plain Python/JSON types; `recent` includes the
+        ring buffer's records. Only the minutes starting at or after `since`
+        (Unix seconds) are included, so a reader can fetch just the new ones.
+        """
+        errors = {}
+        for (endpoint, status), n in list(self.http_errors.items()):
+            errors.setdefault(endpoint, {})[str(status)] = n
+        snapshot = {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "written_at": time.time(),
+            "latency_bounds_ms": list(LATENCY_BOUNDS_MS),
+            "probability_bounds": list(PROBABILITY_BOUNDS),
+            "requests": {endpoint: {**h.to_dict(), "errors": errors.get(endpoint, {})}
+                         for endpoint, h in list(self.requests.items())},
+            "nodes": {node: h.to_dict() for node, h in list(self.nodes.items())},
+            "assessments": dict(self.assessments),
+            "probabilities": self.probabilities.to_dict(),
+            "minutes": self.minutes.to_dict(since),
+        }
+        if recent:
+            snapshot["recent"] = {name: _json_values(values) for name, values in self.recent.snapshot().items()}
+        return snapshot
+
+    def write_snapshot(self, directory=SNAPSHOT_DIR) -> str:
+        """Writes `snapshot()` to `<directory>/api-<pid>.json` (tmp file + rename)."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"api-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        return path
+
+
+def _json_values(values: np.ndarray) -> list:
+    """Array to list, with NaN as None so the JSON stays standard."""
+    if values.dtype.kind == "f":
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+# --- 4. Reading Snapshots ---
+def histogram_quantile(bounds, counts, q: float) -> float:
+    """
+    Estimates the q-quantile from bucket counts by linear interpolation within
+    the bucket, like Prometheus' `histogram_quantile`. Values in the +Inf
+    bucket are reported as the largest finite bound. NaN without observations.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return float("nan")
+    rank = q * total
+    cumulative = np.cumsum(counts)
+    i = int(np.searchsorted(cumulative, rank, side="left"))
+    if i >= len(bounds):
+        return float(bounds[-1])
+    lower = bounds[i - 1] if i > 0 else 0.0
+    below = cumulative[i - 1] if i > 0 else 0.0
+    return float(lower + (bounds[i] - lower) * (rank - below) / counts[i])
+
+
+def histogram_quantiles(bounds, counts, q: float) -> np.ndarray:
+    """`histogram_quantile` for every row of a (rows, buckets) count matrix at once."""
+    counts = np.asarray(counts, dtype=np.float64).reshape(-1, len(bounds) + 1)
+    bounds = np.asarray(bounds, dtype=np.float64)
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1]
+    rank = q * total
+    i = np.minimum((cumulative < rank[:, None]).sum(axis=1), len(bounds))
+    rows = np.arange(len(counts))
+    lower = np.where(i > 0, bounds[np.maximum(i - 1, 0)], 0.0)
+    below = np.where(i > 0, cumulative[rows, np.maximum(i - 1, 0)], 0.0)
+    upper = bounds[np.minimum(i, len(bounds) - 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = lower + (upper - lower) * (rank - below) / counts[rows, np.minimum(i, len(bounds))]
+    values = np.where(i >= len(bounds), bounds[-1], values)
+    return np.where(total > 0, values, np.nan)
+
+
+def merge_minutes(minutes: list) -> dict:
+    """Sums the per-minute buckets of several processes by minute, as arrays, oldest first."""
+    minutes = [m for m in minutes if m and m["start"]]
+    if not minutes:
+        return {"start": np.empty(0, dtype=np.int64), "assessed": np.empty(0, dtype=np.int64),
+                "fraud": np.empty(0, dtype=np.int64), "errors": np.empty(0, dtype=np.int64),
+                "latency_counts": np.empty((0, len(LATENCY_BOUNDS_MS) + 1), dtype=np.int64)}
+    starts, index = np.unique(np.concatenate([m["start"] for m in minutes]), return_inverse=True)
+    merged = {"start": starts}
+    for name in ("assessed", "fraud", "errors", "latency_counts"):
+        values = np.concatenate([np.asarray(m[name], dtype=np.int64) for m in minutes])
+        merged[name] = np.zeros((len(starts),) + values.shape[1:], dtype=np.int64)
+        np.add.at(merged[name], index, values)
+    return merged
+
+
+def append_minutes(history: dict, minutes: dict, since) -> dict:
+    """
+    Combines merged minutes kept from earlier reads with `minutes`, read
+    from `since` on, which replace every kept minute from `since` on.
+    Minutes a day (BUCKET_COUNT) older than the newest are dropped.
+    """
+    if history is not None and since is not None:
+        keep = history["start"] < since
+        minutes = {name: np.concatenate([history[name][keep], values]) for name, values in minutes.items()}
+    if len(minutes["start"]):
+        keep = minutes["start"] > minutes["start"][-1] - BUCKET_COUNT * BUCKET_SECONDS
+        minutes = {name: values[keep] for name, values in minutes.items()}
+    return minutes
+
+
+def merge_snapshots(snapshots: list) -> dict:
+    """
+    Combines the snapshots of several processes (e.g. the serve.py workers)
+    into one: histograms, counters and minutes are summed and the recent
+    records are concatenated in time order.
+    """
+    if not snapshots:
+        return {}
+    merged = {
+        "processes": len(snapshots),
+        "started_at": min(s["started_at"] for s in snapshots),
+        "written_at": max(s["written_at"] for s in snapshots),
+        "latency_bounds_ms": snapshots[0]["latency_bounds_ms"],
+        "probability_bounds": snapshots[0]["probability_bounds"],
+        "requests": {},
+        "nodes": {},
+        "assessments": {"total": 0, "fraud": 0, "errors": 0},
+        "probabilities": None,
+    }
+    for snapshot in snapshots:
+        for key in ("requests", "nodes"):
+            for name, histogram in snapshot[key].items():
+                merged[key][name] = _merge_histogram(merged[key].get(name), histogram)
+        for key, n in snapshot["assessments"].items():
+            merged["assessments"][key] += n
+        merged["probabilities"] = _merge_histogram(merged["probabilities"], snapshot["probabilities"])
+    merged["minutes"] = merge_minutes([s.get("minutes") for s in snapshots])
+    recent = [s["recent"] for s in snapshots if "recent" in s]
+    if recent:
+        # A column missing from an older process's snapshot reads as NaN.
+        columns = {name: np.concatenate([np.asarray(r.get(name, [None] * len(r["timestamp"])), dtype=np.float64)
+                                         for r in recent])
+                   for name in RECENT_COLUMNS}
+        order = np.argsort(columns["timestamp"], kind="stable")
+        merged["recent"] = {name: values[order] for name, values in columns.items()}
+    return merged
+
+
+def _merge_histogram(into, histogram) -> dict:
+    if into is None:
+        return {**histogram, "counts": list(histogram["counts"]),
+                **({"errors": dict(histogram["errors"])} if "errors" in histogram else {})}
+    into["counts"] = [a + b for a, b in zip(into["counts"], histogram["counts"])]
+    into["sum"] += histogram["sum"]
+    into["count"] += histogram["count"]
+    for status, n in histogram.get("errors", {}).items():
+        into["errors"][status] = into["errors"].get(status, 0) + n
+    return into
+
+
+def load_snapshots(directory=SNAPSHOT_DIR, max_age_seconds=None, since=None) -> list:
+    """
+    Reads every process snapshot in `directory`; with `max_age_seconds`, only
+    those written that recently (older ones belong to processes that are gone).
+    With `since`, only the minutes starting at or after it are kept.
+    """
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(directory, "api-*.json"))):
+        if max_age_seconds is not None and time.time() - os.path.getmtime(path) > max_age_seconds:
+            continue
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            # Removed or replaced while listing; the next read picks it up.
+            continue
+        if since is not None and "minutes" in snapshot:
+            minutes = snapshot["minutes"]
+            first = bisect_left(minutes["start"], since)
+            snapshot["minutes"] = {name: values[first:] if isinstance(values, list) else values
+                                   for name, values in minutes.items()}
+        snapshots.append(snapshot)
+    return snapshots
+
+
+# --- 5. Prometheus Text Format ---
+def prometheus_text(snapshot: dict) -> str:
+    """Renders a snapshot in the Prometheus text exposition format (latencies in seconds)."""
+    lines = []
+    latency_bounds = [bound / 1000 for bound in snapshot["latency_bounds_ms"]]
+
+    def histogram(name, help_text, label, series, bounds, scale):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for value, h in series.items():
+            labels = f'{label}="{value}",' if label else ""
+            cumulative = np.cumsum(h["counts"]).tolist()
+            for bound, n in zip(bounds, cumulative):
+                lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {n}')
+            lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative[-1]}')
+            braces = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{name}_sum{braces} {h['sum'] * scale:.9g}")
+            lines.append(f"{name}_count{braces} {h['count']}")
+
+    histogram("sentinel_request_latency_seconds", "Request latency by endpoint.",
+              "endpoint", snapshot["requests"], latency_bounds, 1e-3)
+    histogram("sentinel_node_latency_seconds", "Workflow node latency.",
+              "node", snapshot["nodes"], latency_bounds, 1e-3)
+    histogram("sentinel_fraud_probability", "Fraud probability of scored transactions.",
+              None, {None: snapshot["probabilities"]}, snapshot["probability_bounds"], 1.0)
+
+    lines.append("# HELP sentinel_http_errors_total Responses with status >= 400.")
+    lines.append("# TYPE sentinel_http_errors_total counter")
+    for endpoint, h in snapshot["requests"].items():
+        for status, n in h["errors"].items():
+            lines.append(f'sentinel_http_errors_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+
+    assessments = snapshot["assessments"]
+    lines.append("# HELP sentinel_assessments_total Assessed transactions by decision.")
+    lines.append("# TYPE sentinel_assessments_total counter")
+    legitimate = assessments["total"] - assessments["fraud"] - assessments["errors"]
+    for decision, n in (("FRAUD", assessments["fraud"]), ("NOT FRAUD", legitimate), ("error", assessments["errors"])):
+        lines.append(f'sentinel_assessments_total{{decision="{decision}"}} {n}')
+    lines.append("# HELP sentinel_process_start_time_seconds Start time of the process since the Unix epoch.")
+    lines.append("# TYPE sentinel_process_start_time_seconds gauge")
+    lines.append(f"sentinel_process_start_time_seconds {snapshot['started_at']:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+# --- 6. Process-wide Instance ---
+_metrics = ServingMetrics()
+
+def get_serving_metrics() -> ServingMetrics:
+    """Returns the process-wide metrics. A forked worker inherits its parent's; see `reset`."""
+    return _metrics
@@ -0,0 +1,293 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+import joblib
+import numpy as np
+
+from src.common.artifact_bundle import (
+    BUNDLE_DIR,
+    CURRENT_FILE,
+    load_artifact_bundle,
+    read_bundle_manifest,
+)
+from src.common.calibration import CALIBRATION_PATH, ProbabilityCalibrator
+from src.common.checksums import file_sha1
+from src.common.compiled_forest import (
+    COMPILED_MODEL_PATH,
+    FUSED_MODEL_PATH,
+    CompiledForest,
+)
+
+# --- 1. Configuration ---
+# A transaction is flagged as FRAUD when its probability exceeds this value,
+# matching `XGBClassifier.predict`.
+FRAUD_THRESHOLD = 0.5
+
+MODEL_PATH = "models/xgb_fraud_detector.joblib"
+SCALER_PATH = "models/scaler.joblib"
+
+# Batches up to this many rows use the compiled forest, which beats XGBoost's
+# per-call overhead on small inputs; larger batches go to XGBoost itself.
+COMPILED_MAX_ROWS = int(os.getenv("SENTINEL_COMPILED_MAX_ROWS", "32"))
+
+# How often (in seconds) the registry is allowed to stat() the artifacts.
+CHECK_INTERVAL = float(os.getenv("SENTINEL_MODEL_CHECK_INTERVAL", "2.0"))
+# Artifacts modified more recently than this are assumed to still be written.
+SETTLE_SECONDS = float(os.getenv("SENTINEL_MODEL_SETTLE_SECONDS", "1.0"))
+# Threads XGBoost may use per prediction; 0 leaves it to OpenMP's default.
+MODEL_THREADS = int(os.getenv("SENTINEL_MODEL_THREADS", "0"))
+
+
+# --- 2. The Loaded Model Bundle ---
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    An immutable, consistent pair of model and scaler plus its version.
+    `version` changes with any artifact file, including a plain `touch`;
+    `model_id` identifies the model itself: the first 12 hex digits of the
+    joblib model's SHA-1, the id under models/versions/ and the MLflow
+    `model_version` tag.
+    `forest` is the compiled form of `model`, when one was exported for it;
+    if `forest_is_fused` the scaler is folded into it and it takes raw features.
+    `calibrator` maps the model's probabilities to calibrated ones, if Phase 1
+    fitted one for this model.
+    """
+    model: object
+    scaler: object
+    version: str
+    model_id: str
+    forest: Optional[CompiledForest] = None
+    forest_is_fused: bool = False
+    calibrator: Optional[ProbabilityCalibrator] = None
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Scores an (n, 30) matrix of raw features in one vectorized call and
+        returns the fraud probability of every row.
+        """
+        use_forest = self.forest is not None and len(features) <= COMPILED_MAX_ROWS
+        if use_forest and self.forest_is_fused:
+            return self.forest.predict_proba(features)
+        # Same arithmetic as `scaler.transform`, without the per-call
+        # feature-name validation that requires a DataFrame.
+        scaled = (features - self.scaler.mean_) / self.scaler.scale_
+        if use_forest:
+            return self.forest.predict_proba(scaled)
+        return self.model.predict_proba(scaled)[:, 1]
+
+    @cached_property
+    def scoring_version(self) -> str:
+        """
+        Hash of everything that decides an assessment: the model
+        (`model_id`), the scaler and the calibration. Unlike `version` it
+        does not change when identical files are touched or copied again,
+        so caches keyed by it are only cleared by a real change.
+        """
+        digest = hashlib.sha1(self.model_id.encode())
+        arrays = [self.scaler.mean_, self.scaler.scale_]
+        if self.calibrator is not None:
+            arrays += [self.calibrator.raw, self.calibrator.calibrated]
+        for array in arrays:
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        return digest.hexdigest()[:12]
+
+    def calibrate(self, probabilities):
+        """Calibrated fraud probabilities; unchanged if there is no calibrator."""
+        if self.calibrator is None:
+            return probabilities
+        return self.calibrator(probabilities)
+
+
+# --- 3. The Registry ---
+class ModelRegistry:
+    """
+    Loads the model and scaler once per process and hot-swaps them when the
+    artifacts on disk change.
+
+    The memory-mapped artifact bundle in `bundle_dir` is preferred, so
+    workers share its pages; the joblib files are the fallback, and win
+    when the bundle was not exported from the current joblib model.
+
+    `get()` is the request-path call: it returns the current bundle without
+    taking a lock and only stats the files once every `check_interval`
+    seconds. A new bundle is fully loaded before it replaces the old one, so
+    readers never see a model paired with the wrong scaler. If a reload fails
+    (e.g. a half-written file) the previous bundle keeps serving.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH,
+                 compiled_path=COMPILED_MODEL_PATH, fused_path=FUSED_MODEL_PATH,
+                 calibration_path=CALIBRATION_PATH, bundle_dir=BUNDLE_DIR,
+                 check_interval=CHECK_INTERVAL, settle_seconds=SETTLE_SECONDS, model_threads=MODEL_THREADS):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.compiled_path = compiled_path
+        self.fused_path = fused_path
+        self.calibration_path = calibration_path
+        self.bundle_dir = bundle_dir
+        self.check_interval = check_interval
+        self.settle_seconds = settle_seconds
+        self.model_threads = model_threads
+        self._bundle = None
+        self._fingerprint = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload_count = 0
+
+    def _stat(self):
+        """Cheap version check: (mtime_ns, size) of every artifact."""
+        current = os.path.join(self.bundle_dir, CURRENT_FILE)
+        if not os.path.exists(current):
+            # Without a bundle the joblib model and scaler are required.
+            os.stat(self.model_path)
+            os.stat(self.scaler_path)
+        stats = []
+        for path in (current, self.model_path, self.scaler_path,
+                     self.compiled_path, self.fused_path, self.calibration_path):
+            if os.path.exists(path):
+                stats.append(os.stat(path))
+        return tuple((st.st_mtime_ns, st.st_size) for st in stats)
+
+    def _load(self, fingerprint):
+        version = hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:12]
+        manifest = read_bundle_manifest(self.bundle_dir)
+        bundle = None
+        if manifest is not None:
+            if not os.path.exists(self.model_path) or manifest["model_sha1"] == file_sha1(self.model_path):
+                # A bundle exported without the joblib model's hash falls back to its own version.
+                bundle = self._load_bundle(version, (manifest["model_sha1"] or manifest["version"])[:12])
+            else:
+                print(f"❗️Warning: Artifact bundle {manifest['version']} was not exported from "
+                      f"{self.model_path}; loading the joblib files.")
+        if bundle is None:
+            bundle = self._load_joblib(version)
+        if self.model_threads:
+            bundle.model.set_params(n_jobs=self.model_threads)
+        return bundle
+
+    def _load_bundle(self, version, model_id):
+        parts = load_artifact_bundle(self.bundle_dir)
+        # Prefer the fused forest (no scaling at all), then the compiled one.
+        forest = parts["fused"] if parts["fused"] is not None else parts["forest"]
+        return ModelBundle(model=parts["model"], scaler=parts["scaler"], version=version, model_id=model_id,
+                           forest=forest, forest_is_fused=parts["fused"] is not None,
+                           calibrator=parts["calibrator"])
+
+    def _load_joblib(self, version):
+        model = joblib.load(self.model_path)
+        scaler = joblib.load(self.scaler_path)
+        expected = {"model_sha1": file_sha1(self.model_path)}
+        # Prefer the fused forest (no scaling at all), then the compiled one.
+        forest = self._load_forest(self.fused_path, {**expected, "scaler_sha1": file_sha1(self.scaler_path)})
+        forest_is_fused = forest is not None
+        if forest is None:
+            forest = self._load_forest(self.compiled_path, expected)
+        calibrator = self._load_matching(ProbabilityCalibrator, self.calibration_path, expected)
+        return ModelBundle(model=model, scaler=scaler, version=version, model_id=expected["model_sha1"][:12],
+                           forest=forest, forest_is_fused=forest_is_fused,
+                           calibrator=calibrator)
+
+    @classmethod
+    def _load_forest(cls, path, expected):
+        """Loads a compiled forest if it was exported from the current artifacts."""
+        return cls._load_matching(CompiledForest, path, expected)
+
+    @staticmethod
+    def _load_matching(artifact_class, path, expected):
+        """Loads an optional derived artifact if it was made from the current model."""
+        if not os.path.exists(path):
+            return None
+        artifact, metadata = artifact_class.load(path)
+        if any(metadata.get(key) != value for key, value in expected.items()):
+            print(f"❗️Warning: {path} does not match the current model; ignoring it.")
+            return None
+        return artifact
+
+    def get(self) -> ModelBundle:
+        """Returns the current bundle, reloading it first if the artifacts changed."""
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() < self._next_check:
+            return bundle
+        # Only one thread checks/reloads; the others keep serving the current bundle.
+        if bundle is not None and not self._lock.acquire(blocking=False):
+            return bundle
+        if bundle is None:
+            self._lock.acquire()
+        try:
+            return self._refresh()
+        finally:
+            self._lock.release()
+
+    def reload(self, wait: bool = False) -> ModelBundle:
+        """
+        Checks the artifacts now instead of waiting for the next check
+        interval. With `wait`, artifacts changed less than `settle_seconds`
+        ago are waited for and loaded, instead of left to a later check.
+        """
+        with self._lock:
+            return self._refresh(wait=wait)
+
+    def set_model_threads(self, threads: int):
+        """
+        Limits XGBoost to `threads` threads for the current model and every
+        model loaded later, e.g. in a forked worker that shares the machine.
+        """
+        self.model_threads = threads
+        bundle = self._bundle
+        if bundle is not None:
+            bundle.model.set_params(n_jobs=threads)
+
+    def _refresh(self, wait: bool = False) -> ModelBundle:
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            fingerprint = self._stat()
+        except FileNotFoundError:
+            if self._bundle is None:
+                raise
+            return self._bundle
+        if fingerprint == self._fingerprint:
+            return self._bundle
+
+        newest_mtime = max(mtime for mtime, _ in fingerprint) / 1e9
+        unsettled = self.settle_seconds - (time.time() - newest_mtime)
+        if self._bundle is not None and unsettled > 0:
+            if not wait:
+                # Still being written; look again on the next check.
+                return self._bundle
+            # Stat again afterwards, in case the writes are still going on.
+            time.sleep(min(unsettled, self.settle_seconds))
+            return self._refresh(wait=True)
+
+        try:
+            bundle = self._load(fingerprint)
+        except Exception as e:
+            if self._bundle is None:
+                raise
+            print(f"❗️Warning: Model reload failed, keeping version {self._bundle.version}: {e}")
+            return self._bundle
+
+        # Single reference assignment: readers see either the old or the new bundle.
+        self._bundle = bundle
+        self._fingerprint = fingerprint
+        self.reload_count += 1
+        print(f"✅ Model version {bundle.version} (model {bundle.model_id}) loaded.")
+        return bundle
+
+
+# --- 4. Process-wide Instance ---
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Returns the process-wide model registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,359 @@
+import calendar
+import glob
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.common.features import FEATURE_NAMES, N_FEATURES, decode_transactions
+
+# --- 1. Configuration ---
+# SENTINEL_PREDICTION_LOG=0 turns the log off.
+PREDICTION_LOG_ENABLED = os.getenv("SENTINEL_PREDICTION_LOG", "1") != "0"
+LOG_DIR = os.getenv("SENTINEL_PREDICTION_LOG_DIR", "logs/predictions")
+# Assessments (single transactions or whole batches) waiting to be written.
+# When the queue is full new ones are dropped and counted; requests never wait.
+QUEUE_SIZE = int(os.getenv("SENTINEL_PREDICTION_LOG_QUEUE", "10000"))
+# The writer flushes every FLUSH_SECONDS, or sooner once FLUSH_ENTRIES are queued.
+FLUSH_SECONDS = float(os.getenv("SENTINEL_PREDICTION_LOG_FLUSH_SECONDS", "30"))
+FLUSH_ENTRIES = int(os.getenv("SENTINEL_PREDICTION_LOG_FLUSH_ENTRIES", "4096"))
+# Hour partitions that ended more than RETENTION_HOURS ago are deleted by the
+# writer thread; 0 keeps everything.
+RETENTION_HOURS = float(os.getenv("SENTINEL_PREDICTION_LOG_RETENTION_HOURS", "168"))
+# Segments are zip-deflated (about 22% smaller on the creditcard features, at
+# the cost of writer-thread CPU and slower scans); SENTINEL_PREDICTION_LOG_COMPRESS=0
+# writes them uncompressed.
+COMPRESS = os.getenv("SENTINEL_PREDICTION_LOG_COMPRESS", "1") != "0"
+
+# `decision` column values.
+NOT_FRAUD, FRAUD, NOT_ASSESSED = 0, 1, -1
+
+COLUMNS = {
+    "timestamp": np.float64,            # Unix time the assessment was returned
+    **{name: np.float64 for name in FEATURE_NAMES},  # NaN where the input could not be decoded
+    "probability": np.float32,          # NaN when not scored
+    "decision": np.int8,                # NOT_FRAUD, FRAUD or NOT_ASSESSED
+    "model_version": "<U12",           # ModelBundle.model_id: the joblib model's SHA-1 prefix
+    "latency_ms": np.float32,           # latency of the request the row belonged to
+}
+
+
+# --- 2. Partitions ---
+def partition_dir(log_dir: str, hour_start: int) -> str:
+    """log_dir/date=YYYY-MM-DD/hour=HH for the UTC hour starting at `hour_start`."""
+    hour = time.gmtime(hour_start)
+    return os.path.join(log_dir, f"date={hour.tm_year:04d}-{hour.tm_mon:02d}-{hour.tm_mday:02d}",
+                        f"hour={hour.tm_hour:02d}")
+
+
+def list_partitions(log_dir: str = LOG_DIR, start: Optional[float] = None, end: Optional[float] = None) -> list:
+    """
+    (hour_start, directory) of every hour partition that can hold rows with
+    start <= timestamp < end, oldest first. Only directory names are read.
+    """
+    partitions = []
+    for path in glob.glob(os.path.join(log_dir, "date=*", "hour=*")):
+        try:
+            date = os.path.basename(os.path.dirname(path))[len("date="):]
+            hour = int(os.path.basename(path)[len("hour="):])
+            hour_start = calendar.timegm(time.strptime(date, "%Y-%m-%d")) + hour * 3600
+        except ValueError:
+            continue
+        if (start is None or hour_start + 3600 > start) and (end is None or hour_start < end):
+            partitions.append((hour_start, path))
+    return sorted(partitions)
+
+
+# --- 3. The Writer ---
+class PredictionLog:
+    """
+    Append-only, columnar log of every assessment, written off the request
+    path.
+
+    `log` and `log_batch` only append a tuple to a deque (no lock, no
+    copy, no I/O). A background thread drains it every `flush_seconds`, or
+    as soon as `flush_entries` are waiting, and writes each UTC hour's rows
+    as a new segment, `<log_dir>/date=YYYY-MM-DD/hour=HH/<pid>-<seq>.npz`,
+    with one array per column (see COLUMNS). Segments are written to a
+    temporary file and renamed, so readers only ever see complete ones.
+    Raw transactions from JSON batches are decoded by the writer thread.
+
+    When `queue_size` entries are already waiting, new ones are dropped and
+    counted in `dropped_rows` instead of making the request wait.
+
+    Every time the UTC hour turns, the writer thread deletes the partitions
+    that ended more than `retention_hours` ago (0 keeps them all). Several
+    serving processes may share `log_dir`; whichever gets there first
+    deletes a partition and the others find it gone.
+
+    Each of `listeners` is called with every segment's columns once it is
+    written, on the writer thread, e.g. to update the drift sketches
+    (src/common/drift.py) without touching the request path.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, queue_size=QUEUE_SIZE, flush_seconds=FLUSH_SECONDS,
+                 flush_entries=FLUSH_ENTRIES, listeners=(), retention_hours=RETENTION_HOURS, compress=COMPRESS):
+        self.log_dir = log_dir
+        self.listeners = list(listeners)
+        self.queue_size = queue_size
+        self.flush_seconds = flush_seconds
+        self.flush_entries = flush_entries
+        self.retention_hours = retention_hours
+        self.compress = compress
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._sequence = 0
+        self._pruned_before = None
+        self.dropped_rows = 0
+        self.written_rows = 0
+        self.segments = 0
+        self.write_errors = 0
+        self.listener_errors = 0
+        self.write_seconds = 0.0
+        self.pruned_partitions = 0
+
+    # The request path.
+    def log(self, features, probability, decision, model_version, latency_ms, timestamp=None):
+        """Queues one assessment; `features` is its decoded (30,) row, or None."""
+        if len(self._queue) >= self.queue_size:
+            self.dropped_rows += 1
+            return
+        self._queue.append((timestamp or time.time(), features, probability, decision, model_version, latency_ms))
+        if len(self._queue) == self.flush_entries:
+            self._wake.set()
+
+    def log_batch(self, features, probabilities, decisions, model_version, latency_ms, timestamp=None):
+        """
+        Queues the rows of one batch request. `features` is their (n, 30)
+        matrix, or the raw transactions (strings or number lists) to be
+        decoded by the writer. `timestamp` defaults to now.
+        """
+        if len(self._queue) >= self.queue_size:
+            self.dropped_rows += len(probabilities)
+            return
+        self._queue.append((timestamp or time.time(), features, probabilities, decisions, model_version, latency_ms))
+        if len(self._queue) == self.flush_entries:
+            self._wake.set()
+
+    # The writer thread.
+    def start(self):
+        """Starts the writer thread (in the serving process, after any fork)."""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stops the writer thread after it has written everything queued."""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+            self.prune()
+
+    def flush(self) -> int:
+        """Writes everything queued so far; returns the number of rows written."""
+        with self._flush_lock:
+            entries = [self._queue.popleft() for _ in range(len(self._queue))]
+            if not entries:
+                return 0
+            start = time.perf_counter()
+            by_hour = {}
+            for entry in entries:
+                by_hour.setdefault(int(entry[0]) // 3600 * 3600, []).append(entry)
+            rows = 0
+            for hour_start, hour_entries in by_hour.items():
+                try:
+                    columns = self._columns(hour_entries)
+                    self._write_segment(hour_start, columns)
+                except Exception as e:
+                    # Never let one bad batch stop the writer thread.
+                    self.write_errors += 1
+                    print(f"❗️Warning: Could not write {len(hour_entries)} logged assessments: {e}")
+                    continue
+                rows += len(columns["timestamp"])
+                for listener in self.listeners:
+                    try:
+                        listener(columns)
+                    except Exception as e:
+                        self.listener_errors += 1
+                        print(f"❗️Warning: Prediction log listener {listener!r} failed: {e}")
+            self.written_rows += rows
+            self.write_seconds += time.perf_counter() - start
+            return rows
+
+    @staticmethod
+    def _columns(entries) -> dict:
+        """Turns queued entries into one array per column."""
+        # Single transactions are converted all at once; batches block by block.
+        singles = [entry for entry in entries if not isinstance(entry[2], np.ndarray)]
+        blocks = [PredictionLog._single_block(singles)] if singles else []
+        for timestamp, features, probabilities, decisions, model_version, latency_ms in entries:
+            if not isinstance(probabilities, np.ndarray):
+                continue
+            n = len(probabilities)
+            if not isinstance(features, np.ndarray):
+                decoded, valid_rows, _ = decode_transactions(features)
+                features = np.full((n, N_FEATURES), np.nan)
+                features[valid_rows] = decoded
+            blocks.append({"timestamp": np.full(n, timestamp), "features": features,
+                           "probability": probabilities, "decision": decisions,
+                           "model_version": np.full(n, model_version), "latency_ms": np.full(n, latency_ms)})
+        features = np.concatenate([block["features"] for block in blocks]).astype(np.float64, copy=False)
+        columns = {name: np.ascontiguousarray(features[:, i]) for i, name in enumerate(FEATURE_NAMES)}
+        for name in ("timestamp", "probability", "decision", "model_version", "latency_ms"):
+            columns[name] = np.concatenate([block[name] for block in blocks]).astype(COLUMNS[name], copy=False)
+        # Keep each segment in time order, as the entries were queued.
+        order = np.argsort(columns["timestamp"], kind="stable")
+        return {name: columns[name][order] for name in COLUMNS}
+
+    @staticmethod
+    def _single_block(entries) -> dict:
+        n = len(entries)
+        features = np.full((n, N_FEATURES), np.nan)
+        for i, entry in enumerate(entries):
+            if entry[1] is not None:
+                features[i] = entry[1]
+        timestamps, _, probabilities, decisions, versions, latencies = zip(*entries)
+        return {"timestamp": np.array(timestamps), "features": features, "probability": np.array(probabilities),
+                "decision": np.array(decisions), "model_version": np.array(versions),
+                "latency_ms": np.array(latencies)}
+
+    def _write_segment(self, hour_start: int, columns: dict) -> str:
+        directory = partition_dir(self.log_dir, hour_start)
+        os.makedirs(directory, exist_ok=True)
+        self._sequence += 1
+        name = f"{os.getpid()}-{int(time.time() * 1000)}-{self._sequence:06d}.npz"
+        path = os.path.join(directory, name)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            (np.savez_compressed if self.compress else np.savez)(f, **columns)
+        os.replace(tmp_path, path)
+        self.segments += 1
+        return path
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Deletes the hour partitions that ended more than `retention_hours`
+        before `now` (default: the current time), at most once per hour
+        boundary crossed; returns the number deleted.
+        """
+        if self.retention_hours <= 0:
+            return 0
+        cutoff = int((now or time.time()) - self.retention_hours * 3600) // 3600 * 3600
+        if self._pruned_before is not None and cutoff <= self._pruned_before:
+            return 0
+        self._pruned_before = cutoff
+        pruned = 0
+        for _, directory in list_partitions(self.log_dir, end=cutoff):
+            # Another serving process may be deleting the same partition.
+            shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(directory))
+            except OSError:
+                pass  # Other hours of that date are still there.
+            pruned += 1
+        self.pruned_partitions += pruned
+        return pruned
+
+    def stats(self) -> dict:
+        return {
+            "log_dir": self.log_dir,
+            "running": self._thread is not None,
+            "queued_entries": len(self._queue),
+            "queue_size": self.queue_size,
+            "written_rows": self.written_rows,
+            "dropped_rows": self.dropped_rows,
+            "segments": self.segments,
+            "write_errors": self.write_errors,
+            "listener_errors": self.listener_errors,
+            "write_seconds": self.write_seconds,
+            "retention_hours": self.retention_hours,
+            "pruned_partitions": self.pruned_partitions,
+        }
+
+
+# --- 4. Scanning ---
+def iter_predictions(start: Optional[float] = None, end: Optional[float] = None,
+                     columns: Optional[Sequence[str]] = None, log_dir: str = LOG_DIR):
+    """
+    Yields {column: array} per segment for the rows with
+    start <= timestamp < end (Unix seconds; None for open ends), oldest
+    partition first. Partitions outside the range are skipped by name, and
+    only the requested columns (all by default) are read from each segment.
+    """
+    names = _column_names(columns)
+    for hour_start, directory in list_partitions(log_dir, start, end):
+        # Only the partitions at the edges of the range need a row filter.
+        filter_rows = (start is not None and hour_start < start) or (end is not None and hour_start + 3600 > end)
+        for path in sorted(glob.glob(os.path.join(directory, "*.npz"))):
+            try:
+                with np.load(path) as segment:
+                    if filter_rows:
+                        timestamps = segment["timestamp"]
+                        keep = np.ones(len(timestamps), dtype=bool)
+                        if start is not None:
+                            keep &= timestamps >= start
+                        if end is not None:
+                            keep &= timestamps < end
+                        if not keep.any():
+                            continue
+                        yield {name: segment[name][keep] for name in names}
+                    else:
+                        yield {name: segment[name] for name in names}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❗️Warning: Skipping unreadable prediction log segment {path}: {e}")
+
+
+def _column_names(columns) -> list:
+    names = list(columns) if columns is not None else list(COLUMNS)
+    unknown = [name for name in names if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown prediction log column(s) {unknown}; expected some of {list(COLUMNS)}.")
+    return names
+
+
+def load_predictions(start: Optional[float] = None, end: Optional[float] = None,
+                     columns: Optional[Sequence[str]] = None, log_dir: str = LOG_DIR) -> dict:
+    """`iter_predictions` concatenated into one array per column (empty arrays if there are no rows)."""
+    names = _column_names(columns)
+    parts = {name: [] for name in names}
+    for segment in iter_predictions(start, end, names, log_dir):
+        for name in names:
+            parts[name].append(segment[name])
+    return {name: np.concatenate(values) if values else np.empty(0, dtype=COLUMNS[name])
+            for name, values in parts.items()}
+
+
+def column_histogram(name: str, edges, start: Optional[float] = None, end: Optional[float] = None,
+                     log_dir: str = LOG_DIR):
+    """
+    Counts one column's logged values in start <= timestamp < end into the
+    bins `edges`, a segment at a time, so memory stays flat however many
+    rows there are. Returns (counts, rows), where `rows` also counts values
+    outside the edges; NaNs are not counted.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    rows = 0
+    for segment in iter_predictions(start, end, [name], log_dir):
+        values = segment[name]
+        values = values[np.isfinite(values)]
+        counts += np.histogram(values, edges)[0]
+        rows += len(values)
+    return counts, rows
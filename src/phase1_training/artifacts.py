@@ -0,0 +1,95 @@
+import os
+
+import joblib
+import numpy as np
+
+from src.common.artifact_bundle import write_artifact_bundle
+from src.common.baseline import compute_baseline, save_baseline
+from src.common.calibration import ProbabilityCalibrator
+from src.common.checksums import file_sha1
+from src.common.compiled_forest import CompiledForest, check_parity
+from src.common.drift import DriftReference
+
+# --- 1. Configuration ---
+MODEL_FILE = "xgb_fraud_detector.joblib"
+SCALER_FILE = "scaler.joblib"
+COMPILED_FILE = "xgb_fraud_detector_compiled.npz"
+FUSED_FILE = "xgb_fraud_detector_fused.npz"
+CALIBRATION_FILE = "probability_calibration.npz"
+DRIFT_REFERENCE_FILE = "drift_reference.npz"
+BASELINE_FILE = "baseline_stats.json"
+# The memory-mapped bundle serving prefers (src/common/artifact_bundle.py).
+BUNDLE_DIRNAME = "bundle"
+ARTIFACT_FILES = (MODEL_FILE, SCALER_FILE, COMPILED_FILE, FUSED_FILE, CALIBRATION_FILE, DRIFT_REFERENCE_FILE,
+                  BASELINE_FILE)
+# The compiled forest's traversal needs memory per row, so parity is checked in blocks.
+PARITY_BLOCK_ROWS = 10_000
+
+
+# --- 2. Writing the Serving Artifacts ---
+def save_serving_artifacts(models_dir, model, scaler, X_check, y_check, probabilities=None) -> dict:
+    """
+    Writes everything the serving side loads for `model` and `scaler` into
+    `models_dir`. Every training path (train_model.py, train_streaming.py,
+    refresh_model.py) saves its artifacts through this function:
+
+    - the model and scaler (joblib, written via rename);
+    - the compiled and fused forests, only if they reproduce the model on
+      the raw held-out features `X_check` (a stale one is removed);
+    - the probability calibration, fitted on the model's probabilities for
+      `X_check` (or `probabilities`, if already computed) and `y_check`;
+    - the drift reference sketch of `X_check` and those probabilities, and
+      the baseline statistics the dashboard compares live traffic with;
+    - all of the above as a memory-mapped artifact bundle in bundle/.
+
+    Returns the parity results, the bundle version and the model version
+    (the first 12 hex digits of the joblib model's SHA-1, which serving logs
+    with every prediction) as metrics.
+    """
+    os.makedirs(models_dir, exist_ok=True)
+    model_path = os.path.join(models_dir, MODEL_FILE)
+    scaler_path = os.path.join(models_dir, SCALER_FILE)
+    for obj, path in ((model, model_path), (scaler, scaler_path)):
+        tmp_path = f"{path}.tmp"
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    model_sha1 = file_sha1(model_path)
+    metrics = {"model_version": model_sha1[:12]}
+
+    X_check = np.asarray(X_check, dtype=np.float64)
+    # Same arithmetic as `scaler.transform`, also for scalers fitted on a DataFrame.
+    X_check_scaled = (X_check - scaler.mean_) / scaler.scale_
+    forest = CompiledForest.from_booster(model.get_booster())
+    exported = {}
+    for name, file_name, candidate, forest_features, extra in (
+        ("compiled", COMPILED_FILE, forest, None, {}),
+        ("fused", FUSED_FILE, forest.fold_scaler(scaler.mean_, scaler.scale_), X_check,
+         {"scaler_sha1": file_sha1(scaler_path)}),
+    ):
+        blocks = [check_parity(candidate, model, X_check_scaled[i:i + PARITY_BLOCK_ROWS],
+                               forest_features=None if forest_features is None
+                               else forest_features[i:i + PARITY_BLOCK_ROWS])
+                  for i in range(0, len(X_check), PARITY_BLOCK_ROWS)]
+        metrics[f"{name}_max_abs_diff"] = max(block["max_abs_diff"] for block in blocks)
+        metrics[f"{name}_decision_mismatches"] = sum(block["decision_mismatches"] for block in blocks)
+        path = os.path.join(models_dir, file_name)
+        if all(block["passed"] for block in blocks):
+            candidate.save(path, model_sha1=model_sha1, **extra)
+            exported[name] = candidate
+        else:
+            print(f"❗️Warning: {name.capitalize()} model failed the parity check and was not saved.")
+            if os.path.exists(path):
+                os.remove(path)
+
+    if probabilities is None:
+        probabilities = model.predict_proba(X_check_scaled)[:, 1]
+    calibrator = ProbabilityCalibrator.fit(probabilities, np.asarray(y_check))
+    calibrator.save(os.path.join(models_dir, CALIBRATION_FILE), model_sha1=model_sha1)
+    DriftReference.fit(X_check, probabilities).save(os.path.join(models_dir, DRIFT_REFERENCE_FILE),
+                                                    model_sha1=model_sha1)
+    save_baseline(compute_baseline(X_check, y_check, probabilities), os.path.join(models_dir, BASELINE_FILE),
+                  model_sha1=model_sha1)
+    metrics["bundle_version"] = write_artifact_bundle(
+        model, scaler, forest=exported.get("compiled"), fused=exported.get("fused"), calibrator=calibrator,
+        bundle_dir=os.path.join(models_dir, BUNDLE_DIRNAME), model_sha1=model_sha1)
+    return metrics
@@ -0,0 +1,149 @@
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import auc, precision_recall_curve
+
+# --- 1. Configuration ---
+# "off" trains the single fixed model; "grid", "random" or "halving" search first.
+SEARCH_STRATEGY = os.getenv("SENTINEL_SEARCH", "off")
+# Candidates drawn for "random" and "halving".
+SEARCH_TRIALS = int(os.getenv("SENTINEL_SEARCH_TRIALS", "12"))
+# Trials trained at once, one process each (default: CPU count).
+SEARCH_WORKERS = int(os.getenv("SENTINEL_SEARCH_WORKERS", "0")) or os.cpu_count() or 1
+# Upper bound on boosting rounds; early stopping on validation AUPRC usually stops sooner.
+SEARCH_MAX_ESTIMATORS = int(os.getenv("SENTINEL_SEARCH_MAX_ESTIMATORS", "300"))
+EARLY_STOPPING_ROUNDS = 20
+# Successive halving: the first rung gets MAX / ETA**(rungs - 1) rounds, and
+# each rung keeps the best 1/ETA of the candidates with ETA times the rounds.
+HALVING_ETA = 3
+
+DEFAULT_SPACE = {
+    "max_depth": [3, 4, 6],
+    "learning_rate": [0.05, 0.1, 0.2],
+    "min_child_weight": [1, 5],
+    "subsample": [0.8, 1.0],
+}
+# A JSON file of {"parameter": [values, ...]} replaces the space above.
+SEARCH_SPACE_FILE = os.getenv("SENTINEL_SEARCH_SPACE")
+if SEARCH_SPACE_FILE:
+    with open(SEARCH_SPACE_FILE) as f:
+        SEARCH_SPACE = json.load(f)
+else:
+    SEARCH_SPACE = DEFAULT_SPACE
+BASE_PARAMS = {
+    "objective": "binary:logistic",
+    "tree_method": "hist",
+    "eval_metric": "aucpr",
+    "random_state": 42,
+}
+
+
+# --- 2. Candidates ---
+def grid_candidates(space=SEARCH_SPACE) -> list:
+    """Every combination of the values in `space`."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_candidates(space=SEARCH_SPACE, n_trials=SEARCH_TRIALS, seed=42) -> list:
+    """`n_trials` distinct combinations drawn from the grid (all of it if it is smaller)."""
+    grid = grid_candidates(space)
+    return random.Random(seed).sample(grid, min(n_trials, len(grid)))
+
+
+# --- 3. Trials ---
+# The training and validation arrays of the current search. Workers are
+# forked after these are set, so every process reads the parent's arrays
+# (copy-on-write, never written) instead of receiving a pickled copy per task.
+_SHARED = {}
+
+
+def _run_trial(task):
+    trial, params, n_estimators, n_jobs = task
+    start = time.perf_counter()
+    model = xgb.XGBClassifier(
+        **BASE_PARAMS, **params, n_estimators=n_estimators, n_jobs=n_jobs,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+    )
+    model.fit(_SHARED["X_fit"], _SHARED["y_fit"], sample_weight=_SHARED["w_fit"],
+              eval_set=[(_SHARED["X_val"], _SHARED["y_val"])], verbose=False)
+    # predict_proba stops at the best iteration found by early stopping.
+    precision, recall, _ = precision_recall_curve(_SHARED["y_val"], model.predict_proba(_SHARED["X_val"])[:, 1])
+    return {
+        "trial": trial,
+        "params": params,
+        "n_estimators": n_estimators,
+        "best_iteration": int(model.best_iteration),
+        "val_auprc": float(auc(recall, precision)),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _evaluate(pool, tasks):
+    if pool is None:
+        return [_run_trial(task) for task in tasks]
+    return list(pool.map(_run_trial, tasks))
+
+
+def run_search(X_fit, y_fit, X_val, y_val, strategy=SEARCH_STRATEGY, space=SEARCH_SPACE,
+               n_trials=SEARCH_TRIALS, workers=SEARCH_WORKERS,
+               max_estimators=SEARCH_MAX_ESTIMATORS, w_fit=None) -> list:
+    """
+    Trains the candidates of `strategy` with the histogram tree method and
+    early stopping on the validation set's AUPRC, `workers` at a time, and
+    returns one result dict per trial (per rung for "halving"). The best
+    trial is the one with the highest `val_auprc` in the last rung.
+    `w_fit` are optional sample weights of the training rows.
+
+    Each worker process trains with CPU count / `workers` threads. Process
+    parallelism needs the fork start method; where it is not available the
+    trials run one after another.
+    """
+    if strategy == "grid":
+        candidates = grid_candidates(space)
+    elif strategy in ("random", "halving"):
+        candidates = random_candidates(space, n_trials)
+    else:
+        raise ValueError(f"Unknown search strategy: {strategy}")
+
+    _SHARED.update(X_fit=np.ascontiguousarray(X_fit), y_fit=np.asarray(y_fit), w_fit=w_fit,
+                   X_val=np.ascontiguousarray(X_val), y_val=np.asarray(y_val))
+    workers = max(1, min(workers, len(candidates)))
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    pool = None
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    try:
+        if strategy != "halving":
+            tasks = [(i, params, max_estimators, n_jobs) for i, params in enumerate(candidates)]
+            return [dict(result, rung=0) for result in _evaluate(pool, tasks)]
+
+        # Enough rungs to narrow the candidates down to one.
+        rungs = int(math.log(len(candidates), HALVING_ETA) + 1e-9) + 1
+        survivors = list(enumerate(candidates))
+        results = []
+        for rung in range(rungs):
+            budget = max(1, max_estimators // HALVING_ETA ** (rungs - 1 - rung))
+            tasks = [(i, params, budget, n_jobs) for i, params in survivors]
+            rung_results = [dict(result, rung=rung) for result in _evaluate(pool, tasks)]
+            results.extend(rung_results)
+            ranked = sorted(rung_results, key=lambda r: r["val_auprc"], reverse=True)
+            survivors = [(r["trial"], r["params"]) for r in ranked[:max(1, len(ranked) // HALVING_ETA)]]
+        return results
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _SHARED.clear()
+
+
+def best_trial(results: list) -> dict:
+    last_rung = max(r["rung"] for r in results)
+    return max((r for r in results if r["rung"] == last_rung), key=lambda r: r["val_auprc"])
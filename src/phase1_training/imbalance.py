@@ -0,0 +1,106 @@
+import os
+import time
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+# --- 1. Configuration ---
+# How training makes up for the ~0.17% fraud rate:
+# - "smote": SMOTE up to a 1:1 balance (the original pipeline);
+# - "weights": no new rows; fraud rows weigh #legit / #fraud (like scale_pos_weight);
+# - "partial_smote": SMOTE only up to PARTIAL_SMOTE_RATIO with a KD-tree
+#   neighbour index, the remaining imbalance made up with weights;
+# - "undersample_ensemble": stages of boosting, each on every fraud row and a
+#   disjoint share of the legitimate rows.
+IMBALANCE_STRATEGY = os.getenv("SENTINEL_IMBALANCE", "smote")
+STRATEGIES = ("smote", "weights", "partial_smote", "undersample_ensemble")
+PARTIAL_SMOTE_RATIO = float(os.getenv("SENTINEL_PARTIAL_SMOTE_RATIO", "0.1"))
+ENSEMBLE_STAGES = int(os.getenv("SENTINEL_ENSEMBLE_STAGES", "5"))
+
+
+def balancing_weights(y) -> np.ndarray:
+    """Per-row weights that give both classes the same total weight."""
+    y = np.asarray(y)
+    positives = max(int(np.sum(y == 1)), 1)
+    return np.where(y == 1, (len(y) - positives) / positives, 1.0)
+
+
+# --- 2. Resampling ---
+def resample(X, y, strategy=IMBALANCE_STRATEGY, random_state=42):
+    """
+    Returns (X, y, sample_weight) to fit a single model on; sample_weight is
+    None when the rows are already balanced. "undersample_ensemble" is
+    trained by `fit_with_strategy` and resamples to plain weights here, which
+    is what the hyperparameter search uses for it.
+    """
+    y = np.asarray(y)
+    if strategy == "smote":
+        from imblearn.over_sampling import SMOTE
+
+        X_resampled, y_resampled = SMOTE(random_state=random_state).fit_resample(X, y)
+        return X_resampled, y_resampled, None
+    if strategy in ("weights", "undersample_ensemble"):
+        return X, y, balancing_weights(y)
+    if strategy == "partial_smote":
+        from imblearn.over_sampling import SMOTE
+
+        # SMOTE only looks for neighbours among the fraud rows; the KD-tree
+        # makes that search cheap, and the smaller ratio creates a tenth of
+        # the synthetic rows.
+        smote = SMOTE(sampling_strategy=PARTIAL_SMOTE_RATIO, random_state=random_state,
+                      k_neighbors=NearestNeighbors(n_neighbors=6, algorithm="kd_tree"))
+        X_resampled, y_resampled = smote.fit_resample(X, y)
+        return X_resampled, y_resampled, balancing_weights(y_resampled)
+    raise ValueError(f"Unknown imbalance strategy: {strategy}. Choose one of {', '.join(STRATEGIES)}.")
+
+
+# --- 3. Training ---
+def fit_with_strategy(make_model, X, y, strategy=IMBALANCE_STRATEGY, n_estimators=100, random_state=42):
+    """
+    Fits `make_model(n_estimators=...)` (an XGBClassifier factory) with the
+    given imbalance strategy. Returns (model, info), where info holds the
+    resampling and fit times and the rows the model was trained on (per
+    stage for the ensemble).
+
+    The undersampling ensemble is one booster grown in ENSEMBLE_STAGES
+    stages of n_estimators / ENSEMBLE_STAGES trees. Each stage continues
+    boosting on every fraud row plus its own share of the legitimate rows,
+    so every row is used once and the result deploys, compiles and fuses
+    like any other model.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    if strategy == "undersample_ensemble":
+        start = time.perf_counter()
+        rng = np.random.default_rng(random_state)
+        positives = np.flatnonzero(y == 1)
+        shares = np.array_split(rng.permutation(np.flatnonzero(y != 1)), ENSEMBLE_STAGES)
+        rounds = np.diff(np.linspace(0, n_estimators, ENSEMBLE_STAGES + 1).round().astype(int))
+        stages = [np.sort(np.concatenate([positives, share])) for share in shares]
+        resample_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model, booster = None, None
+        for rows, stage_rounds in zip(stages, rounds):
+            model = make_model(n_estimators=int(stage_rounds))
+            model.fit(X[rows], y[rows], sample_weight=balancing_weights(y[rows]), xgb_model=booster)
+            booster = model.get_booster()
+        return model, {
+            "resample_seconds": resample_seconds,
+            "fit_seconds": time.perf_counter() - start,
+            "train_rows": int(len(stages[0])),
+            "train_distribution": {0: int(len(stages[0]) - len(positives)), 1: int(len(positives))},
+        }
+
+    start = time.perf_counter()
+    X_fit, y_fit, sample_weight = resample(X, y, strategy, random_state)
+    resample_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    model = make_model(n_estimators=n_estimators)
+    model.fit(X_fit, y_fit, sample_weight=sample_weight)
+    return model, {
+        "resample_seconds": resample_seconds,
+        "fit_seconds": time.perf_counter() - start,
+        "train_rows": int(len(y_fit)),
+        "train_distribution": {0: int(np.sum(y_fit != 1)), 1: int(np.sum(y_fit == 1))},
+    }
@@ -0,0 +1,234 @@
+import argparse
+import copy
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import auc, precision_recall_curve
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.artifact_bundle import publish_version
+from src.common.checksums import file_sha1
+from src.common.features import FEATURE_NAMES
+from src.phase1_training.artifacts import (
+    ARTIFACT_FILES,
+    BUNDLE_DIRNAME,
+    MODEL_FILE,
+    SCALER_FILE,
+    save_serving_artifacts,
+)
+from src.phase1_training.imbalance import IMBALANCE_STRATEGY, resample
+
+# --- 1. Configuration and Setup ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+# Every refresh is written to models/versions/<version>/ before it is promoted.
+VERSIONS_DIRNAME = "versions"
+# Trees appended per refresh.
+REFRESH_ROUNDS = int(os.getenv("SENTINEL_REFRESH_ROUNDS", "20"))
+# The refreshed model is only promoted if its AUPRC on the evaluation rows is
+# at most this much below the previous model's.
+MAX_AUPRC_DROP = float(os.getenv("SENTINEL_REFRESH_MAX_AUPRC_DROP", "0.01"))
+# Without a separate evaluation file, the newest part of the batch is held out.
+EVAL_FRACTION = 0.2
+
+
+def scale(scaler, features):
+    """Same arithmetic as `scaler.transform`, also for scalers fitted on a DataFrame."""
+    return (features - scaler.mean_) / scaler.scale_
+
+
+def auprc(labels, probabilities) -> float:
+    precision, recall, _ = precision_recall_curve(labels, probabilities)
+    return float(auc(recall, precision))
+
+
+# --- 2. Rescaling an Existing Booster ---
+def remap_thresholds(booster, old_scaler, new_scaler) -> xgb.Booster:
+    """
+    Returns a copy of `booster` for inputs scaled with `new_scaler` instead
+    of `old_scaler`. A split `(x - m_old) / s_old < t` is the same split as
+    `(x - m_new) / s_new < (t * s_old + m_old - m_new) / s_new`, so only the
+    thresholds change. They are stored as float32, so a row lying exactly
+    on a boundary can rarely go the other way.
+    """
+    config = booster.save_config()
+    model = json.loads(booster.save_raw("json"))
+    old_mean, old_scale = old_scaler.mean_, old_scaler.scale_
+    new_mean, new_scale = new_scaler.mean_, new_scaler.scale_
+    for tree in model["learner"]["gradient_booster"]["model"]["trees"]:
+        is_split = np.asarray(tree["left_children"]) != -1
+        feature = np.asarray(tree["split_indices"])
+        threshold = np.asarray(tree["split_conditions"], dtype=np.float64)
+        remapped = (threshold * old_scale[feature] + old_mean[feature] - new_mean[feature]) / new_scale[feature]
+        # For leaves `split_conditions` holds the leaf value; leave those alone.
+        tree["split_conditions"] = np.where(is_split, remapped, threshold).tolist()
+    remapped_booster = xgb.Booster()
+    remapped_booster.load_model(bytearray(json.dumps(model).encode()))
+    # load_model only restores the trees; keep the training parameters for continued boosting.
+    remapped_booster.load_config(config)
+    return remapped_booster
+
+
+# --- 3. Incremental Refresh ---
+def refresh_model(X_batch, y_batch, X_eval, y_eval, models_dir=MODELS_DIR, rounds=REFRESH_ROUNDS,
+                  update_scaler=False, promote=True) -> dict:
+    """
+    Appends `rounds` trees, trained on a new labeled batch, to the current
+    model in `models_dir` (XGBoost continued training), instead of
+    retraining on the full history.
+
+    The existing scaler is reused, or with `update_scaler` its running
+    mean and variance are updated with the batch (`partial_fit`) and the
+    existing trees' thresholds are remapped to the new scaling. The new
+    model and its compiled, fused and calibration artifacts are written to
+    models/versions/<version>/. Its AUPRC on the evaluation rows is compared
+    with the previous model's. Only if it is at most MAX_AUPRC_DROP lower,
+    and `promote` is set, are the files copied into `models_dir`, where
+    serving hot-reloads them. The previous artifacts are archived under
+    their own version first, so a refresh can be rolled back.
+    """
+    timings = {}
+    start = time.perf_counter()
+    model = joblib.load(os.path.join(models_dir, MODEL_FILE))
+    scaler = joblib.load(os.path.join(models_dir, SCALER_FILE))
+    parent_version = file_sha1(os.path.join(models_dir, MODEL_FILE))[:12]
+    X_batch = np.asarray(X_batch, dtype=np.float64)
+    X_eval = np.asarray(X_eval, dtype=np.float64)
+
+    new_scaler = copy.deepcopy(scaler)
+    booster = model.get_booster()
+    if update_scaler:
+        new_scaler.partial_fit(pd.DataFrame(X_batch, columns=FEATURE_NAMES)
+                               if hasattr(scaler, "feature_names_in_") else X_batch)
+        booster = remap_thresholds(booster, scaler, new_scaler)
+
+    X_fit, y_fit, sample_weight = resample(scale(new_scaler, X_batch), y_batch)
+    new_booster = xgb.train({}, xgb.DMatrix(X_fit, label=y_fit, weight=sample_weight),
+                            num_boost_round=rounds, xgb_model=booster)
+    refreshed = xgb.XGBClassifier(**model.get_params())
+    refreshed.load_model(bytearray(new_booster.save_raw()))
+    refreshed.get_booster().load_config(new_booster.save_config())
+    timings["refresh_seconds"] = time.perf_counter() - start
+
+    previous_probabilities = model.predict_proba(scale(scaler, X_eval))[:, 1]
+    refreshed_probabilities = refreshed.predict_proba(scale(new_scaler, X_eval))[:, 1]
+    result = {
+        "parent_version": parent_version,
+        "batch_rows": int(len(X_batch)),
+        "eval_rows": int(len(X_eval)),
+        "rounds": int(rounds),
+        "update_scaler": bool(update_scaler),
+        "imbalance_strategy": IMBALANCE_STRATEGY,
+        "previous_auprc": auprc(y_eval, previous_probabilities),
+        "refreshed_auprc": auprc(y_eval, refreshed_probabilities),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    result["passed"] = result["refreshed_auprc"] >= result["previous_auprc"] - MAX_AUPRC_DROP
+
+    versions_dir = os.path.join(models_dir, VERSIONS_DIRNAME)
+    staging_dir = os.path.join(versions_dir, f".staging-{os.getpid()}")
+    start = time.perf_counter()
+    result.update(save_serving_artifacts(staging_dir, refreshed, new_scaler, X_eval, y_eval,
+                                         probabilities=refreshed_probabilities))
+    result["version"] = file_sha1(os.path.join(staging_dir, MODEL_FILE))[:12]
+    version_dir = os.path.join(versions_dir, result["version"])
+    with open(os.path.join(staging_dir, "metadata.json"), "w") as f:
+        json.dump(result, f, indent=2)
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(staging_dir, version_dir)
+    timings["export_seconds"] = time.perf_counter() - start
+
+    result["promoted"] = bool(result["passed"] and promote)
+    if result["promoted"]:
+        _archive(models_dir, os.path.join(versions_dir, parent_version))
+        _install(version_dir, models_dir, result["bundle_version"])
+    return {**result, **timings}
+
+
+def _archive(models_dir, archive_dir):
+    """Copies the current artifacts to models/versions/<version>/ once."""
+    if os.path.exists(archive_dir):
+        return
+    os.makedirs(archive_dir)
+    for name in ARTIFACT_FILES:
+        path = os.path.join(models_dir, name)
+        if os.path.exists(path):
+            shutil.copy2(path, archive_dir)
+
+
+def _install(version_dir, models_dir, bundle_version):
+    """
+    Copies a version's artifacts into `models_dir` via rename; derived files
+    it lacks are removed. Its artifact bundle is made the current one last.
+    """
+    for name in ARTIFACT_FILES:
+        source, target = os.path.join(version_dir, name), os.path.join(models_dir, name)
+        if os.path.exists(source):
+            shutil.copyfile(source, f"{target}.tmp")
+            os.replace(f"{target}.tmp", target)
+        elif os.path.exists(target):
+            os.remove(target)
+    bundle_dir = os.path.join(models_dir, BUNDLE_DIRNAME)
+    target = os.path.join(bundle_dir, bundle_version)
+    if not os.path.exists(target):
+        staging = os.path.join(bundle_dir, f".staging-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(os.path.join(version_dir, BUNDLE_DIRNAME, bundle_version), staging)
+        os.replace(staging, target)
+    publish_version(bundle_dir, bundle_version)
+
+
+# --- 4. Command Line ---
+def load_labeled(path):
+    df = pd.read_csv(path, usecols=FEATURE_NAMES + ['Class'])
+    return df[FEATURE_NAMES].to_numpy(dtype=np.float64), df['Class'].to_numpy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append trees trained on a new labeled batch to the current model.")
+    parser.add_argument("batch", help="CSV with the 30 feature columns and Class, oldest rows first.")
+    parser.add_argument("--eval", help="Labeled CSV for the quality check (default: newest 20%% of the batch).")
+    parser.add_argument("--rounds", type=int, default=REFRESH_ROUNDS, help="Trees to append.")
+    parser.add_argument("--update-scaler", action="store_true", help="Update the scaler's running statistics.")
+    parser.add_argument("--no-promote", action="store_true", help="Only write the new version.")
+    args = parser.parse_args()
+
+    import mlflow
+
+    X_batch, y_batch = load_labeled(args.batch)
+    if args.eval:
+        X_eval, y_eval = load_labeled(args.eval)
+    else:
+        split = int(len(X_batch) * (1 - EVAL_FRACTION))
+        X_batch, X_eval, y_batch, y_eval = X_batch[:split], X_batch[split:], y_batch[:split], y_batch[split:]
+    if not np.any(y_eval == 1) or not np.any(y_batch == 1):
+        print("❌ Error: The batch and the evaluation rows both need fraud examples.")
+        sys.exit(1)
+
+    mlflow.set_experiment("Credit Card Fraud Detection")
+    with mlflow.start_run(run_name="refresh") as run:
+        print(f"MLflow Run ID: {run.info.run_id}")
+        print(f"Refreshing the model with {len(X_batch)} new rows ({args.rounds} trees)...")
+        result = refresh_model(X_batch, y_batch, X_eval, y_eval, rounds=args.rounds,
+                               update_scaler=args.update_scaler, promote=not args.no_promote)
+        mlflow.log_params({key: result[key] for key in (
+            "parent_version", "version", "bundle_version", "batch_rows", "eval_rows", "rounds", "update_scaler", "imbalance_strategy")})
+        mlflow.log_metrics({key: float(value) for key, value in result.items()
+                            if key.endswith(("_auprc", "_seconds", "_max_abs_diff", "_mismatches"))})
+        mlflow.log_artifacts(os.path.join(MODELS_DIR, VERSIONS_DIRNAME, result["version"]))
+        print(f"AUPRC on {result['eval_rows']} evaluation rows: previous {result['previous_auprc']:.4f}, "
+              f"refreshed {result['refreshed_auprc']:.4f} ({result['refresh_seconds']:.2f}s)")
+        if not result["passed"]:
+            print(f"❌ Version {result['version']} failed the quality check and was not promoted.")
+            sys.exit(1)
+        status = "promoted to" if result["promoted"] else "saved in"
+        print(f"✅ Version {result['version']} {status} {MODELS_DIR}.")
@@ -1,13 +1,22 @@
 import os
-import pandas as pd
+import sys
+import time
+import numpy as np
 import mlflow
-import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, precision_recall_curve, auc
-from imblearn.over_sampling import SMOTE
+from sklearn.metrics import brier_score_loss, classification_report, log_loss, precision_recall_curve, auc
 import xgboost as xgb
 
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.calibration import ProbabilityCalibrator
+from src.common.dataset_cache import load_frame
+from src.phase1_training.artifacts import ARTIFACT_FILES, BUNDLE_DIRNAME, save_serving_artifacts
+from src.phase1_training.hyperparameter_search import SEARCH_STRATEGY, SEARCH_WORKERS, best_trial, run_search
+from src.phase1_training.imbalance import IMBALANCE_STRATEGY, fit_with_strategy, resample
+
 # --- 1. Configuration and Setup ---
 # Define project directories
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,9 +34,10 @@ mlflow.set_experiment("Credit Card Fraud Detection")
 with mlflow.start_run() as run:
     print(f"MLflow Run ID: {run.info.run_id}")
 
-    # Load data
+    # Load data from the columnar cache built by kaggle-data-download-setup.py,
+    # falling back to the CSV when the cache is missing or stale.
     print("Loading data...")
-    df = pd.read_csv(DATA_FILE)
+    df = load_frame(csv_path=DATA_FILE)
 
     # Preprocessing
     print("Preprocessing data...")
@@ -47,31 +57,68 @@ with mlflow.start_run() as run:
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
 
-    # Log class distribution before SMOTE
+    # Log class distribution before resampling
     print("Original training set shape: %s" % y_train.value_counts())
     mlflow.log_param("original_train_distribution", y_train.value_counts().to_dict())
 
-    # Apply SMOTE to handle class imbalance
-    print("Applying SMOTE to handle class imbalance...")
-    smote = SMOTE(random_state=42)
-    X_train_resampled, y_train_resampled = smote.fit_resample(X_train_scaled, y_train)
-    
-    # Log class distribution after SMOTE
-    print("Resampled training set shape: %s" % pd.Series(y_train_resampled).value_counts())
-    mlflow.log_param("resampled_train_distribution", pd.Series(y_train_resampled).value_counts().to_dict())
-
-    # Model Training
-    print("Training XGBoost model...")
-    model = xgb.XGBClassifier(
-        objective='binary:logistic',
-        eval_metric='logloss',
-        use_label_encoder=False,
-        n_estimators=100,
-        learning_rate=0.1,
-        max_depth=3,
-        random_state=42
+    # Hyperparameter search (SENTINEL_SEARCH=grid|random|halving). Trials are
+    # fitted with the imbalance strategy below and early-stopped on a
+    # validation split that keeps the real class balance; the test set stays
+    # untouched.
+    if SEARCH_STRATEGY != "off":
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X_train_scaled, y_train, test_size=0.2, random_state=42, stratify=y_train
+        )
+        X_fit_resampled, y_fit_resampled, w_fit = resample(X_fit, y_fit)
+        print(f"Running {SEARCH_STRATEGY} hyperparameter search with {SEARCH_WORKERS} workers...")
+        search_start = time.perf_counter()
+        trials = run_search(X_fit_resampled, y_fit_resampled, X_val, y_val, w_fit=w_fit)
+        search_seconds = time.perf_counter() - search_start
+        for trial in trials:
+            with mlflow.start_run(run_name=f"trial-{trial['trial']}-rung-{trial['rung']}", nested=True):
+                mlflow.log_params({**trial["params"], "n_estimators": trial["n_estimators"], "rung": trial["rung"]})
+                mlflow.log_metrics({"val_auprc": trial["val_auprc"], "best_iteration": trial["best_iteration"],
+                                    "fit_seconds": trial["seconds"]})
+        best = best_trial(trials)
+        print(f"Best of {len(trials)} trials in {search_seconds:.1f}s: {best['params']} "
+              f"({best['best_iteration'] + 1} trees, validation AUPRC {best['val_auprc']:.4f})")
+        mlflow.log_params({"search_strategy": SEARCH_STRATEGY, "search_workers": SEARCH_WORKERS,
+                           "search_trials": len(trials)})
+        mlflow.log_metrics({"search_seconds": search_seconds, "search_best_val_auprc": best["val_auprc"]})
+
+    # Model Training, with the class-imbalance strategy from SENTINEL_IMBALANCE
+    print(f"Training XGBoost model ({IMBALANCE_STRATEGY})...")
+    if SEARCH_STRATEGY != "off":
+        # Promote the best trial: refit its parameters on the whole training set
+        # with the number of trees early stopping picked.
+        model_params = dict(
+            objective='binary:logistic',
+            eval_metric='logloss',
+            tree_method='hist',
+            n_estimators=best["best_iteration"] + 1,
+            random_state=42,
+            **best["params"],
+        )
+    else:
+        model_params = dict(
+            objective='binary:logistic',
+            eval_metric='logloss',
+            use_label_encoder=False,
+            n_estimators=100,
+            learning_rate=0.1,
+            max_depth=3,
+            random_state=42
+        )
+    model, imbalance = fit_with_strategy(
+        lambda **overrides: xgb.XGBClassifier(**{**model_params, **overrides}),
+        X_train_scaled, y_train, n_estimators=model_params["n_estimators"],
     )
-    model.fit(X_train_resampled, y_train_resampled)
+    print(f"Trained on {imbalance['train_distribution']} rows: resampling {imbalance['resample_seconds']:.2f}s, "
+          f"fit {imbalance['fit_seconds']:.2f}s")
+    mlflow.log_param("imbalance_strategy", IMBALANCE_STRATEGY)
+    mlflow.log_param("resampled_train_distribution", imbalance["train_distribution"])
+    mlflow.log_metrics({"imbalance_resample_seconds": imbalance["resample_seconds"],
+                        "fit_seconds": imbalance["fit_seconds"]})
     mlflow.log_params(model.get_params())
 
     # Evaluation
@@ -96,18 +143,45 @@ with mlflow.start_run() as run:
     print(f"\nArea Under the Precision-Recall Curve (AUPRC): {auprc:.4f}")
     mlflow.log_metric("auprc", auprc)
 
-    # Save the model and scaler
-    print("Saving model and scaler...")
-    model_path = os.path.join(MODELS_DIR, "xgb_fraud_detector.joblib")
-    scaler_path = os.path.join(MODELS_DIR, "scaler.joblib")
-    
-    joblib.dump(model, model_path)
-    joblib.dump(scaler, scaler_path)
-    
-    print(f"Model saved to: {model_path}")
-    print(f"Scaler saved to: {scaler_path}")
-    mlflow.log_artifact(model_path)
-    mlflow.log_artifact(scaler_path)
+    # SMOTE makes the raw probabilities far too high for the real class
+    # balance. Check the calibration method by fitting it on half of the
+    # held-out set and scoring the other half; the calibration shipped below
+    # is fitted on the whole test split.
+    print("Evaluating probability calibration...")
+    proba_calib, proba_eval, y_calib, y_eval = train_test_split(
+        y_pred_proba, y_test.to_numpy(), test_size=0.5, random_state=42, stratify=y_test
+    )
+    calibrated_eval = ProbabilityCalibrator.fit(proba_calib, y_calib)(proba_eval)
+    for name, probabilities in (("raw", proba_eval), ("calibrated", calibrated_eval)):
+        brier = brier_score_loss(y_eval, probabilities)
+        logloss = log_loss(y_eval, np.clip(probabilities, 1e-7, 1 - 1e-7), labels=[0, 1])
+        print(f"{name:>10} probabilities: Brier score {brier:.5f}, log loss {logloss:.5f}")
+        mlflow.log_metric(f"{name}_brier_score", brier)
+        mlflow.log_metric(f"{name}_log_loss", logloss)
+
+    # Everything serving loads, written the same way by every training path:
+    # model and scaler, the compiled and fused forests (only if they pass the
+    # parity check on the test split), the calibration, the drift reference,
+    # the dashboard's baseline statistics and the memory-mapped bundle.
+    print("Saving serving artifacts...")
+    artifact_metrics = save_serving_artifacts(MODELS_DIR, model, scaler, X_test.to_numpy(), y_test.to_numpy(),
+                                              probabilities=y_pred_proba)
+    bundle_version = artifact_metrics.pop("bundle_version")
+    model_version = artifact_metrics.pop("model_version")
+    for name, value in artifact_metrics.items():
+        print(f"{name}: {value}")
+    mlflow.log_metrics(artifact_metrics)
+    mlflow.set_tag("bundle_version", bundle_version)
+    # The id serving logs with every prediction (ModelBundle.model_id).
+    mlflow.set_tag("model_version", model_version)
+    for name in ARTIFACT_FILES:
+        path = os.path.join(MODELS_DIR, name)
+        if os.path.exists(path):
+            print(f"Saved: {path}")
+            mlflow.log_artifact(path)
+    mlflow.log_artifacts(os.path.join(MODELS_DIR, BUNDLE_DIRNAME, bundle_version),
+                         artifact_path=f"{BUNDLE_DIRNAME}/{bundle_version}")
+    print(f"Artifact bundle {bundle_version} saved to: {os.path.join(MODELS_DIR, BUNDLE_DIRNAME, bundle_version)}")
 
     print("\n--- Training complete! ---")
     print("Run 'mlflow ui' in your terminal to see the experiment results.")
@@ -0,0 +1,223 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import auc
+from sklearn.preprocessing import StandardScaler
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.dataset_cache import iter_chunks
+from src.common.features import FEATURE_NAMES
+from src.phase1_training.artifacts import (
+    ARTIFACT_FILES,
+    BUNDLE_DIRNAME,
+    save_serving_artifacts,
+)
+
+# --- 1. Configuration and Setup ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_FILE = os.path.join(BASE_DIR, "data", "creditcard.csv")
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+# Rows read, scaled and handed to XGBoost at a time; bounds the memory of every pass.
+CHUNK_ROWS = int(os.getenv("SENTINEL_STREAM_CHUNK_ROWS", "100000"))
+# Test rows kept in memory for the compiled-model parity check and calibration.
+SAMPLE_ROWS = int(os.getenv("SENTINEL_STREAM_SAMPLE_ROWS", "100000"))
+TEST_PERCENT = 20
+# Score bins of the streaming precision-recall curve.
+PR_BINS = 10_000
+
+# The same model as train_model.py, with the histogram method that external memory needs.
+XGB_PARAMS = {
+    "objective": "binary:logistic",
+    "eval_metric": "logloss",
+    "tree_method": "hist",
+    "max_depth": 3,
+    "eta": 0.1,
+    "seed": 42,
+}
+N_ESTIMATORS = 100
+
+
+# --- 2. Streaming the Data ---
+def is_test_row(row_index: np.ndarray) -> np.ndarray:
+    """
+    A fixed ~20% of rows, chosen by a multiplicative hash of the row index.
+    Unlike train_test_split it needs no pass over the data, and every pass
+    sees the same split.
+    """
+    return (row_index.astype(np.uint64) * np.uint64(2654435761) % np.uint64(2**32)) % np.uint64(100) < TEST_PERCENT
+
+
+def iter_split(csv_path, chunk_rows, test):
+    """Yields (features, labels) of the train or test rows, one chunk at a time."""
+    offset = 0
+    for chunk in iter_chunks(FEATURE_NAMES + ['Class'], csv_path, chunk_rows=chunk_rows):
+        n = len(chunk['Class'])
+        mask = is_test_row(np.arange(offset, offset + n)) == test
+        offset += n
+        features = np.column_stack([chunk[name] for name in FEATURE_NAMES])[mask]
+        yield features, np.asarray(chunk['Class'])[mask]
+
+
+class ScaledChunkIterator(xgb.DataIter):
+    """
+    Feeds XGBoost's external-memory DMatrix one scaled chunk of training
+    rows at a time. XGBoost writes each chunk to its page cache on disk, so
+    the rows are never all in memory. Fraud rows get `positive_weight`, which
+    balances the classes like SMOTE did without creating synthetic rows.
+    """
+
+    def __init__(self, csv_path, chunk_rows, scaler, positive_weight, cache_prefix):
+        self.csv_path = csv_path
+        self.chunk_rows = chunk_rows
+        self.scaler = scaler
+        self.positive_weight = positive_weight
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_split(self.csv_path, self.chunk_rows, test=False)
+        for features, labels in self._chunks:
+            if len(labels):
+                input_data(data=self.scaler.transform(features), label=labels,
+                           weight=np.where(labels == 1, self.positive_weight, 1.0))
+                return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+
+class StreamingPRCurve:
+    """
+    Precision-recall curve from per-bin counts of fraud and non-fraud
+    scores, so AUPRC needs O(bins) memory instead of every test score.
+    """
+
+    def __init__(self, bins=PR_BINS):
+        self.positives = np.zeros(bins, dtype=np.int64)
+        self.negatives = np.zeros(bins, dtype=np.int64)
+
+    def update(self, probabilities, labels):
+        bins = np.minimum((probabilities * len(self.positives)).astype(np.int64), len(self.positives) - 1)
+        self.positives += np.bincount(bins[labels == 1], minlength=len(self.positives))
+        self.negatives += np.bincount(bins[labels != 1], minlength=len(self.negatives))
+
+    def auprc(self) -> float:
+        true_positives = np.cumsum(self.positives[::-1])
+        false_positives = np.cumsum(self.negatives[::-1])
+        predicted = np.maximum(true_positives + false_positives, 1)
+        precision = np.concatenate([[1.0], true_positives / predicted])
+        recall = np.concatenate([[0.0], true_positives / max(true_positives[-1], 1)])
+        return float(auc(recall, precision))
+
+
+# --- 3. Streaming Training ---
+def train_streaming(csv_path=DATA_FILE, models_dir=MODELS_DIR, chunk_rows=CHUNK_ROWS,
+                    sample_rows=SAMPLE_ROWS, n_estimators=N_ESTIMATORS) -> dict:
+    """
+    Trains the fraud model in three passes over the data, each holding one
+    chunk of rows at a time:
+
+    1. fit the StandardScaler with `partial_fit` and count the classes;
+    2. train XGBoost from an external-memory DMatrix built by
+       `ScaledChunkIterator`, with fraud rows weighted instead of oversampled;
+    3. score the test rows into a streaming precision-recall curve and a
+       confusion matrix, keeping the first `sample_rows` test rows for the
+       compiled-model checks and calibration.
+
+    XGBoost itself still keeps a label, weight and gradient per training row
+    (about 20 bytes, versus 248 for the row's features). Saves the same
+    artifacts as train_model.py to `models_dir` and returns the metrics.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    counts = np.zeros(2, dtype=np.int64)
+    for features, labels in iter_split(csv_path, chunk_rows, test=False):
+        if len(labels):
+            scaler.partial_fit(features)
+            counts += np.bincount(labels.astype(np.int64), minlength=2)[:2]
+    positive_weight = counts[0] / max(counts[1], 1)
+    timings["scaler_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        iterator = ScaledChunkIterator(csv_path, chunk_rows, scaler, positive_weight,
+                                       cache_prefix=os.path.join(cache_dir, "train"))
+        dtrain = xgb.DMatrix(iterator)
+        booster = xgb.train(XGB_PARAMS, dtrain, num_boost_round=n_estimators)
+        del dtrain
+    timings["train_seconds"] = time.perf_counter() - start
+    # Wrap the booster so serving loads it like the model from train_model.py.
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(booster.save_raw()))
+
+    start = time.perf_counter()
+    curve = StreamingPRCurve()
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    sample_features, sample_labels, sample_probabilities = [], [], []
+    kept = 0
+    for features, labels in iter_split(csv_path, chunk_rows, test=True):
+        if not len(labels):
+            continue
+        probabilities = booster.predict(xgb.DMatrix(scaler.transform(features)))
+        curve.update(probabilities, labels)
+        np.add.at(confusion, (labels.astype(np.int64), (probabilities > 0.5).astype(np.int64)), 1)
+        if kept < sample_rows:
+            take = sample_rows - kept
+            sample_features.append(features[:take])
+            sample_labels.append(labels[:take])
+            sample_probabilities.append(probabilities[:take])
+            kept += len(labels[:take])
+    timings["evaluate_seconds"] = time.perf_counter() - start
+
+    true_positives, false_positives, false_negatives = confusion[1, 1], confusion[0, 1], confusion[1, 0]
+    metrics = {
+        "train_rows": int(counts.sum()),
+        "test_rows": int(confusion.sum()),
+        "positive_weight": float(positive_weight),
+        "auprc": curve.auprc(),
+        "precision_fraud": float(true_positives / max(true_positives + false_positives, 1)),
+        "recall_fraud": float(true_positives / max(true_positives + false_negatives, 1)),
+        **timings,
+    }
+
+    X_sample = np.concatenate(sample_features)
+    y_sample = np.concatenate(sample_labels)
+    metrics.update(save_serving_artifacts(models_dir, model, scaler, X_sample, y_sample,
+                                          probabilities=np.concatenate(sample_probabilities)))
+    return metrics
+
+
+if __name__ == "__main__":
+    import mlflow
+
+    mlflow.set_experiment("Credit Card Fraud Detection")
+    with mlflow.start_run(run_name="streaming") as run:
+        print(f"MLflow Run ID: {run.info.run_id}")
+        print(f"Training out of core in chunks of {CHUNK_ROWS} rows...")
+        mlflow.log_params({**XGB_PARAMS, "n_estimators": N_ESTIMATORS, "chunk_rows": CHUNK_ROWS,
+                           "imbalance": "positive_weight"})
+        metrics = train_streaming()
+        for name, value in metrics.items():
+            print(f"{name}: {value}")
+        bundle_version = metrics.pop("bundle_version")
+        mlflow.set_tag("bundle_version", bundle_version)
+        mlflow.set_tag("model_version", metrics.pop("model_version"))
+        mlflow.log_metrics(metrics)
+        for name in ARTIFACT_FILES:
+            path = os.path.join(MODELS_DIR, name)
+            if os.path.exists(path):
+                mlflow.log_artifact(path)
+        mlflow.log_artifacts(os.path.join(MODELS_DIR, BUNDLE_DIRNAME, bundle_version),
+                             artifact_path=f"{BUNDLE_DIRNAME}/{bundle_version}")
+        print("\n--- Streaming training complete! ---")
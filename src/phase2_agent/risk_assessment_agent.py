@@ -1,66 +1,96 @@
-import joblib
-import pandas as pd
-import numpy as np
+import hashlib
+import sys
+import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import tool, AgentExecutor, create_react_agent
-from langchain import hub
+from pydantic import BaseModel
+from typing import Literal
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.assessment_cache import CACHE_DIR, AssessmentCache
+from src.common.features import TransactionDecodeError, decode_transaction
+from src.common.model_registry import FRAUD_THRESHOLD, get_model_registry
 
 # --- 1. Load Environment Variables and Models ---
+# LangChain and the Gemini client take seconds to import, so they are only
+# imported when an LLM agent is actually built (see section 3). Clear-cut
+# transactions are answered without ever loading them.
 load_dotenv()
 
-MODEL_PATH = "models/xgb_fraud_detector.joblib"
-SCALER_PATH = "models/scaler.joblib"
+model_registry = get_model_registry()
 
 try:
-    model = joblib.load(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
+    model_registry.get()
     print("✅ Model and scaler loaded successfully.")
 except FileNotFoundError:
     print("❌ Error: Model or scaler not found. Please run Phase 1 first.")
     exit()
 
 # --- 2. Create the Fraud Detection Tool ---
-@tool
+def score_transaction(transaction_details: str):
+    """
+    Scores one transaction. Returns `(result, probability)`: FRAUD / NOT FRAUD
+    (decided on the model's own threshold) and the calibrated fraud probability.
+    Raises TransactionDecodeError for invalid input.
+    """
+    # Parsed straight into a reused float64 buffer; the model takes the
+    # raw NumPy row, so no DataFrame is built per call.
+    return score_features(decode_transaction(transaction_details))
+
+def score_features(features, bundle=None):
+    """`score_transaction` for an already-decoded feature vector, with `bundle` or the current model."""
+    bundle = bundle or model_registry.get()
+    raw_probability = bundle.predict_proba(features.reshape(1, -1))[0]
+    result = "FRAUD" if raw_probability > FRAUD_THRESHOLD else "NOT FRAUD"
+    return result, float(bundle.calibrate(raw_probability))
+
 def fraud_detection_tool(transaction_details: str) -> str:
     """
     Analyzes a credit card transaction to determine if it is fraudulent.
     Input should be a comma-separated string of 30 numerical values
     representing the transaction features in the order: Time, V1-V28, Amount.
     Returns 'FRAUD' if the transaction is likely fraudulent,
-    'NOT FRAUD' if it is likely legitimate.
+    'NOT FRAUD' if it is likely legitimate, followed by the model's
+    calibrated fraud probability.
     """
     try:
-        features = np.array([float(val) for val in transaction_details.split(',')])
-        
-        if len(features) != 30:
-            return "Error: Input must contain exactly 30 numerical values."
-
-        # --- FIX: Create a DataFrame with the correct feature names ---
-        # This matches the format the StandardScaler was trained on.
-        col_names = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
-        features_df = pd.DataFrame([features], columns=col_names)
-
-        # Use the DataFrame for scaling and prediction
-        scaled_features = scaler.transform(features_df)
-        prediction = model.predict(scaled_features)
-        
-        result = "FRAUD" if prediction[0] == 1 else "NOT FRAUD"
-        print(f"Tool raw prediction: {prediction[0]}, result: {result}")
-        return result
+        result, probability = score_transaction(transaction_details)
+        print(f"Tool result: {result}, calibrated fraud probability: {probability:.4f}")
+        return f"{result} (calibrated fraud probability: {probability:.4f})"
 
+    except TransactionDecodeError as e:
+        return str(e)
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
 # --- 3. Define the Agent and Prompt ---
-def create_risk_assessment_agent():
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
-    tools = [fraud_detection_tool]
-
-    prompt = hub.pull("hwchase17/react")
-    prompt.template = prompt.template.replace(
-        "{agent_scratchpad}",
-        """
+LLM_MODEL = "gemini-1.5-flash"
+
+# The public "hwchase17/react" prompt, shipped with the code instead of being
+# fetched with `hub.pull` at startup. Its `{agent_scratchpad}` is replaced by
+# REACT_INSTRUCTIONS below, exactly as the pulled prompt used to be.
+HUB_REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+REACT_INSTRUCTIONS = """
 You are a Senior Risk Analyst AI for a fintech company. Your task is to provide a clear and concise risk assessment for a given credit card transaction.
 
 You have access to a highly accurate fraud detection model. Your job is not just to run the model, but to interpret its output and provide a structured, professional recommendation.
@@ -86,7 +116,7 @@ When you have a final answer, you MUST use the format below.
 Thought: Do I need to use a tool? No
 Final Answer:
 **Risk Assessment:** [FRAUD DETECTED or NO FRAUD DETECTED]
-**Confidence:** [High]
+**Confidence:** [High, Medium or Low, based on the calibrated fraud probability]
 **Recommendation:** [Block Transaction and Flag for Review or Approve Transaction]
 **Justification:** [A brief, one-sentence explanation of why you made the recommendation, based on the model's output.]
 ```
@@ -96,16 +126,230 @@ Begin!
 New Transaction Details: {input}
 {agent_scratchpad}
 """
-    )
+
+REACT_TEMPLATE = HUB_REACT_TEMPLATE.replace("{agent_scratchpad}", REACT_INSTRUCTIONS)
+
+def create_llm():
+    """The Gemini chat model; its client is imported on first use."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0)
+
+def create_risk_assessment_agent(llm=None):
+    """Builds the ReAct agent. `llm` defaults to Gemini; pass another LLM (e.g. a fake one) to test."""
+    from langchain.agents import AgentExecutor, create_react_agent, tool
+    from langchain_core.prompts import PromptTemplate
+
+    if llm is None:
+        llm = create_llm()
+    tools = [tool(fraud_detection_tool)]
+
+    prompt = PromptTemplate.from_template(REACT_TEMPLATE)
 
     agent = create_react_agent(llm, tools, prompt)
     agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
     
     return agent_executor
 
-# --- 4. Main Execution Block ---
+# --- 4. Single-Pass Structured Mode ---
+# The same assessment as the ReAct agent, with the model run locally first and
+# exactly one LLM call. Set SENTINEL_AGENT_MODE=structured to use it for the
+# escalated cases below (default: the ReAct agent).
+AGENT_MODE = os.getenv("SENTINEL_AGENT_MODE", "react")
+
+DECISIONS = {
+    "FRAUD": ("FRAUD DETECTED", "Block Transaction and Flag for Review"),
+    "NOT FRAUD": ("NO FRAUD DETECTED", "Approve Transaction"),
+}
+
+class RiskAssessment(BaseModel):
+    """The fixed four-part assessment every agent mode returns."""
+    risk_assessment: Literal["FRAUD DETECTED", "NO FRAUD DETECTED"]
+    confidence: Literal["High", "Medium", "Low"]
+    recommendation: Literal["Block Transaction and Flag for Review", "Approve Transaction"]
+    justification: str
+
+    def to_text(self) -> str:
+        """Renders the assessment in the agent's Final Answer format."""
+        return (f"**Risk Assessment:** {self.risk_assessment}\n"
+                f"**Confidence:** {self.confidence}\n"
+                f"**Recommendation:** {self.recommendation}\n"
+                f"**Justification:** {self.justification}")
+
+STRUCTURED_TEMPLATE = """You are a Senior Risk Analyst AI for a fintech company. A highly accurate fraud detection model has already analyzed a credit card transaction.
+
+Model Result: {result}
+Calibrated Fraud Probability: {probability}
+
+Interpret the model's output and write a clear, professional risk assessment. Reply with only a JSON object with these keys:
+"risk_assessment": "FRAUD DETECTED" or "NO FRAUD DETECTED" (must agree with the model result),
+"confidence": "High", "Medium" or "Low" (based on the calibrated fraud probability),
+"recommendation": "Block Transaction and Flag for Review" or "Approve Transaction",
+"justification": one sentence explaining the recommendation from the model's output."""
+
+def templated_assessment(result: str, probability: float, confidence: str = "High") -> RiskAssessment:
+    """An assessment built from the model's output alone, without an LLM."""
+    risk_assessment, recommendation = DECISIONS[result]
+    justification = f"The fraud detection model gives this transaction a calibrated fraud probability of {probability:.2%}"
+    if confidence == "High":
+        justification += f", well {'above' if result == 'FRAUD' else 'below'} the review threshold"
+    return RiskAssessment(
+        risk_assessment=risk_assessment,
+        confidence=confidence,
+        recommendation=recommendation,
+        justification=justification + ".",
+    )
+
+class StructuredRiskAssessmentAgent:
+    """
+    Scores the transaction locally, then makes exactly one LLM call for the
+    assessment as JSON, validated against `RiskAssessment`.
+
+    There is no tool-use round trip and no retry: if the reply does not
+    parse, or contradicts the model's decision, the templated assessment is
+    returned instead (flagged with `fallback`). Input the tool cannot parse
+    is answered with its error text without calling the LLM.
+    """
+
+    def __init__(self, llm=None):
+        from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+        from langchain_core.prompts import PromptTemplate
+
+        if llm is None:
+            llm = create_llm()
+        self.chain = PromptTemplate.from_template(STRUCTURED_TEMPLATE) | llm | StrOutputParser()
+        self.parser = PydanticOutputParser(pydantic_object=RiskAssessment)
+
+    def invoke(self, inputs: dict) -> dict:
+        transaction_details = inputs["input"]
+        try:
+            result, probability = score_transaction(transaction_details)
+        except TransactionDecodeError as e:
+            return {"input": transaction_details, "output": str(e), "fraud_probability": None}
+
+        reply = self.chain.invoke({"result": result, "probability": f"{probability:.4f}"})
+        fallback = False
+        try:
+            assessment = self.parser.parse(reply)
+            if assessment.risk_assessment != DECISIONS[result][0]:
+                raise ValueError("The assessment contradicts the model's decision.")
+        except Exception as e:
+            print(f"❗️Warning: Invalid structured assessment, using the template: {e}")
+            assessment, fallback = templated_assessment(result, probability, confidence="Medium"), True
+        return {"input": transaction_details, "output": assessment.to_text(),
+                "assessment": assessment.model_dump(), "fallback": fallback,
+                "fraud_probability": probability}
+
+# Identifies the answers an escalation agent gives, for the assessment cache:
+# it changes whenever the mode, its prompt or the LLM changes.
+PROMPT_VERSION = hashlib.sha1("\0".join((
+    AGENT_MODE, LLM_MODEL, REACT_TEMPLATE if AGENT_MODE == "react" else STRUCTURED_TEMPLATE
+)).encode()).hexdigest()[:12]
+
+# Escalated assessments are cached on disk here; an empty value keeps the cache in memory only.
+AGENT_CACHE_PATH = os.getenv("SENTINEL_AGENT_CACHE_PATH", os.path.join(CACHE_DIR, "agent_assessments.sqlite"))
+
+def create_escalation_agent(llm=None):
+    """The LLM agent for SENTINEL_AGENT_MODE: "react" (default) or "structured"."""
+    if AGENT_MODE == "structured":
+        return StructuredRiskAssessmentAgent(llm)
+    if AGENT_MODE != "react":
+        raise ValueError(f"Unknown agent mode '{AGENT_MODE}', expected 'react' or 'structured'.")
+    return create_risk_assessment_agent(llm)
+
+# --- 5. Confidence-Gated Front-End ---
+# Transactions whose calibrated fraud probability is below LOW or above HIGH
+# get a templated assessment straight from the model; only the uncertain band
+# in between (and input the tool cannot parse) is escalated to the LLM agent.
+ESCALATION_LOW = float(os.getenv("SENTINEL_ESCALATION_LOW", "0.02"))
+ESCALATION_HIGH = float(os.getenv("SENTINEL_ESCALATION_HIGH", "0.95"))
+
+class GatedRiskAssessmentAgent:
+    """
+    Answers clear-cut transactions from the model alone and escalates only
+    uncertain ones to the ReAct agent.
+
+    `invoke({"input": ...})` returns the same `output` text format as the
+    agent, plus `escalated` and the calibrated `fraud_probability`. A
+    templated answer is only given when its decision agrees with the model's
+    FRAUD / NOT FRAUD result, so the gate never contradicts the tool. The
+    LLM agent (see `create_escalation_agent`) is built on the first escalation.
+
+    With a `cache`, escalated answers are stored by transaction fingerprint,
+    model version and PROMPT_VERSION, so retries and duplicate submissions
+    of the same transaction skip the LLM (the response has `cached`).
+    """
+
+    def __init__(self, agent=None, low=ESCALATION_LOW, high=ESCALATION_HIGH, cache=None):
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"Invalid escalation band [{low}, {high}].")
+        self._agent = agent
+        self.low = low
+        self.high = high
+        self.cache = cache
+        self.total = 0
+        self.escalated = 0
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self._agent = create_escalation_agent()
+        return self._agent
+
+    def needs_escalation(self, result, probability) -> bool:
+        """True unless the model is confidently outside the uncertainty band."""
+        if probability is None:
+            return True
+        if result == "NOT FRAUD":
+            return probability >= self.low
+        return probability <= self.high
+
+    def invoke(self, inputs: dict) -> dict:
+        self.total += 1
+        transaction_details = inputs["input"]
+        bundle = model_registry.get()
+        try:
+            # Copied: the agent's own tool call reuses the decode buffer.
+            features = decode_transaction(transaction_details).copy()
+            result, probability = score_features(features, bundle)
+        except Exception:
+            # The LLM may still make sense of input the tool cannot parse.
+            features, result, probability = None, None, None
+
+        if not self.needs_escalation(result, probability):
+            output = templated_assessment(result, probability).to_text()
+            return {"input": transaction_details, "output": output,
+                    "escalated": False, "fraud_probability": probability}
+
+        self.escalated += 1
+        use_cache = self.cache is not None and features is not None
+        if use_cache:
+            versions = (bundle.scoring_version, PROMPT_VERSION)
+            cached = self.cache.get(features, *versions)
+            if cached is not None:
+                return {"input": transaction_details, **cached, "escalated": True,
+                        "cached": True, "fraud_probability": probability}
+
+        response = self.agent.invoke(inputs)
+        # The agent's tool call scores again; only cache if that used the same model.
+        if use_cache and not response.get("fallback") and model_registry.get() is bundle:
+            self.cache.put(features, *versions,
+                           {key: response[key] for key in ("output", "assessment") if key in response})
+        return {**response, "escalated": True, "fraud_probability": probability}
+
+    def stats(self) -> dict:
+        """Requests seen, how many were escalated, the escalation rate and cache counters."""
+        return {
+            "band": [self.low, self.high],
+            "total": self.total,
+            "escalated": self.escalated,
+            "escalation_rate": self.escalated / self.total if self.total else 0.0,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+# --- 6. Main Execution Block ---
 if __name__ == "__main__":
-    risk_agent = create_risk_assessment_agent()
+    risk_agent = GatedRiskAssessmentAgent(cache=AssessmentCache(AGENT_CACHE_PATH or None))
 
     print("\n--- Analyzing a Potentially Legitimate Transaction ---")
     # A clear, legitimate transaction from the dataset
@@ -121,4 +365,6 @@ if __name__ == "__main__":
     print("\n--- Final Assessment ---")
     print(result_fraud['output'])
 
+    print(f"\nEscalation stats: {risk_agent.stats()}")
+
 
@@ -1,93 +1,279 @@
-import joblib
-import pandas as pd
-import numpy as np
+import functools
+import hashlib
+import sys
+import os
+import time
 from dotenv import load_dotenv
-from typing import TypedDict
-from langgraph.graph import StateGraph, END
+from typing import TypedDict, Union
+# Only the END marker is needed up front; `langgraph.graph` itself is imported
+# when the LangGraph engine is built, so the fast engine never loads it.
+from langgraph.constants import END
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.features import (
+    TransactionDecodeError,
+    decode_transaction,
+    decode_transactions,
+    validate_features,
+)
+from src.common.metrics import get_serving_metrics
+from src.common.model_registry import FRAUD_THRESHOLD, get_model_registry
 
 # --- 1. Load Environment Variables and Models ---
+# The model and scaler are loaded once per process by the shared registry,
+# which also hot-reloads them when new artifacts are written to `models/`.
 load_dotenv()
-MODEL_PATH = "models/xgb_fraud_detector.joblib"
-SCALER_PATH = "models/scaler.joblib"
+model_registry = get_model_registry()
+serving_metrics = get_serving_metrics()
+
+# Which engine `get_graph_app` returns: "langgraph" (the compiled StateGraph)
+# or "fast" (the same workflow as plain function calls, see FastTriageApp).
+GRAPH_ENGINE = os.getenv("SENTINEL_GRAPH_ENGINE", "langgraph")
 
 # --- 2. Define the Fraud Detection Tool ---
+def triage_from_probability(probability: float) -> dict:
+    """Builds the triage state update for a scored transaction."""
+    return {
+        "triage_result": "FRAUD" if probability > FRAUD_THRESHOLD else "NOT FRAUD",
+        "fraud_probability": float(probability),
+    }
+
+def score_transaction(transaction_details) -> dict:
+    """
+    Scores one transaction (CSV string or list of 30 numbers) and returns
+    its triage state update: `triage_result` plus, if it could be scored,
+    `fraud_probability`.
+    """
+    try:
+        features = decode_transaction(transaction_details)
+    except TransactionDecodeError as e:
+        return {"triage_result": str(e)}
+    try:
+        # Raw features go straight to the model; with the fused artifact
+        # there is no scaling or DataFrame step at all.
+        probability = model_registry.get().predict_proba(features.reshape(1, -1))[0]
+    except Exception as e:
+        return {"triage_result": f"An error occurred: {str(e)}"}
+    return triage_from_probability(probability)
+
 def fraud_detection_tool(transaction_details: str) -> str:
     """
     Analyzes a credit card transaction to determine if it is fraudulent.
     Input should be a comma-separated string of 30 numerical values.
     Returns 'FRAUD' or 'NOT FRAUD'.
     """
-    try:
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        features = np.array([float(val) for val in transaction_details.split(',')])
-        if len(features) != 30:
-            return "Error: Input must contain exactly 30 numerical values."
-        col_names = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
-        features_df = pd.DataFrame([features], columns=col_names)
-        scaled_features = scaler.transform(features_df)
-        prediction = model.predict(scaled_features)
-        result = "FRAUD" if prediction[0] == 1 else "NOT FRAUD"
-        print(f"Tool raw prediction: {prediction[0]}, result: {result}")
-        return result
-    except Exception as e:
-        return f"An error occurred: {str(e)}"
+    result = score_transaction(transaction_details)["triage_result"]
+    print(f"Tool result: {result}")
+    return result
+
+def _score_rows(features, valid_rows, errors, n_rows) -> list[dict]:
+    """Scores the decoded rows in one call and merges in the per-row errors."""
+    results = [None] * n_rows
+    for i, error in errors.items():
+        results[i] = {"triage_result": error}
+    if valid_rows:
+        try:
+            probabilities = model_registry.get().predict_proba(features)
+        except Exception as e:
+            error = {"triage_result": f"An error occurred: {str(e)}"}
+            for i in valid_rows:
+                results[i] = dict(error)
+            return results
+        for i, probability in zip(valid_rows, probabilities.tolist()):
+            results[i] = triage_from_probability(probability)
+    return results
+
+def fraud_detection_batch(transactions: list) -> list[dict]:
+    """
+    Vectorized version of `fraud_detection_tool` for many transactions.
+    All valid rows are decoded into one NumPy matrix and scored with a single
+    model call. Returns one dict per input, in order, holding the
+    `triage_result` and (for valid rows) the `fraud_probability`.
+    """
+    features, valid_rows, errors = decode_transactions(transactions)
+    return _score_rows(features, valid_rows, errors, len(transactions))
+
+def fraud_detection_features(features) -> list[dict]:
+    """Like `fraud_detection_batch`, for an already-numeric (n, 30) matrix."""
+    valid_features, valid_rows, errors = validate_features(features)
+    return _score_rows(valid_features, valid_rows, errors, len(features))
 
 # --- 3. Define the Graph's State ---
-class GraphState(TypedDict):
-    transaction_details: str
+class GraphState(TypedDict, total=False):
+    transaction_details: Union[str, list[float]]
     triage_result: str
+    fraud_probability: float
     final_recommendation: str
 
 # --- 4. Define Graph Nodes ---
+APPROVED_RECOMMENDATION = "Transaction Approved. No further action required."
+BLOCKED_RECOMMENDATION = "Transaction Blocked. Escalated to Human Review Team."
+
 def triage_node(state: GraphState):
     """First step: Use the fraud detection tool to assess the transaction."""
     print("--- Executing Triage Node ---")
+    if state.get('triage_result'):
+        # Already scored upstream (e.g. by the API's micro-batcher). A node
+        # must write at least one channel, so pass the result through.
+        return {"triage_result": state['triage_result']}
     transaction = state['transaction_details']
-    result = fraud_detection_tool(transaction)
-    return {"triage_result": result}
+    return score_transaction(transaction)
 
 def legitimate_node(state: GraphState):
     """This node is reached if the transaction is not fraudulent."""
     print("--- Executing Legitimate Node ---")
-    recommendation = "Transaction Approved. No further action required."
+    recommendation = APPROVED_RECOMMENDATION
     return {"final_recommendation": recommendation}
 
 def fraudulent_node(state: GraphState):
     """This node is reached if the transaction is flagged as fraudulent."""
     print("--- Executing Fraudulent Node ---")
-    recommendation = "Transaction Blocked. Escalated to Human Review Team."
+    recommendation = BLOCKED_RECOMMENDATION
     return {"final_recommendation": recommendation}
 
 # --- 5. Define Graph Edges ---
-def decide_next_node(state: GraphState) -> str:
-    """This is the conditional edge that decides the next step."""
-    print("--- Making routing decision ---")
-    if "Error" in state['triage_result']:
+RECOMMENDATIONS = {
+    "legitimate_node": APPROVED_RECOMMENDATION,
+    "fraudulent_node": BLOCKED_RECOMMENDATION,
+}
+
+# Identifies the workflow's outputs for the assessment cache: it changes with
+# the decision threshold or the recommendation texts.
+GRAPH_VERSION = hashlib.sha1(
+    repr((FRAUD_THRESHOLD, APPROVED_RECOMMENDATION, BLOCKED_RECOMMENDATION)).encode()
+).hexdigest()[:12]
+
+def route_triage_result(triage_result: str) -> str:
+    """Maps a triage result to the next node. Tool errors end the workflow."""
+    # Matched case-insensitively: the tool reports both "Error: ..." and
+    # "An error occurred: ...", and neither may be routed to approval.
+    if "error" in triage_result.lower():
         return END
-    elif state['triage_result'] == "FRAUD":
+    elif triage_result == "FRAUD":
         return "fraudulent_node"
     else:
         return "legitimate_node"
 
+def decide_next_node(state: GraphState) -> str:
+    """This is the conditional edge that decides the next step."""
+    print("--- Making routing decision ---")
+    return route_triage_result(state['triage_result'])
+
+def finish_state(state: dict) -> dict:
+    """Routes a triaged state and adds the recommendation node's output, in place."""
+    next_node = route_triage_result(state["triage_result"])
+    if next_node in RECOMMENDATIONS:
+        state["final_recommendation"] = RECOMMENDATIONS[next_node]
+    return state
+
+def timed_node(name: str, node):
+    """Wraps a node so every run's latency is recorded in the serving metrics."""
+    if not serving_metrics.enabled:
+        return node
+    histogram = serving_metrics.node_histogram(name)
+
+    @functools.wraps(node)
+    def run(state):
+        start = time.perf_counter()
+        try:
+            return node(state)
+        finally:
+            histogram.observe((time.perf_counter() - start) * 1000)
+    return run
+
 # --- 6. Function to Create and Compile the Graph ---
-def get_graph_app():
-    """Creates and compiles the LangGraph workflow so it can be imported."""
+class FastTriageApp:
+    """
+    The triage workflow as plain function calls, without LangGraph.
+
+    This graph has no LLM, loops or checkpoints, so its three steps can run
+    directly: score (unless the input is already triaged), route with
+    `route_triage_result`, and add the chosen node's recommendation. It
+    takes the same input and returns the same final `GraphState` as the
+    compiled graph's `invoke`, minus the per-node channel updates and logging.
+    The steps' latencies are recorded under the names of the nodes they
+    stand in for.
+    """
+
+    STATE_KEYS = tuple(GraphState.__annotations__)
+
+    def invoke(self, inputs: dict, config=None) -> GraphState:
+        # Like LangGraph, only keys declared in GraphState become state.
+        state = {key: inputs[key] for key in self.STATE_KEYS if key in inputs}
+        start = time.perf_counter()
+        if not state.get('triage_result'):
+            state.update(score_transaction(state['transaction_details']))
+        if not serving_metrics.enabled:
+            return finish_state(state)
+        triaged = time.perf_counter()
+        serving_metrics.node_histogram("triage_node").observe((triaged - start) * 1000)
+        next_node = route_triage_result(state["triage_result"])
+        if next_node in RECOMMENDATIONS:
+            state["final_recommendation"] = RECOMMENDATIONS[next_node]
+            serving_metrics.node_histogram(next_node).observe((time.perf_counter() - triaged) * 1000)
+        return state
+
+    def batch(self, inputs: list[dict], config=None) -> list[GraphState]:
+        return [self.invoke(state) for state in inputs]
+
+def get_graph_app(engine: str = None):
+    """
+    Returns the triage workflow as an app with `invoke(inputs)`.
+
+    `engine` (default: SENTINEL_GRAPH_ENGINE) is "langgraph" for the
+    compiled StateGraph or "fast" for FastTriageApp. Both produce the same
+    final state; see benchmarks/benchmark_graph_engines.py.
+    """
+    engine = engine or GRAPH_ENGINE
+    if engine == "fast":
+        return FastTriageApp()
+    if engine != "langgraph":
+        raise ValueError(f"Unknown graph engine '{engine}', expected 'langgraph' or 'fast'.")
+    from langgraph.graph import StateGraph
+
     workflow = StateGraph(GraphState)
-    workflow.add_node("triage_node", triage_node)
-    workflow.add_node("legitimate_node", legitimate_node)
-    workflow.add_node("fraudulent_node", fraudulent_node)
+    workflow.add_node("triage_node", timed_node("triage_node", triage_node))
+    workflow.add_node("legitimate_node", timed_node("legitimate_node", legitimate_node))
+    workflow.add_node("fraudulent_node", timed_node("fraudulent_node", fraudulent_node))
     workflow.set_entry_point("triage_node")
     workflow.add_conditional_edges(
         "triage_node",
         decide_next_node,
-        {"fraudulent_node": "fraudulent_node", "legitimate_node": "legitimate_node"}
+        {"fraudulent_node": "fraudulent_node", "legitimate_node": "legitimate_node", END: END}
     )
     workflow.add_edge("legitimate_node", END)
     workflow.add_edge("fraudulent_node", END)
     return workflow.compile()
 
-# --- 7. Main Execution Block for Standalone Testing ---
+# --- 7. Batch Entry Points ---
+def _finish_batch(states: list[dict], triage: list[dict]) -> list[GraphState]:
+    """Routes every triaged row with the graph's own routing logic."""
+    return [finish_state({**state, **triage_update}) for state, triage_update in zip(states, triage)]
+
+def invoke_batch(inputs: list[dict]) -> list[GraphState]:
+    """
+    Runs the triage graph over many transactions at once.
+
+    Takes a list of `{"transaction_details": ...}` inputs (the same shape as
+    `app.invoke`) and returns the final state of each one, in order. The
+    triage step is scored in one vectorized call; each row is then routed
+    with the graph's own `decide_next_node` and recommendation nodes, so a
+    row with invalid input ends with its error in `triage_result` exactly
+    like a single `invoke` would.
+    """
+    triage = fraud_detection_batch([state["transaction_details"] for state in inputs])
+    return _finish_batch(inputs, triage)
+
+def invoke_feature_batch(features) -> list[GraphState]:
+    """
+    Same as `invoke_batch` for an (n, 30) matrix of raw features, e.g. a
+    binary request body. The returned states carry no `transaction_details`.
+    """
+    return _finish_batch([{} for _ in range(len(features))], fraud_detection_features(features))
+
+# --- 8. Main Execution Block for Standalone Testing ---
 if __name__ == "__main__":
     # This block allows you to test this script directly
     app = get_graph_app()
@@ -1,20 +1,23 @@
-import joblib
-import pandas as pd
-import numpy as np
+import sys
+import os
 from dotenv import load_dotenv
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
 
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.features import TransactionDecodeError, decode_transaction
+from src.common.model_registry import FRAUD_THRESHOLD, get_model_registry
+
 # --- 1. Load Environment Variables and Models ---
 # Note: We are reusing the same model and tool from Phase 2
 load_dotenv()
 
-MODEL_PATH = "models/xgb_fraud_detector.joblib"
-SCALER_PATH = "models/scaler.joblib"
+model_registry = get_model_registry()
 
 try:
-    model = joblib.load(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
+    model_registry.get()
     print("✅ Model and scaler loaded successfully for the graph.")
 except FileNotFoundError:
     print("❌ Error: Model or scaler not found. Please run Phase 1 first.")
@@ -28,19 +31,15 @@ def fraud_detection_tool(transaction_details: str) -> str:
     Returns 'FRAUD' or 'NOT FRAUD'.
     """
     try:
-        features = np.array([float(val) for val in transaction_details.split(',')])
-        if len(features) != 30:
-            return "Error: Input must contain exactly 30 numerical values."
-        
-        col_names = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
-        features_df = pd.DataFrame([features], columns=col_names)
-        
-        scaled_features = scaler.transform(features_df)
-        prediction = model.predict(scaled_features)
-        
-        result = "FRAUD" if prediction[0] == 1 else "NOT FRAUD"
-        print(f"Tool raw prediction: {prediction[0]}, result: {result}")
+        features = decode_transaction(transaction_details)
+        probability = model_registry.get().predict_proba(features.reshape(1, -1))[0]
+        prediction = int(probability > FRAUD_THRESHOLD)
+
+        result = "FRAUD" if prediction == 1 else "NOT FRAUD"
+        print(f"Tool raw prediction: {prediction}, result: {result}")
         return result
+    except TransactionDecodeError as e:
+        return str(e)
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
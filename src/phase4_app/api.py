@@ -1,6 +1,14 @@
+import asyncio
+import contextvars
+import time
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
+from typing import Optional, Union
+import msgpack
+import numpy as np
 import sys
 import os
 
@@ -8,46 +16,503 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 # Now we can import from src
-from src.phase3_graph.risk_assessment_graph import get_graph_app
+from src.phase3_graph.risk_assessment_graph import (
+    GRAPH_VERSION,
+    get_graph_app,
+    invoke_batch,
+    invoke_feature_batch,
+    triage_from_probability,
+)
+from src.common.assessment_cache import CACHE_DIR, AssessmentCache
+from src.common.features import N_FEATURES, TransactionDecodeError, decode_transaction
+from src.common.drift import DRIFT_ENABLED, DriftMonitor
+from src.common.metrics import SNAPSHOT_DIR, SNAPSHOT_INTERVAL, get_serving_metrics, prometheus_text
+from src.common.model_registry import COMPILED_MAX_ROWS, get_model_registry
+from src.common.prediction_log import NOT_ASSESSED, PREDICTION_LOG_ENABLED, PredictionLog
+from src.phase4_app.concurrency import ConcurrencyLimiter, executor, run_blocking
+from src.phase4_app.micro_batcher import MicroBatcher
 
 # --- 1. Initialize FastAPI app and LangGraph ---
+# Concurrent single-transaction requests are scored together by the
+# micro-batcher. Set SENTINEL_MICRO_BATCH=0 to score each request on its own.
+MICRO_BATCH_ENABLED = os.getenv("SENTINEL_MICRO_BATCH", "1") != "0"
+
+model_registry = get_model_registry()
+micro_batcher = MicroBatcher(
+    lambda features: model_registry.get().predict_proba(features),
+    executor=executor
+)
+# Bounds the requests in flight; overflow waits briefly, then gets HTTP 429.
+limiter = ConcurrencyLimiter()
+
+# Retries and duplicate submissions of a transaction are answered from the
+# assessment cache (memory LRU + SQLite). Entries are keyed by the model and
+# workflow version, so a new model invalidates them. SENTINEL_API_CACHE=0
+# turns it off; an empty SENTINEL_API_CACHE_PATH keeps it in memory only.
+CACHE_ENABLED = os.getenv("SENTINEL_API_CACHE", "1") != "0"
+API_CACHE_PATH = os.getenv("SENTINEL_API_CACHE_PATH", os.path.join(CACHE_DIR, "api_assessments.sqlite"))
+assessment_cache = AssessmentCache(API_CACHE_PATH or None) if CACHE_ENABLED else None
+CACHED_FIELDS = ("triage_result", "fraud_probability", "final_recommendation")
+
+# "lazy" (default): importing this module stays cheap; the model, XGBoost and
+# the workflow are loaded and warmed up in the background once the server is
+# listening, and /readyz reports ready when that is done. "eager": all of it
+# happens at import, before the server starts listening.
+STARTUP_MODE = os.getenv("SENTINEL_STARTUP_MODE", "lazy")
+
+# Request latency, workflow node latency, decisions, probabilities and
+# errors are recorded in process memory (src/common/metrics.py) and served
+# by GET /metrics. Each process also writes them to SENTINEL_METRICS_SNAPSHOT_DIR
+# every SENTINEL_METRICS_SNAPSHOT_INTERVAL seconds for the Phase 5 dashboard.
+serving_metrics = get_serving_metrics()
+METERED_PATHS = ("/assess-transaction", "/assess-transactions", "/assess-transactions/binary")
+# When the current request started, set by MetricsMiddleware.
+request_started = contextvars.ContextVar("request_started")
+# Time single-transaction requests wait in the micro-batcher and get scored,
+# recorded like a workflow node: the triage node then only passes it through.
+batcher_histogram = serving_metrics.node_histogram("micro_batcher")
+# Every assessment (features, probability, decision, model version, latency)
+# is also appended to the prediction log on disk, by a background thread.
+# SENTINEL_PREDICTION_LOG=0 turns it off.
+# The log's writer thread also counts every row into this process's drift
+# sketch (src/common/drift.py), compared with the reference sketch saved at
+# training time, and writes it next to the metrics snapshots.
+drift_monitor = DriftMonitor(snapshot_dir=SNAPSHOT_DIR) if DRIFT_ENABLED and PREDICTION_LOG_ENABLED else None
+prediction_log = PredictionLog(listeners=[drift_monitor] if drift_monitor else []) if PREDICTION_LOG_ENABLED else None
+
+langgraph_app = None
+startup_state = {"status": "starting", "warmup_ms": None, "error": None}
+_warmup_task = None
+
+def warm_up():
+    """
+    Loads the model and the workflow and runs synthetic predictions through
+    every path a request can take: a single row (compiled forest), a batch
+    (XGBoost) and one full workflow run. Raises if the result is not a
+    complete assessment.
+    """
+    global langgraph_app
+    start = time.perf_counter()
+    # Compile the workflow. SENTINEL_GRAPH_ENGINE=fast runs the same triage
+    # workflow without LangGraph's per-request overhead.
+    app_ = get_graph_app()
+    # Load the model once up front so the first request doesn't pay for it.
+    # The registry hot-reloads new artifacts in the background of later requests.
+    bundle = model_registry.get()
+    bundle.predict_proba(np.zeros((1, N_FEATURES)))
+    bundle.predict_proba(np.zeros((COMPILED_MAX_ROWS + 1, N_FEATURES)))
+    result = app_.invoke({"transaction_details": [0.0] * N_FEATURES})
+    if "final_recommendation" not in result:
+        raise RuntimeError(f"Warmup assessment did not complete: {result}")
+    langgraph_app = app_
+    startup_state.update(status="ready", warmup_ms=(time.perf_counter() - start) * 1000)
+    print(f"✅ Triage workflow ({type(app_).__name__}) and model {bundle.version} warmed up "
+          f"in {startup_state['warmup_ms']:.0f} ms.")
+
+async def _warm_up_in_background():
+    try:
+        await run_blocking(warm_up)
+    except Exception as e:
+        startup_state.update(status="failed", error=str(e))
+        print(f"❌ Error: Warmup failed: {e}")
+
+async def wait_until_ready():
+    """
+    Holds requests that arrive during warmup instead of failing them. After a
+    failed warmup (e.g. no model yet) each request triggers a new attempt.
+    """
+    global _warmup_task
+    if startup_state["status"] == "failed" and _warmup_task is not None and _warmup_task.done():
+        startup_state["status"] = "starting"
+        _warmup_task = asyncio.create_task(_warm_up_in_background())
+    if startup_state["status"] != "ready" and _warmup_task is not None:
+        await asyncio.shield(_warmup_task)
+    if startup_state["status"] != "ready":
+        raise HTTPException(status_code=503, detail=f"Service not ready: {startup_state['error']}")
+
+async def _write_metrics_snapshots():
+    """Writes this process's metrics snapshot periodically, off the event loop."""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await run_blocking(serving_metrics.write_snapshot)
+        except OSError as e:
+            print(f"❗️Warning: Could not write the metrics snapshot: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _warmup_task
+    if startup_state["status"] != "ready":
+        _warmup_task = asyncio.create_task(_warm_up_in_background())
+    if MICRO_BATCH_ENABLED:
+        micro_batcher.start()
+    snapshot_task = None
+    if serving_metrics.enabled and SNAPSHOT_DIR and SNAPSHOT_INTERVAL > 0:
+        snapshot_task = asyncio.create_task(_write_metrics_snapshots())
+    if prediction_log is not None:
+        prediction_log.start()
+    yield
+    await micro_batcher.stop()
+    if prediction_log is not None:
+        # Writes whatever is still queued.
+        await run_blocking(prediction_log.stop)
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        try:
+            serving_metrics.write_snapshot()
+        except OSError as e:
+            print(f"❗️Warning: Could not write the metrics snapshot: {e}")
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware that times every request to the assessment
+    endpoints, from the first byte handed to the app to the end of the
+    response, and counts the error statuses. It also sets `request_started`
+    for the latency the handlers record and log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in METERED_PATHS:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        request_started.set(start)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if serving_metrics.enabled:
+                serving_metrics.record_request(scope["path"], (time.perf_counter() - start) * 1000, status)
+
 app = FastAPI(
     title="Project Sentinel API",
     description="API for the AI Risk Assessment Workflow",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson serializes the responses several times faster than the stdlib encoder.
+    default_response_class=ORJSONResponse
 )
+if serving_metrics.enabled or prediction_log is not None:
+    app.add_middleware(MetricsMiddleware)
 
-# Compile the LangGraph app when the API starts
-langgraph_app = get_graph_app()
-print("✅ LangGraph workflow compiled and ready.")
+if STARTUP_MODE == "eager":
+    warm_up()
+elif STARTUP_MODE != "lazy":
+    raise ValueError(f"Unknown startup mode '{STARTUP_MODE}', expected 'lazy' or 'eager'.")
 
 # --- 2. Define Request and Response Models ---
+# A transaction is either the comma-separated string or a JSON array of the
+# 30 numbers (Time, V1-V28, Amount).
+Transaction = Union[str, list[float]]
+
 class TransactionRequest(BaseModel):
-    transaction_details: str
+    transaction_details: Transaction
 
 class AssessmentResponse(BaseModel):
     recommendation: str
-    details: dict
+    decision: Optional[str] = None
+    fraud_probability: Optional[float] = None
+    error: Optional[str] = None
+    details: Optional[dict] = None
+
+class BatchTransactionRequest(BaseModel):
+    transactions: list[Transaction]
+
+class BatchAssessmentResult(BaseModel):
+    recommendation: Optional[str] = None
+    decision: Optional[str] = None
+    fraud_probability: Optional[float] = None
+    error: Optional[str] = None
+    details: Optional[dict] = None
+
+class BatchAssessmentResponse(BaseModel):
+    results: list[BatchAssessmentResult]
+
+MISSING_RECOMMENDATION = 'Error: Could not determine recommendation.'
+OCTET_STREAM = "application/octet-stream"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def slim_result(state: dict, debug: bool = False) -> dict:
+    """
+    The response for one final graph state: the recommendation, the triage
+    decision and the fraud probability, or the error if the transaction
+    could not be assessed. The full state is only included with `debug`.
+    """
+    recommendation = state.get('final_recommendation')
+    if recommendation is None:
+        result = {"error": state.get('triage_result', MISSING_RECOMMENDATION)}
+    else:
+        result = {"recommendation": recommendation, "decision": state['triage_result']}
+        if state.get('fraud_probability') is not None:
+            result["fraud_probability"] = state['fraud_probability']
+    if debug:
+        result["details"] = state
+    return result
+
+def cache_write_done(future):
+    """
+    Done-callback of a background cache write. A failure (e.g. "database is
+    locked" when workers share the SQLite file) is logged and counted in
+    /stats/cache instead of disappearing with the future.
+    """
+    error = future.exception()
+    if error is not None:
+        assessment_cache.record_write_error()
+        print(f"❗️Warning: Assessment cache write failed: {error}")
+
+def transaction_amount(transaction) -> float:
+    """The Amount (last value) of a transaction as sent, or NaN if it cannot be read."""
+    try:
+        if isinstance(transaction, str):
+            return float(transaction.rsplit(",", 1)[-1])
+        return float(transaction[-1])
+    except (ValueError, TypeError, LookupError):
+        # Anything else a client can send, e.g. a msgpack map as a row.
+        return float("nan")
+
+def record_assessment(state: dict, features):
+    """
+    Records one assessed transaction in the serving metrics and the
+    prediction log, with the request's latency so far. `features` is its
+    decoded row, or None if it could not be decoded.
+    """
+    latency_ms = (time.perf_counter() - request_started.get()) * 1000
+    probability = state.get('fraud_probability')
+    fraud = state.get('triage_result') == "FRAUD"
+    error = 'final_recommendation' not in state
+    if serving_metrics.enabled:
+        serving_metrics.record_assessment(latency_ms, probability, fraud=fraud, error=error,
+                                          amount=features[-1] if features is not None else np.nan)
+    if prediction_log is not None:
+        prediction_log.log(features, np.nan if probability is None else probability,
+                           NOT_ASSESSED if error else int(fraud), model_registry.get().model_id, latency_ms)
+
+def record_batch(states: list, features):
+    """
+    `record_assessment` for every row of a batch request. `features` is the
+    batch's (n, 30) matrix, or its raw transactions (decoded later, off the
+    request path, by the prediction log).
+    """
+    latency_ms = (time.perf_counter() - request_started.get()) * 1000
+    n = len(states)
+    probabilities = np.fromiter((state.get('fraud_probability', np.nan) for state in states), np.float64, n)
+    fraud = np.fromiter((state.get('triage_result') == "FRAUD" for state in states), np.bool_, n)
+    error = np.fromiter(('final_recommendation' not in state for state in states), np.bool_, n)
+    if serving_metrics.enabled:
+        amounts = (features[:, -1] if isinstance(features, np.ndarray)
+                   else np.fromiter(map(transaction_amount, features), np.float64, n))
+        serving_metrics.record_assessments(latency_ms, probabilities, fraud, error, amounts)
+    if prediction_log is not None:
+        decisions = np.where(error, NOT_ASSESSED, fraud).astype(np.int8)
+        prediction_log.log_batch(features, probabilities, decisions, model_registry.get().model_id, latency_ms)
 
 # --- 3. Define the API Endpoint ---
-@app.post("/assess-transaction", response_model=AssessmentResponse)
-async def assess_transaction(request: TransactionRequest):
+# The handlers return ORJSONResponse directly, so the response models above
+# document the schema without a second validation pass over every result.
+@app.post("/assess-transaction", response_model=AssessmentResponse, response_model_exclude_none=True)
+async def assess_transaction(request: TransactionRequest, debug: bool = False):
     """
     Receives transaction details and returns the final risk assessment
-    from the LangGraph workflow.
+    from the LangGraph workflow. Pass `?debug=true` to include the full
+    workflow state.
     """
     print("Received request for transaction...")
     inputs = {"transaction_details": request.transaction_details}
-    
-    # Invoke the LangGraph workflow
-    result = langgraph_app.invoke(inputs)
-    
+
+    await wait_until_ready()
+    async with limiter:
+        try:
+            # The row may wait in the batcher's queue, so it needs its own buffer.
+            features = decode_transaction(request.transaction_details, out=np.empty(N_FEATURES))
+        except TransactionDecodeError as e:
+            features = None
+            inputs["triage_result"] = str(e)
+
+        cached, versions, bundle = None, None, None
+        if assessment_cache is not None and features is not None:
+            bundle = model_registry.get()
+            versions = (bundle.scoring_version, GRAPH_VERSION)
+            cached = await run_blocking(assessment_cache.get, features, *versions)
+
+        if cached is not None:
+            result = {**inputs, **cached}
+        else:
+            if MICRO_BATCH_ENABLED and features is not None:
+                # Score through the micro-batcher; the graph's triage node then
+                # reuses this result instead of calling the model again.
+                batched = time.perf_counter()
+                inputs.update(triage_from_probability(await micro_batcher.submit(features)))
+                if serving_metrics.enabled:
+                    batcher_histogram.observe((time.perf_counter() - batched) * 1000)
+
+            # Invoke the LangGraph workflow on the executor, so its synchronous
+            # nodes never block the event loop.
+            result = await run_blocking(langgraph_app.invoke, inputs)
+            # The registry only ever swaps in new bundles, so if `bundle` is
+            # still current it is the one that scored the row; otherwise the
+            # result is not cached under its versions.
+            if versions is not None and 'final_recommendation' in result and model_registry.get() is bundle:
+                # Written in the background; the response does not wait for it.
+                executor.submit(assessment_cache.put, features, *versions,
+                                {key: result[key] for key in CACHED_FIELDS if key in result}
+                                ).add_done_callback(cache_write_done)
+
     print(f"Workflow finished with result: {result.get('final_recommendation')}")
-    
-    return {
-        "recommendation": result.get('final_recommendation', 'Error: Could not determine recommendation.'),
-        "details": result
-    }
+    if serving_metrics.enabled or prediction_log is not None:
+        record_assessment(result, features)
+
+    response = slim_result(result, debug)
+    response.setdefault("recommendation", MISSING_RECOMMENDATION)
+    return ORJSONResponse(response)
+
+@app.post("/assess-transactions", response_model=BatchAssessmentResponse, response_model_exclude_none=True)
+async def assess_transactions(request: BatchTransactionRequest, debug: bool = False):
+    """
+    Assesses many transactions in one request. All rows are scored with a
+    single vectorized model call; results are returned in input order, and a
+    row with invalid input gets its own `error` instead of failing the batch.
+    """
+    print(f"Received batch request for {len(request.transactions)} transactions...")
+    await wait_until_ready()
+    async with limiter:
+        states = await run_blocking(
+            invoke_batch, [{"transaction_details": t} for t in request.transactions]
+        )
+    if serving_metrics.enabled or prediction_log is not None:
+        record_batch(states, request.transactions)
+    return ORJSONResponse({"results": [slim_result(state, debug) for state in states]})
+
+def decode_binary_body(body: bytes, content_type: str):
+    """
+    Turns a binary request body into the graph's batch input. Raw bytes are
+    little-endian float64 values, 30 per row, and become a feature matrix
+    without any parsing; a msgpack body holds either such bytes or a list
+    of rows, which are checked row by row like the JSON batch endpoint.
+    """
+    if content_type in MSGPACK_TYPES:
+        try:
+            body = msgpack.unpackb(body)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid msgpack body: {e}")
+        if isinstance(body, list):
+            return invoke_batch, [{"transaction_details": row} for row in body]
+    elif content_type != OCTET_STREAM:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be {OCTET_STREAM} or {MSGPACK_TYPES[0]}."
+        )
+    if not isinstance(body, bytes) or len(body) % (8 * N_FEATURES):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Body must hold little-endian float64 rows of {N_FEATURES} values."
+        )
+    return invoke_feature_batch, np.frombuffer(body, dtype='<f8').reshape(-1, N_FEATURES)
+
+@app.post(
+    "/assess-transactions/binary",
+    response_model=BatchAssessmentResponse,
+    response_model_exclude_none=True,
+    openapi_extra={"requestBody": {"content": {
+        OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        MSGPACK_TYPES[0]: {"schema": {"type": "string", "format": "binary"}},
+    }, "required": True}},
+)
+async def assess_transactions_binary(request: Request, debug: bool = False):
+    """
+    Batch assessment with a compact binary body: `application/octet-stream`
+    holding N×30 little-endian float64 values, or `application/msgpack`
+    holding a list of rows (or the same raw bytes). Results are the same as
+    `/assess-transactions`; send `Accept: application/msgpack` to get them
+    back as msgpack.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    invoke, batch = decode_binary_body(await request.body(), content_type)
+    print(f"Received binary batch request for {len(batch)} transactions...")
+    await wait_until_ready()
+    async with limiter:
+        states = await run_blocking(invoke, batch)
+    if serving_metrics.enabled or prediction_log is not None:
+        record_batch(states, batch if isinstance(batch, np.ndarray)
+                     else [state["transaction_details"] for state in batch])
+
+    response = {"results": [slim_result(state, debug) for state in states]}
+    if any(t in request.headers.get("accept", "") for t in MSGPACK_TYPES):
+        return Response(msgpack.packb(response), media_type=MSGPACK_TYPES[0])
+    return ORJSONResponse(response)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving HTTP, even while warming up."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the model and workflow are loaded and warmed up, 503 before."""
+    status_code = 200 if startup_state["status"] == "ready" else 503
+    return ORJSONResponse(startup_state, status_code=status_code)
+
+@app.get("/stats/batching")
+async def batching_stats():
+    """Reports the micro-batcher's settings and batch-size distribution."""
+    return {"enabled": MICRO_BATCH_ENABLED, **micro_batcher.stats()}
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Reports the assessment cache's hit, miss and eviction counters."""
+    if assessment_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **assessment_cache.stats()}
+
+@app.get("/stats/concurrency")
+async def concurrency_stats():
+    """Reports the concurrency limit, requests in flight and 429 rejections."""
+    return limiter.stats()
+
+@app.get("/stats/prediction-log")
+async def prediction_log_stats():
+    """Reports the prediction log's queue, written and dropped rows and segments."""
+    if prediction_log is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_log.stats()}
+
+@app.get("/stats/drift")
+async def drift_stats(minutes: float = 60.0):
+    """
+    PSI, KS and Jensen-Shannon divergence of every feature and the fraud
+    probability over this process's last `minutes`, against the training
+    reference. Rows count once the prediction log has flushed them.
+    """
+    if drift_monitor is None:
+        return {"enabled": False}
+    columns = drift_monitor.scores(minutes * 60)
+    if columns is None:
+        return {"enabled": True, "reference": None, "columns": []}
+    return {"enabled": True, "reference": drift_monitor.reference.reference_id, "minutes": minutes,
+            "columns": columns}
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus", recent: bool = True, since: Optional[float] = None):
+    """
+    This process's metrics: Prometheus text by default, or with
+    `?format=json` the full snapshot, including the most recent assessments
+    unless `?recent=false`, and the per-minute buckets from `?since=` (Unix
+    seconds) on.
+    """
+    if format == "json":
+        return ORJSONResponse(serving_metrics.snapshot(recent=recent, since=since))
+    if format != "prometheus":
+        raise HTTPException(status_code=400, detail="format must be 'prometheus' or 'json'.")
+    return PlainTextResponse(prometheus_text(serving_metrics.snapshot(recent=False)),
+                             media_type="text/plain; version=0.0.4")
 
 # --- 4. Run the API Server ---
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+# --- 1. Configuration ---
+# Threads that run the model and the graph off the event loop. XGBoost and
+# NumPy release the GIL while predicting, so these run in parallel.
+WORKER_THREADS = int(os.getenv("SENTINEL_WORKER_THREADS", str(os.cpu_count() or 1)))
+# Requests allowed in flight at once; further requests queue for a slot.
+MAX_CONCURRENCY = int(os.getenv("SENTINEL_MAX_CONCURRENCY", "64"))
+# How long a queued request waits for a slot before it is rejected with 429.
+QUEUE_TIMEOUT_MS = float(os.getenv("SENTINEL_QUEUE_TIMEOUT_MS", "1000"))
+
+# --- 2. Shared Executor ---
+executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="sentinel-worker")
+
+async def run_blocking(fn, *args):
+    """Runs a synchronous, CPU- or IO-bound call on the shared executor."""
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+# --- 3. Backpressure ---
+class ConcurrencyLimiter:
+    """
+    Caps the number of requests being processed at once.
+
+    Used as `async with limiter:` around a request. A request that cannot get
+    a slot within `queue_timeout_ms` is rejected with HTTP 429 and a
+    `Retry-After` header, so overload turns into fast, explicit rejections
+    instead of an unbounded queue with ever-growing latency.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, queue_timeout_ms=QUEUE_TIMEOUT_MS):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server is at capacity. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            ) from None
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_timeout_ms": self.queue_timeout * 1000.0,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+
+# --- 1. Configuration ---
+# A batch is flushed as soon as it holds MAX_BATCH_SIZE rows, or MAX_WAIT_MS
+# after its first row arrived, whichever comes first.
+MAX_BATCH_SIZE = int(os.getenv("SENTINEL_BATCH_MAX_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("SENTINEL_BATCH_MAX_WAIT_MS", "2.0"))
+
+
+# --- 2. The Micro-Batcher ---
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one vectorized call.
+
+    Each caller awaits `submit(row)`. A background task collects the rows
+    that arrive within the batching window, stacks them into one matrix,
+    calls `predict_fn` once and resolves every caller's future with its own
+    row of the result. With an `executor`, `predict_fn` runs there and the
+    task goes straight back to collecting the next batch, so the event loop
+    is never blocked by a prediction.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 executor=None):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._task = None
+        # batch_size_counts[n] = number of flushed batches that held n rows.
+        self.batch_size_counts = np.zeros(max_batch_size + 1, dtype=np.int64)
+
+    def start(self):
+        """Starts the batching task on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancels the batching task; pending callers receive CancelledError."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, row: np.ndarray):
+        """Queues one feature row and waits for its prediction."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, future))
+        return await future
+
+    async def _collect(self):
+        """Waits for a first row, then gathers more until the batch is full or the window closes."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take everything already queued without suspending.
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        in_flight = set()
+        while True:
+            batch = await self._collect()
+            # Drop callers that went away (e.g. client disconnect) while queued.
+            batch = [(row, future) for row, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.batch_size_counts[len(batch)] += 1
+            features = np.vstack([row for row, _ in batch])
+            futures = [future for _, future in batch]
+            if self.executor is None:
+                await self._predict(futures, features)
+            else:
+                # Keep collecting while this batch is scored on the executor.
+                task = asyncio.get_running_loop().create_task(self._predict(futures, features))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+    async def _predict(self, futures, features):
+        try:
+            if self.executor is None:
+                predictions = self.predict_fn(features)
+            else:
+                predictions = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.predict_fn, features
+                )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, prediction in zip(futures, predictions.tolist()):
+            if not future.done():
+                future.set_result(prediction)
+
+    def stats(self) -> dict:
+        """Summarizes the batch-size distribution seen so far."""
+        counts = self.batch_size_counts
+        batches = int(counts.sum())
+        rows = int((counts * np.arange(len(counts))).sum())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": batches,
+            "rows": rows,
+            "mean_batch_size": rows / batches if batches else 0.0,
+            "batch_size_distribution": {
+                str(size): int(n) for size, n in enumerate(counts) if n
+            },
+        }
@@ -0,0 +1,204 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+# --- 1. Configuration ---
+# Worker processes, each running the API on its own event loop.
+WORKERS = int(os.getenv("SENTINEL_WORKERS", str(os.cpu_count() or 1)))
+# Threads each worker lets XGBoost use; by default the cores are split evenly.
+THREADS_PER_WORKER = int(os.getenv("SENTINEL_THREADS_PER_WORKER", str(max(1, (os.cpu_count() or 1) // WORKERS))))
+HOST = os.getenv("SENTINEL_HOST", "0.0.0.0")
+PORT = int(os.getenv("SENTINEL_PORT", "8000"))
+# Seconds a stopping worker gets to finish its requests before it is killed.
+GRACEFUL_TIMEOUT = float(os.getenv("SENTINEL_GRACEFUL_TIMEOUT", "30"))
+
+# Set before NumPy and XGBoost are imported. The parent stays single-threaded:
+# GNU OpenMP is not fork-safe once its thread pool exists, so the workers
+# raise XGBoost's thread count themselves after the fork.
+for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ[variable] = "1"
+os.environ.setdefault("SENTINEL_WORKER_THREADS", str(max(2, THREADS_PER_WORKER)))
+# Preloading is the point of this entry point: load and warm up before forking.
+os.environ["SENTINEL_STARTUP_MODE"] = "eager"
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+# Imports NumPy and XGBoost, so it must come after the thread settings above.
+from src.phase4_app import api  # noqa: E402
+
+
+# --- 2. Workers ---
+def bind_socket(host, port) -> socket.socket:
+    """The listening socket, created once in the parent and inherited by every worker."""
+    # An explicit IPPROTO_TCP: asyncio only sets TCP_NODELAY on accepted
+    # sockets whose protocol says TCP, and Nagle's algorithm would otherwise
+    # hold back small responses.
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock):
+    """Runs in a forked child: serves on the inherited socket until SIGTERM."""
+    # The parent decides when workers restart; a terminal hangup is its business.
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    api.model_registry.set_model_threads(THREADS_PER_WORKER)
+    # Each worker reports its own traffic; the parent's warmup runs are not part of it.
+    api.serving_metrics.reset()
+    config = uvicorn.Config(api.app, log_level="warning", timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+    # uvicorn installs its own SIGTERM/SIGINT handlers: stop accepting, finish in-flight requests, exit.
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock)
+        except BaseException as e:
+            print(f"❌ Error: Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def stop_workers(pids, timeout=GRACEFUL_TIMEOUT):
+    """Sends SIGTERM, waits up to `timeout` seconds, then kills the rest."""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + timeout
+    remaining = set(pids)
+    while remaining and time.monotonic() < deadline:
+        for pid in list(remaining):
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    remaining.discard(pid)
+            except ChildProcessError:
+                remaining.discard(pid)
+        time.sleep(0.05)
+    for pid in remaining:
+        print(f"❗️Warning: Worker {pid} did not stop within {timeout:.0f}s; killing it.")
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def drain_workers(pids, draining, timeout=GRACEFUL_TIMEOUT):
+    """
+    Sends SIGTERM to an old generation and records when each worker must be
+    gone by; the parent's loop reaps them, or kills them with `kill_overdue`.
+    """
+    deadline = time.monotonic() + timeout
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        draining[pid] = deadline
+
+
+def kill_overdue(draining, timeout=GRACEFUL_TIMEOUT):
+    """SIGKILLs draining workers past their deadline; the loop reaps them afterwards."""
+    now = time.monotonic()
+    for pid, deadline in list(draining.items()):
+        if now >= deadline:
+            print(f"❗️Warning: Worker {pid} did not stop within {timeout:.0f}s; killing it.")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            # Reaped by the loop's waitpid like any other exit.
+            draining[pid] = float("inf")
+
+
+def prepare_fork():
+    """
+    Puts the parent in a state that is safe and cheap to fork: no SQLite
+    connection to share, and every object loaded so far moved out of the
+    garbage collector's reach, so collections in the workers do not touch
+    (and copy) the preloaded model's pages.
+    """
+    if api.assessment_cache is not None:
+        api.assessment_cache.close()
+    gc.collect()
+    gc.freeze()
+
+
+# --- 3. The Parent Process ---
+def serve(workers=WORKERS, host=HOST, port=PORT):
+    """
+    Preforking server. The parent imports the API with the model and the
+    workflow loaded and warmed up, then forks `workers` processes that
+    share those pages copy-on-write and accept connections on one socket.
+
+    - A worker that dies is replaced.
+    - SIGHUP reloads gracefully: the parent picks up new model artifacts,
+      forks a new generation of workers, then lets the old ones finish
+      their requests and exit. The socket stays open throughout, and the
+      parent keeps supervising the new generation while the old one drains.
+    - SIGTERM or SIGINT stops every worker gracefully, then the parent.
+    """
+    sock = bind_socket(host, port)
+    state = {"reload": False, "stop": False}
+    signal.signal(signal.SIGHUP, lambda *_: state.update(reload=True))
+    signal.signal(signal.SIGTERM, lambda *_: state.update(stop=True))
+    signal.signal(signal.SIGINT, lambda *_: state.update(stop=True))
+
+    prepare_fork()
+    pids = {spawn(sock) for _ in range(workers)}
+    # Old workers finishing their requests after a reload: pid -> deadline.
+    draining = {}
+    version = api.model_registry.get().version
+    print(f"✅ Serving model {version} on http://{host}:{port} with {workers} "
+          f"workers ({THREADS_PER_WORKER} model thread(s) each, parent {os.getpid()}).")
+    while not state["stop"]:
+        if state["reload"]:
+            state["reload"] = False
+            gc.unfreeze()
+            # Waits for artifacts that were just written: the new generation
+            # must fork with the new model, not load it privately later.
+            previous, version = version, api.model_registry.reload(wait=True).version
+            api.warm_up()
+            prepare_fork()
+            old, pids = pids, {spawn(sock) for _ in range(workers)}
+            change = f"{previous} -> {version}" if version != previous else f"{version} (unchanged)"
+            print(f"✅ Reloaded: model {change}, {workers} new workers; stopping the old ones.")
+            drain_workers(old, draining)
+        kill_overdue(draining)
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in draining:
+            del draining[pid]
+        elif pid and pid in pids:
+            pids.discard(pid)
+            if not state["stop"]:
+                print(f"❗️Warning: Worker {pid} exited with status {status}; starting a new one.")
+                # Keeps a worker that fails at startup from turning into a fork loop.
+                time.sleep(1.0)
+                pids.add(spawn(sock))
+        elif not pid:
+            time.sleep(0.2)
+    print("Stopping workers...")
+    stop_workers(pids | set(draining))
+    sock.close()
+
+
+if __name__ == "__main__":
+    serve()
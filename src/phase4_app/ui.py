@@ -60,7 +60,8 @@ if st.button("Assess Transaction", type="primary"):
         with st.spinner("AI workflow is processing..."):
             try:
                 payload = {"transaction_details": transaction_input}
-                response = requests.post(API_URL, json=payload, timeout=60)
+                # debug=true returns the full workflow state for the expander below.
+                response = requests.post(API_URL, json=payload, params={"debug": "true"}, timeout=60)
                 response.raise_for_status()
 
                 result = response.json()
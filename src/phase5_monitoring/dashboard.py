@@ -3,7 +3,36 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import os
+import requests
+import sys
+import time
+from datetime import datetime
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.common.baseline import BASELINE_PATH, histogram_edges, load_baseline
+from src.common.downsample import lttb
+from src.common.drift import (
+    DRIFT_REFERENCE_PATH,
+    N_WINDOWS,
+    WINDOW_SECONDS,
+    DriftReference,
+    drift_table,
+    load_merged_sketch,
+)
+from src.common.features import FEATURE_NAMES
+from src.common.metrics import (
+    BUCKET_SECONDS,
+    SNAPSHOT_DIR,
+    append_minutes,
+    histogram_quantile,
+    histogram_quantiles,
+    load_snapshots,
+    merge_snapshots,
+)
+from src.common.prediction_log import LOG_DIR, column_histogram, list_partitions
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -13,73 +42,178 @@ st.set_page_config(
 )
 
 st.title("📡 Project Sentinel: Production Monitoring Dashboard")
-st.markdown("This dashboard simulates real-time monitoring of the AI Risk Assessment model.")
+st.markdown("Live metrics recorded by the API: latency, decisions, fraud probabilities and errors.")
+
+# Where the metrics come from: the API's /metrics endpoint (one process), or
+# the snapshot files every serving process writes (all workers together).
+METRICS_URL = os.getenv("SENTINEL_METRICS_URL", "http://127.0.0.1:8000/metrics")
+# Snapshots not updated for this long belong to processes that have stopped.
+SNAPSHOT_MAX_AGE = float(os.getenv("SENTINEL_METRICS_MAX_AGE", "3600"))
+# Fraud rate of the training data, the reference for the live rate when
+# there are no baseline statistics.
+TRAINING_FRAUD_RATE = 0.0017
+# Points drawn per line; longer series are downsampled with LTTB, which
+# keeps their shape (spikes included) at any traffic volume.
+MAX_CHART_POINTS = int(os.getenv("SENTINEL_DASHBOARD_MAX_POINTS", "1000"))
+# Minutes fetched again on every render: the newest is still filling up, and
+# the workers write their snapshots at different times.
+REFETCH_MINUTES = 2
 
-# --- Helper Functions to Generate Fake Data ---
+# --- Helper Functions ---
 
-@st.cache_data
-def get_training_data_dist():
-    """Loads a sample of the training data to get baseline distributions."""
-    # In a real scenario, this would be a pre-computed statistics file.
-    # For this simulation, we load the actual data.
+@st.cache_data(ttl=60)
+def load_training_baseline() -> dict:
+    """The baseline statistics Phase 1 saved with the model (a few tens of KB); {} if there are none."""
     try:
-        df = pd.read_csv("data/creditcard.csv")
-        return df['Amount']
+        return load_baseline(BASELINE_PATH)
     except FileNotFoundError:
-        st.error("Error: `creditcard.csv` not found. Please ensure Phase 1 setup was completed.")
-        return pd.Series(np.random.uniform(0, 1000, 1000))
-
-def generate_live_data(n_points=1000):
-    """Generates a stream of simulated live transaction data."""
-    base_time = datetime.now()
-    
-    # Simulate a slight drift in transaction amounts
-    amounts = np.random.lognormal(mean=4, sigma=1.5, size=n_points)
-    amounts[amounts > 5000] = np.random.uniform(500, 2000, len(amounts[amounts > 5000])) # Cap outliers
-    
-    # Simulate fraud predictions (imbalanced)
-    predictions = np.random.choice([0, 1], size=n_points, p=[0.995, 0.005]) # 0.5% fraud rate
-    
-    # Simulate API response times
-    response_times = np.random.gamma(2, 0.05, n_points) * 1000 # in ms
-    
-    timestamps = [base_time - timedelta(minutes=x) for x in range(n_points)]
-    
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'amount': amounts,
-        'prediction': predictions,
-        'response_time_ms': response_times
-    })
-    return df
+        return {}
 
-# --- Main Dashboard ---
+@st.cache_data(ttl=5)
+def load_metrics(source: str, location: str, since=None) -> dict:
+    """
+    The merged metrics snapshot from the endpoint or the snapshot directory,
+    with only the per-minute buckets from `since` on; {} if there is none.
+    """
+    if source == "endpoint":
+        response = requests.get(location, params={"format": "json", "since": since}, timeout=5)
+        response.raise_for_status()
+        return merge_snapshots([response.json()])
+    return merge_snapshots(load_snapshots(location, max_age_seconds=SNAPSHOT_MAX_AGE, since=since))
+
+def fetch_minutes(source: str, location: str):
+    """
+    Loads the metrics and the per-minute buckets incrementally: the minutes
+    of earlier renders are kept in the session, only the last
+    REFETCH_MINUTES and newer ones are fetched again, and minutes older than
+    the API keeps (a day) are dropped. Returns (metrics, minutes).
+    """
+    history = st.session_state.setdefault("minutes", {}).get((source, location))
+    since = None
+    if history is not None and len(history["start"]):
+        since = int(history["start"][-1]) - (REFETCH_MINUTES - 1) * BUCKET_SECONDS
+    metrics = load_metrics(source, location, since)
+    if not metrics:
+        return metrics, None
+    minutes = append_minutes(history, metrics["minutes"], since)
+    st.session_state["minutes"][(source, location)] = minutes
+    return metrics, minutes
+
+
+@st.cache_data(max_entries=5000)
+def partition_histogram(log_dir: str, hour_start: int, segments: tuple, name: str, edges: tuple):
+    """
+    (counts, rows) of one column in one hour partition of the prediction
+    log. The partition's segment names are part of the cache key, so an
+    hour is only read again once new segments were written to it.
+    """
+    return column_histogram(name, edges, hour_start, hour_start + 3600, log_dir)
+
+def logged_histogram(name: str, edges, hours: int, log_dir: str):
+    """(counts, rows) of one column over the last `hours` UTC hours of the prediction log."""
+    counts, rows = np.zeros(len(edges) - 1, dtype=np.int64), 0
+    first_hour = (int(time.time()) // 3600 - hours + 1) * 3600
+    for hour_start, directory in list_partitions(log_dir, start=first_hour):
+        segments = tuple(sorted(f for f in os.listdir(directory) if f.endswith(".npz")))
+        hour_counts, hour_rows = partition_histogram(log_dir, hour_start, segments, name, tuple(edges))
+        counts += hour_counts
+        rows += hour_rows
+    return counts, rows
+
+def downsample(x, y) -> dict:
+    """The finite points of a line, at most MAX_CHART_POINTS of them (LTTB), as `x` and `y` for a trace."""
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(y)
+    x, y = x[finite], y[finite]
+    keep = lttb(x, y, MAX_CHART_POINTS)
+    return {"x": pd.to_datetime(x[keep], unit="s"), "y": y[keep]}
+
+@st.cache_data(ttl=5)
+def load_drift(hours: int, snapshot_dir: str) -> pd.DataFrame:
+    """
+    PSI, KS and Jensen-Shannon divergence per column over the last `hours`,
+    from the merged drift sketches of every serving process; empty without
+    a reference or sketches.
+    """
+    try:
+        reference, _ = DriftReference.load(DRIFT_REFERENCE_PATH)
+    except FileNotFoundError:
+        return pd.DataFrame()
+    sketch = load_merged_sketch(reference, snapshot_dir)
+    if sketch is None:
+        return pd.DataFrame()
+    table = pd.DataFrame(drift_table(reference, sketch.window_counts(start=time.time() - hours * 3600)))
+    table["status"] = pd.cut(table["psi"], [-np.inf, 0.1, 0.25, np.inf], labels=["stable", "moderate", "major"])
+    return table.sort_values("psi", ascending=False)
+
+def latency_quantiles(histogram: dict, bounds) -> list:
+    return [histogram_quantile(bounds, histogram["counts"], q) for q in (0.5, 0.95, 0.99)]
+
+# --- Data Source ---
+with st.sidebar:
+    st.header("Metrics Source")
+    source = st.radio("Read from", ["snapshots", "endpoint"],
+                      format_func=lambda s: {"snapshots": "Snapshot files (all workers)", "endpoint": "/metrics endpoint"}[s])
+    location = st.text_input("Snapshot directory" if source == "snapshots" else "Metrics URL",
+                             SNAPSHOT_DIR if source == "snapshots" else METRICS_URL)
+    if st.button("Refresh"):
+        load_metrics.clear()
+        st.session_state.pop("minutes", None)
+        load_training_baseline.clear()
+        load_drift.clear()
+    st.header("Drift Window")
+    drift_hours = st.slider("Hours of logged predictions", 1, 168, 24,
+                            help="Whole UTC hours, including the current one.")
+    log_dir = st.text_input("Prediction log directory", LOG_DIR)
 
-training_amount_dist = get_training_data_dist()
-live_data = generate_live_data()
+try:
+    metrics, minutes = fetch_minutes(source, location)
+except requests.exceptions.RequestException as e:
+    st.error(f"Error: Could not read {location}: {e}")
+    st.stop()
+if not metrics or not metrics["assessments"]["total"] and not metrics["requests"]:
+    st.warning("No metrics recorded yet. Start the API (Phase 4) and send it some transactions.")
+    st.stop()
 
-col1, col2, col3 = st.columns(3)
+baseline = load_training_baseline()
+if not baseline:
+    st.info(f"No baseline statistics at `{BASELINE_PATH}`; run Phase 1 to compare live traffic with training.")
+bounds = metrics["latency_bounds_ms"]
+assessments = metrics["assessments"]
+recent = pd.DataFrame(metrics.get("recent", {}))
+if not recent.empty:
+    recent["fraud"] = recent["fraud"].astype(bool)
+    recent["error"] = recent["error"].astype(bool)
+st.caption(f"{metrics['processes']} process(es), last updated "
+           f"{datetime.fromtimestamp(metrics['written_at']):%Y-%m-%d %H:%M:%S}.")
+
+# --- Main Dashboard ---
+endpoint = st.selectbox("Endpoint", sorted(metrics["requests"]))
+requests_histogram = metrics["requests"][endpoint]
+p50, p95, p99 = latency_quantiles(requests_histogram, bounds)
+scored = assessments["total"] - assessments["errors"]
+fraud_rate = assessments["fraud"] / scored if scored else 0.0
+http_errors = sum(requests_histogram["errors"].values())
+
+col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
-    st.metric(
-        "Total Transactions (24h)",
-        f"{len(live_data):,}"
-    )
+    st.metric("Assessed Transactions", f"{assessments['total']:,}")
 with col2:
-    fraud_rate = live_data['prediction'].mean()
     st.metric(
         "Detected Fraud Rate",
         f"{fraud_rate:.2%}",
-        delta=f"{(fraud_rate - 0.0017):.2%}", # Compare to training set rate
+        delta=f"{(fraud_rate - baseline.get('fraud_rate', TRAINING_FRAUD_RATE)):.2%}", # Compare to training set rate
         delta_color="inverse"
     )
 with col3:
-    avg_latency = live_data['response_time_ms'].mean()
-    st.metric(
-        "Average API Latency",
-        f"{avg_latency:.2f} ms",
-        delta=f"{(avg_latency - 120):.2f} ms"
-    )
+    st.metric("Latency p50 / p95", f"{p50:.1f} / {p95:.1f} ms")
+with col4:
+    st.metric("Latency p99", f"{p99:.1f} ms")
+with col5:
+    st.metric("Errors", f"{assessments['errors'] + http_errors:,}",
+              help=f"{assessments['errors']:,} transactions that could not be assessed, "
+                   f"{http_errors:,} error responses from {endpoint}.")
 
 st.divider()
 
@@ -88,41 +222,142 @@ chart1, chart2 = st.columns(2)
 
 with chart1:
     st.subheader("Prediction Distribution")
-    prediction_counts = live_data['prediction'].value_counts().rename({0: 'Legitimate', 1: 'Fraud'})
+    prediction_counts = pd.Series({
+        'Legitimate': scored - assessments["fraud"],
+        'Fraud': assessments["fraud"],
+        'Error': assessments["errors"],
+    })
     fig = px.pie(
         prediction_counts,
         values=prediction_counts.values,
         names=prediction_counts.index,
-        title="Live Predictions (Simulated)",
+        title="Live Predictions",
         color=prediction_counts.index,
-        color_discrete_map={'Legitimate':'green', 'Fraud':'red'}
+        color_discrete_map={'Legitimate':'green', 'Fraud':'red', 'Error':'grey'}
     )
     st.plotly_chart(fig, use_container_width=True)
 
 with chart2:
     st.subheader("API Response Time")
-    live_data_sorted = live_data.sort_values('timestamp')
-    fig = px.line(
-        live_data_sorted,
-        x='timestamp',
-        y='response_time_ms',
-        title='API Latency Over Time (Simulated)',
-        labels={'timestamp': 'Time', 'response_time_ms': 'Latency (ms)'}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    if recent.empty:
+        st.info("No recent assessments recorded.")
+    else:
+        shown = recent.iloc[lttb(recent["timestamp"], recent["latency_ms"], MAX_CHART_POINTS)].copy()
+        shown["timestamp"] = pd.to_datetime(shown["timestamp"], unit="s")
+        fig = px.scatter(
+            shown,
+            x='timestamp',
+            y='latency_ms',
+            color='fraud',
+            title=f'Latency of the Last {len(recent):,} Assessments ({len(shown):,} shown)',
+            labels={'timestamp': 'Time', 'latency_ms': 'Latency (ms)', 'fraud': 'Fraud'},
+            color_discrete_map={False: 'green', True: 'red'}
+        )
+        for value, name in ((p50, "p50"), (p95, "p95"), (p99, "p99")):
+            fig.add_hline(y=value, line_dash="dot", annotation_text=name)
+        st.plotly_chart(fig, use_container_width=True)
+
+st.subheader("Traffic and Latency per Minute")
+if not len(minutes["start"]):
+    st.info("No per-minute buckets recorded yet.")
+else:
+    # Pre-aggregated by the API: at most one point per minute for the last
+    # day, whatever the traffic, downsampled further for long windows.
+    starts = minutes["start"]
+    assessed = minutes["assessed"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        minute_fraud_rate = minutes["fraud"] / (assessed - minutes["errors"])
+    chart3, chart4 = st.columns(2)
+    with chart3:
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(**downsample(starts, assessed), name='Assessed', line_color='blue'))
+        fig.add_trace(go.Scatter(**downsample(starts, minute_fraud_rate), name='Fraud rate', yaxis='y2',
+                                 line_color='red'))
+        fig.update_layout(title_text='Assessments and Fraud Rate per Minute', yaxis_title_text='Assessments',
+                          yaxis2=dict(title='Fraud rate', overlaying='y', side='right', tickformat='.1%'))
+        st.plotly_chart(fig, use_container_width=True)
+    with chart4:
+        fig = go.Figure()
+        for q, name in ((0.5, "p50"), (0.95, "p95"), (0.99, "p99")):
+            fig.add_trace(go.Scatter(**downsample(starts, histogram_quantiles(bounds, minutes["latency_counts"], q)),
+                                     name=name))
+        fig.update_layout(title_text='Assessment Latency per Minute', yaxis_title_text='Latency (ms)')
+        st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{len(starts):,} minutes from {metrics['processes']} process(es); only new minutes are fetched "
+               f"on each refresh, and lines are downsampled to at most {MAX_CHART_POINTS:,} points.")
 
-st.subheader("Feature Drift Detection: Transaction `Amount`")
-st.markdown("Comparing the distribution of transaction amounts in the training data versus live, simulated data. A significant change could indicate data drift.")
+st.subheader("Latency by Workflow Node")
+node_rows = [
+    {"node": node, "runs": h["count"], "mean ms": h["sum"] / h["count"] if h["count"] else np.nan,
+     **dict(zip(("p50 ms", "p95 ms", "p99 ms"), latency_quantiles(h, bounds)))}
+    for node, h in metrics["nodes"].items()
+]
+st.dataframe(pd.DataFrame(node_rows), hide_index=True, use_container_width=True)
+st.caption("Percentiles are estimated from fixed latency buckets, like Prometheus' `histogram_quantile`.")
 
+st.subheader("Fraud Probability Distribution")
+probability_bounds = metrics["probability_bounds"]
+probability_labels = [f"≤ {bound:.2f}" for bound in probability_bounds]
+live_counts = np.asarray(metrics["probabilities"]["counts"][:len(probability_bounds)], dtype=float)
 fig = go.Figure()
-fig.add_trace(go.Histogram(x=training_amount_dist, name='Training Data', xbins=dict(start=0, end=500, size=10), marker_color='blue', opacity=0.6))
-fig.add_trace(go.Histogram(x=live_data['amount'], name='Live Data (Simulated)', xbins=dict(start=0, end=500, size=10), marker_color='orange', opacity=0.6))
-
-fig.update_layout(
-    barmode='overlay',
-    title_text='Distribution of Transaction Amount (0-$500)',
-    xaxis_title_text='Amount ($)',
-    yaxis_title_text='Count'
-)
+fig.add_trace(go.Bar(x=probability_labels, y=live_counts / max(live_counts.sum(), 1), name='Live Data',
+                     marker_color='orange', opacity=0.6))
+if baseline and baseline["score"]["probability_bounds"] == probability_bounds:
+    training_counts = np.asarray(baseline["score"]["probability_counts"][:len(probability_bounds)], dtype=float)
+    fig.add_trace(go.Bar(x=probability_labels, y=training_counts / max(training_counts.sum(), 1),
+                         name='Training Data (test split)', marker_color='blue', opacity=0.6))
+fig.update_layout(barmode='overlay', xaxis_title_text='Fraud probability', yaxis_title_text='Share of Transactions',
+                  yaxis_type='log')
 st.plotly_chart(fig, use_container_width=True)
 
+st.subheader("Feature Drift Detection: All Features")
+st.markdown("Every feature and the model's fraud probability in the drift window, compared with the held-out "
+            "training data. PSI below 0.1 is usually read as stable, above 0.25 as a major shift.")
+drift = load_drift(drift_hours, location if source == "snapshots" else SNAPSHOT_DIR)
+if drift.empty or not drift["rows"].any():
+    st.info(f"No drift sketches for the current model yet. Phase 1 writes the reference to `{DRIFT_REFERENCE_PATH}`; "
+            "the API counts logged predictions into its sketches as the prediction log flushes.")
+else:
+    fig = px.bar(drift, x="column", y="psi", color="status", title="Population Stability Index by Column",
+                 color_discrete_map={"stable": "green", "moderate": "orange", "major": "red"})
+    for value in (0.1, 0.25):
+        fig.add_hline(y=value, line_dash="dot")
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(drift, hide_index=True, use_container_width=True)
+    st.caption(f"From quantile sketches kept in {WINDOW_SECONDS // 60}-minute windows for the last "
+               f"{N_WINDOWS * WINDOW_SECONDS / 3600:g} hours and merged across workers.")
+
+st.subheader("Feature Distribution: Live vs. Training")
+st.markdown("Comparing the distribution of one feature in the training data versus live transactions from the prediction log. A significant change could indicate data drift.")
+
+feature = st.selectbox("Feature", FEATURE_NAMES, index=FEATURE_NAMES.index("Amount"))
+if not baseline:
+    st.info("The training distribution needs the baseline statistics from Phase 1.")
+else:
+    # Live values are counted into the training histogram's bins hour by
+    # hour (cached per hour), so both are the same few dozen bars however
+    # many transactions were logged.
+    histogram = baseline["features"][feature]["histogram"]
+    edges = histogram_edges(histogram)
+    centers = (edges[:-1] + edges[1:]) / 2
+    training_total = sum(histogram["counts"]) + histogram["below"] + histogram["above"]
+    live_counts, live_rows = logged_histogram(feature, edges, drift_hours, log_dir)
+    if not live_rows and feature == "Amount" and not recent.empty:
+        # Nothing logged in the window (or the log is off): use the recent assessments.
+        st.caption("No logged predictions in the window; showing the most recent assessments instead.")
+        amounts = recent["amount"].dropna()
+        live_counts, live_rows = np.histogram(amounts, edges)[0], len(amounts)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=centers, y=np.asarray(histogram["counts"]) / training_total, width=edges[1] - edges[0],
+                         name='Training Data', marker_color='blue', opacity=0.6))
+    fig.add_trace(go.Bar(x=centers, y=live_counts / max(live_rows, 1), width=edges[1] - edges[0],
+                         name='Live Data', marker_color='orange', opacity=0.6))
+    fig.update_layout(
+        barmode='overlay',
+        title_text=f'Distribution of {feature} ({edges[0]:g} to {edges[-1]:g})',
+        xaxis_title_text=feature,
+        yaxis_title_text='Share of Transactions'
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Outside this range: {(histogram['below'] + histogram['above']) / training_total:.1%} of training "
+               f"and {1 - live_counts.sum() / max(live_rows, 1):.1%} of live values.")